@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""Benchmarks for the hot paths of the HTML-XLS reader.
+
+A synthetic corpus is generated per profile (see CORPUS_PROFILES in
+tests/test_data/create_test_files.py) and every stage of the reader is timed
+on it: encoding detection, reading, table extraction, cleaning, type
+coercion, concatenation and the end-to-end batch run. Each stage runs in a
+fresh process, so its peak RSS is not inflated by earlier stages.
+
+    python benchmarks/run_benchmarks.py                      # all profiles
+    python benchmarks/run_benchmarks.py --profiles wide --scale 0.1
+    python benchmarks/run_benchmarks.py --save               # store baselines
+    python benchmarks/run_benchmarks.py --compare            # fail on regressions
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import tempfile
+import argparse
+import multiprocessing
+from dataclasses import replace
+from typing import Callable, Dict, List, Optional
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "src"))
+sys.path.insert(0, os.path.join(ROOT, "tests", "test_data"))
+
+import pandas as pd
+
+from arrow_output import StreamingConcat, write_batches
+from batch_processing import process_files
+from create_test_files import CORPUS_PROFILES, generate_corpus
+from file_reader import ReaderOptions, clean_dataframe, detect_encoding, read_html_xls
+from table_extraction import ParseOptions, extract_tables
+from type_coercion import coerce_table
+
+DEFAULT_CORPUS_DIR = os.path.join(tempfile.gettempdir(), "html_xls_reader_corpus")
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+
+# A stage is slower than its baseline by more than this factor is a regression
+DEFAULT_THRESHOLD = 1.25
+
+# ... if it is also slower by more than this many seconds; shorter runs are noise
+DEFAULT_MIN_SECONDS = 0.005
+
+STAGES = ["detect_encoding", "read", "extract", "clean", "coerce", "concat",
+          "concat_streaming", "concat_arrow", "process_files", "process_files_prefetch",
+          "process_files_split"]
+
+# Files read ahead in the prefetch stage
+PREFETCH_DEPTH = 8
+
+
+def _peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / 1024
+
+
+def _options(profile: Dict) -> ReaderOptions:
+    header_rows = 2 if profile.get("spans") else 1
+    return ReaderOptions(table_index=-1, parse=ParseOptions(header_rows=header_rows))
+
+
+def _prepare(stage: str, files: List[str], options: ReaderOptions) -> Callable[[], int]:
+    """Load the inputs of a stage, return a callable running it that returns rows produced"""
+    if stage == "detect_encoding":
+        def run():
+            for file_path in files:
+                detect_encoding(file_path)
+            return 0
+        return run
+    if stage == "read":
+        def run():
+            for file_path in files:
+                read_html_xls(file_path)
+            return 0
+        return run
+
+    contents = [read_html_xls(f) for f in files]
+    if stage == "extract":
+        return lambda: sum(len(df) for c in contents for df in extract_tables(c, options.parse))
+
+    tables = [df for c in contents for df in extract_tables(c, options.parse)]
+    if stage == "clean":
+        return lambda: sum(len(clean_dataframe(df, options)) for df in tables)
+    if stage == "coerce":
+        return lambda: sum(len(coerce_table(df, options.parse)) for df in tables)
+    if stage == "concat":
+        return lambda: len(pd.concat(tables, ignore_index=True, sort=False))
+    if stage == "concat_streaming":
+        def run():
+            concat = StreamingConcat()
+            for df in tables:
+                concat.add(df)
+            return concat.to_table().num_rows
+        return run
+    if stage == "concat_arrow":
+        arrow_tables = [t for c in contents for t in extract_tables(c, options.parse, arrow=True)]
+        return lambda: write_batches(arrow_tables, lambda batch: None)
+    if stage in ("process_files", "process_files_prefetch", "process_files_split"):
+        depth = PREFETCH_DEPTH if stage == "process_files_prefetch" else 0
+        if stage == "process_files_split":
+            # Tables of 32 MB and more are parsed in row ranges, one process per core
+            options = replace(options, split_workers=0)
+        def run():
+            rows = 0
+            for _, results, error in process_files(files, options, prefetch_depth=depth):
+                if error is not None:
+                    raise error
+                rows += sum(len(df) for df, _ in results)
+            return rows
+        return run
+    raise ValueError(f"Unknown stage: {stage}")
+
+
+def _run_stage(stage: str, files: List[str], profile: Dict, repeat: int, queue):
+    """Child process: time one stage and report its metrics"""
+    # Fallback warnings of the reader would drown the report
+    logging.disable(logging.WARNING)
+    options = _options(profile)
+    try:
+        run = _prepare(stage, files, options)
+        rss_before = _peak_rss_mb()
+
+        best = float("inf")
+        rows = 0
+        for _ in range(repeat):
+            start = time.perf_counter()
+            rows = run()
+            best = min(best, time.perf_counter() - start)
+    except Exception as e:
+        queue.put({"error": f"{type(e).__name__}: {e}"})
+        return
+
+    rss_after = _peak_rss_mb()
+    input_mb = sum(os.path.getsize(f) for f in files) / (1 << 20)
+    queue.put({
+        "seconds": round(best, 4),
+        "mb_per_s": round(input_mb / best, 2) if best else None,
+        "rows_per_s": round(rows / best) if best and rows else None,
+        "peak_rss_mb": round(rss_after, 1) if rss_after is not None else None,
+        "stage_rss_mb": round(rss_after - rss_before, 1) if rss_after is not None else None,
+    })
+
+
+def _corpus(corpus_dir: str, name: str, profile: Dict, scale: float) -> List[str]:
+    """Generate (or reuse) the corpus of a profile"""
+    params = dict(profile)
+    for key in ("rows", "files", "tables"):
+        if key in params:
+            params[key] = max(1, int(params[key] * scale))
+    folder = os.path.join(corpus_dir, f"{name}_{scale:g}")
+    marker = os.path.join(folder, ".complete")
+    if os.path.exists(marker):
+        return sorted(os.path.join(folder, f) for f in os.listdir(folder) if f.endswith(".xls"))
+    files = generate_corpus(folder, **params)
+    open(marker, "w").close()
+    return files
+
+
+def run_benchmarks(profiles: List[str], stages: List[str], corpus_dir: str,
+                   scale: float = 1.0, repeat: int = 3) -> Dict[str, Dict[str, Dict]]:
+    """Run the stages on each profile's corpus, one process per stage"""
+    context = multiprocessing.get_context("spawn")
+    results: Dict[str, Dict[str, Dict]] = {}
+    for name in profiles:
+        profile = CORPUS_PROFILES[name]
+        files = _corpus(corpus_dir, name, profile, scale)
+        results[name] = {}
+        for stage in stages:
+            queue = context.Queue()
+            process = context.Process(target=_run_stage,
+                                      args=(stage, files, profile, repeat, queue))
+            process.start()
+            metrics = queue.get()
+            process.join()
+            if "error" in metrics:
+                print(f"{name:12} {stage:16} failed: {metrics['error']}")
+                continue
+            results[name][stage] = metrics
+            print(f"{name:12} {stage:16} {metrics['seconds']:9.4f} s  "
+                  f"{metrics['mb_per_s'] or 0:9.2f} MB/s  {metrics['rows_per_s'] or 0:>10} rows/s  "
+                  f"{metrics['peak_rss_mb'] or 0:8.1f} MB peak")
+    return results
+
+
+def compare(results: Dict, baselines: Dict, threshold: float,
+            min_seconds: float = DEFAULT_MIN_SECONDS) -> List[str]:
+    """Stages slower than their baseline by more than the threshold and min_seconds"""
+    regressions = []
+    for name, stages in results.items():
+        for stage, metrics in stages.items():
+            baseline = baselines.get(name, {}).get(stage)
+            if not baseline or not baseline.get("seconds"):
+                continue
+            ratio = metrics["seconds"] / baseline["seconds"]
+            if ratio > threshold and metrics["seconds"] - baseline["seconds"] > min_seconds:
+                regressions.append(f"{name}/{stage}: {ratio:.2f}x slower than baseline "
+                                   f"({metrics['seconds']} s vs {baseline['seconds']} s)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the reader's hot paths")
+    parser.add_argument("--profiles", nargs="+", default=sorted(CORPUS_PROFILES),
+                        choices=sorted(CORPUS_PROFILES))
+    parser.add_argument("--stages", nargs="+", default=STAGES, choices=STAGES)
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="multiplies rows, tables and files of every profile")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per stage, the best is kept")
+    parser.add_argument("--corpus-dir", default=DEFAULT_CORPUS_DIR,
+                        help="generated corpora are kept here and reused")
+    parser.add_argument("--save", action="store_true", help="store the results as baselines")
+    parser.add_argument("--compare", action="store_true", help="exit with 1 on regressions")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--min-seconds", type=float, default=DEFAULT_MIN_SECONDS,
+                        help="slowdowns of fewer seconds are never regressions")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.profiles, args.stages, args.corpus_dir, args.scale, args.repeat)
+
+    baselines = {}
+    if os.path.exists(BASELINE_FILE):
+        with open(BASELINE_FILE, encoding="utf-8") as f:
+            baselines = json.load(f)
+    key = f"scale={args.scale:g}"
+
+    if args.save:
+        stored = baselines.setdefault(key, {})
+        for name, stages in results.items():
+            stored.setdefault(name, {}).update(stages)
+        with open(BASELINE_FILE, "w", encoding="utf-8") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+        print(f"Baselines saved to {BASELINE_FILE}")
+
+    if args.compare:
+        regressions = compare(results, baselines.get(key, {}), args.threshold, args.min_seconds)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+"""Assembly of extracted tables into the node output.
+
+Tables are added one at a time to a ``StreamingConcat``, which unifies their
+schemas incrementally and keeps their columns as they are. Only when the
+output is written are the tables conformed to the union schema, a group of
+record batches at a time, so no combined DataFrame is ever materialized and
+the cost is linear in the number of tables.
+"""
+
+import logging
+from collections import deque
+from typing import Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from table_extraction import Frame
+
+# Set up logging
+LOGGER = logging.getLogger(__name__)
+
+# Minimum number of rows per record batch handed to the output
+OUTPUT_BATCH_ROWS = 65536
+
+# Arrow types of the metadata columns, matching the schema from configure.
+# Paths repeat on every row of a table, so they are dictionary encoded.
+METADATA_TYPES = {
+    'source_file': pa.dictionary(pa.int32(), pa.string()),
+    'file_path': pa.dictionary(pa.int32(), pa.string()),
+    'table_index': pa.int32(),
+    'num_rows': pa.int32(),
+    'num_cols': pa.int32(),
+}
+
+# Column joining the rows to the separate metadata table
+TABLE_ID_TYPES = {
+    'table_id': pa.int32(),
+}
+
+
+def metadata_columns(metadata: List[Dict], lengths: List[int]) -> Dict[str, pa.Array]:
+    """Constant metadata columns of consecutive tables with the given row counts.
+
+    Text values become dictionary arrays holding each distinct value once,
+    so a long path costs four bytes per row instead of its length.
+    """
+    columns = {}
+    for key in metadata[0]:
+        values = [m[key] for m in metadata]
+        data_type = METADATA_TYPES.get(key, TABLE_ID_TYPES.get(key))
+        if data_type is not None and pa.types.is_dictionary(data_type):
+            codes = {value: code for code, value in enumerate(dict.fromkeys(values))}
+            indices = np.repeat(np.array([codes[value] for value in values], np.int32), lengths)
+            columns[key] = pa.DictionaryArray.from_arrays(
+                indices, pa.array(list(codes), data_type.value_type))
+        else:
+            columns[key] = pa.array(np.repeat(values, lengths), data_type)
+    return columns
+
+
+def _set_columns(table: pa.Table, columns: Dict[str, pa.Array]) -> pa.Table:
+    for key, column in columns.items():
+        if key in table.column_names:
+            table = table.set_column(table.column_names.index(key), key, column)
+        else:
+            table = table.append_column(key, column)
+    return table
+
+
+def append_metadata(table: pa.Table, metadata: Dict) -> pa.Table:
+    """Add constant metadata columns to an Arrow table"""
+    return _set_columns(table, metadata_columns([metadata], [table.num_rows]))
+
+
+def metadata_table(metadata: List[Dict]) -> pa.Table:
+    """One row per extracted table, for output separate from the rows"""
+    types = {**TABLE_ID_TYPES, **METADATA_TYPES}
+    return pa.table({
+        key: pa.array([m.get(key) for m in metadata],
+                      data_type.value_type if pa.types.is_dictionary(data_type) else data_type)
+        for key, data_type in types.items()
+    })
+
+
+def frame_to_arrow(df: pd.DataFrame) -> pa.Table:
+    """Arrow table of a DataFrame, without its index.
+
+    Spreadsheet columns often mix numbers and text in one object column,
+    which Arrow cannot hold; such columns are converted to text.
+    """
+    try:
+        return pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        pass
+    arrays = []
+    for i in range(df.shape[1]):
+        column = df.iloc[:, i]
+        try:
+            arrays.append(pa.array(column, from_pandas=True))
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            arrays.append(pa.array(column.astype(str).where(column.notna()), pa.string(),
+                                   from_pandas=True))
+    return pa.Table.from_arrays(arrays, names=[str(name) for name in df.columns])
+
+
+def _common_type(types: List[pa.DataType]) -> pa.DataType:
+    """Type that all given column types can be cast to"""
+    types = [t for t in types if t != pa.null()]
+    # Dictionary columns stay encoded if every table agrees on the values' type
+    if types and all(pa.types.is_dictionary(t) for t in types):
+        value_types = {t.value_type for t in types}
+        if len(value_types) == 1:
+            return pa.dictionary(pa.int32(), value_types.pop())
+    types = [t.value_type if pa.types.is_dictionary(t) else t for t in types]
+    # Text from pandas may arrive as large_string
+    types = [pa.string() if pa.types.is_large_string(t) else t for t in types]
+    if not types:
+        # Empty columns are float NaN columns, as in the pandas output
+        return pa.float64()
+    if all(t == types[0] for t in types):
+        return types[0]
+    if all(pa.types.is_integer(t) for t in types):
+        return pa.int64()
+    if all(pa.types.is_integer(t) or pa.types.is_floating(t) for t in types):
+        return pa.float64()
+    return pa.string()
+
+
+def unify_schema(schemas: Iterable[pa.Schema]) -> pa.Schema:
+    """Union of the columns of all schemas, in order of first appearance"""
+    types: Dict[str, List[pa.DataType]] = {}
+    for schema in schemas:
+        for field in schema:
+            types.setdefault(field.name, []).append(field.type)
+    return pa.schema([(name, _common_type(field_types)) for name, field_types in types.items()])
+
+
+def conform(table: pa.Table, schema: pa.Schema) -> pa.Table:
+    """Reorder, cast and null-fill the columns of a table to match a schema"""
+    positions: Dict[str, int] = {}
+    for i, name in enumerate(table.column_names):
+        positions.setdefault(name, i)
+
+    arrays = []
+    for field in schema:
+        position = positions.get(field.name)
+        if position is None:
+            arrays.append(pa.nulls(table.num_rows, field.type))
+            continue
+        column = table.column(position)
+        if column.type != field.type:
+            column = pc.cast(column, field.type)
+        arrays.append(column)
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+class StreamingConcat:
+    """Concatenation of tables under an incrementally unified schema.
+
+    Each added table is mapped to the union columns with a precomputed index;
+    its column arrays are kept as they are, without copies. Columns of an
+    expected ``schema`` (e.g. the one announced in configure) come first and
+    keep their types unless the data needs a wider one.
+    """
+
+    def __init__(self, schema: Optional[pa.Schema] = None):
+        self._positions: Dict[str, int] = {}
+        self._names: List[str] = []
+        self._types: List[List[pa.DataType]] = []
+        self._parts: Deque[Tuple[int, List[int], List[pa.ChunkedArray]]] = deque()
+        # DataFrames with identical columns are converted to Arrow in groups
+        self._pending: List[pd.DataFrame] = []
+        self._pending_metadata: List[Dict] = []
+        self._pending_key: Optional[Tuple] = None
+        self._pending_rows = 0
+        self.num_rows = 0
+        self.num_tables = 0
+        if schema is not None:
+            for field in schema:
+                self._position(field.name, field.type)
+
+    def _position(self, name: str, data_type: pa.DataType) -> int:
+        position = self._positions.get(name)
+        if position is None:
+            position = self._positions[name] = len(self._names)
+            self._names.append(name)
+            self._types.append([])
+        if data_type not in self._types[position]:
+            self._types[position].append(data_type)
+        return position
+
+    def add(self, table: Frame, metadata: Optional[Dict] = None):
+        """Add a table, DataFrames are converted to Arrow first.
+
+        ``metadata`` is added as constant columns, see metadata_columns.
+        """
+        self.num_rows += len(table)
+        self.num_tables += 1
+        if isinstance(table, pa.Table):
+            self._flush_pending()
+            self._add_arrow(append_metadata(table, metadata) if metadata else table)
+            return
+
+        # Converting one small DataFrame costs far more than its rows
+        key = (tuple(table.columns), tuple(metadata or ()))
+        if key != self._pending_key:
+            self._flush_pending()
+            self._pending_key = key
+        self._pending.append(table)
+        if metadata:
+            self._pending_metadata.append(metadata)
+        self._pending_rows += len(table)
+        if self._pending_rows >= OUTPUT_BATCH_ROWS:
+            self._flush_pending()
+
+    def _flush_pending(self):
+        if not self._pending:
+            return
+        # Same columns, so no alignment is needed
+        df = (self._pending[0] if len(self._pending) == 1
+              else pd.concat(self._pending, ignore_index=True))
+        table = frame_to_arrow(df)
+        if self._pending_metadata:
+            # Built for the whole group at once, one dictionary per group
+            lengths = [len(frame) for frame in self._pending]
+            table = _set_columns(table, metadata_columns(self._pending_metadata, lengths))
+        self._add_arrow(table)
+        self._pending.clear()
+        self._pending_metadata.clear()
+        self._pending_key = None
+        self._pending_rows = 0
+
+    def _add_arrow(self, table: pa.Table):
+        index: List[int] = []
+        columns: List[pa.ChunkedArray] = []
+        for name, column in zip(table.column_names, table.columns):
+            position = self._position(name, column.type)
+            # Only the first of duplicate names is kept, as pandas would fail on them
+            if position not in index:
+                index.append(position)
+                columns.append(column)
+        self._parts.append((table.num_rows, index, columns))
+
+    @property
+    def schema(self) -> pa.Schema:
+        """Union schema of all tables added so far"""
+        self._flush_pending()
+        return pa.schema([(name, _common_type(types))
+                          for name, types in zip(self._names, self._types)])
+
+    def _conformed(self, schema: pa.Schema) -> Iterator[pa.Table]:
+        """Added tables conformed to the schema, releasing them as they go"""
+        while self._parts:
+            num_rows, index, columns = self._parts.popleft()
+            arrays: List = [None] * len(schema)
+            for position, column in zip(index, columns):
+                data_type = schema.field(position).type
+                if column.type != data_type:
+                    column = pc.cast(column, data_type)
+                arrays[position] = column
+            for position, field in enumerate(schema):
+                if arrays[position] is None:
+                    arrays[position] = pa.nulls(num_rows, field.type)
+            yield pa.Table.from_arrays(arrays, schema=schema)
+
+    def iter_batches(self) -> Iterator[pa.RecordBatch]:
+        """Consume the added tables as record batches of the union schema.
+
+        Small tables are grouped so batches hold at least OUTPUT_BATCH_ROWS
+        rows where possible. An empty result still yields one empty batch
+        carrying the schema.
+        """
+        schema = self.schema
+        buffered: List[pa.Table] = []
+        buffered_rows = 0
+        appended = False
+
+        def flush():
+            # A single table needs no copy, its chunks become the batches
+            table = (buffered[0] if len(buffered) == 1
+                     else pa.concat_tables(buffered).combine_chunks())
+            buffered.clear()
+            return table.to_batches()
+
+        for table in self._conformed(schema):
+            buffered.append(table)
+            buffered_rows += table.num_rows
+            if buffered_rows >= OUTPUT_BATCH_ROWS:
+                for batch in flush():
+                    appended = True
+                    yield batch
+                buffered_rows = 0
+        if buffered:
+            for batch in flush():
+                appended = True
+                yield batch
+        if not appended:
+            # The output needs at least one batch to carry the schema
+            yield pa.RecordBatch.from_arrays([pa.array([], f.type) for f in schema], schema=schema)
+
+    def to_table(self) -> pa.Table:
+        """Consume the added tables into one Arrow table"""
+        schema = self.schema
+        return pa.Table.from_batches(list(self.iter_batches()), schema=schema)
+
+    def to_pandas(self) -> pd.DataFrame:
+        """Consume the added tables into one DataFrame"""
+        return self.to_table().to_pandas()
+
+    def write(self, append: Callable[[pa.RecordBatch], None]) -> int:
+        """Consume the added tables into an output, returns the number of rows written"""
+        num_rows = self.num_rows
+        for batch in self.iter_batches():
+            append(batch)
+        return num_rows
+
+
+def write_batches(tables: Iterable[Frame], append: Callable[[pa.RecordBatch], None],
+                  schema: Optional[pa.Schema] = None) -> int:
+    """Append tables, conformed to their union schema, as record batches.
+
+    Small tables are grouped so batches hold at least OUTPUT_BATCH_ROWS rows
+    where possible. Columns of an expected ``schema`` come first. Returns the
+    number of rows written.
+    """
+    concat = StreamingConcat(schema)
+    for table in tables:
+        concat.add(table)
+    return concat.write(append)
@@ -0,0 +1,202 @@
+"""Batch execution of file processing, sequentially or over a process pool.
+
+Reading files from network shares blocks on every open and read, so the raw
+bytes of the next files can be prefetched by a small pool of I/O threads
+while the current ones are parsed.
+"""
+
+import os
+import logging
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import replace
+from itertools import islice
+from typing import Deque, Dict, Generator, Iterable, Iterator, List, Optional, Tuple
+
+from file_reader import ReaderOptions, process_file
+from input_sources import is_compressed, open_source, read_source, source_size
+from metrics import StageRecorder, stage
+from parse_cache import ParseCache
+from table_extraction import Frame
+
+# Set up logging
+LOGGER = logging.getLogger(__name__)
+
+# Result of one file: (file path, extracted tables or None, error or None)
+FileResult = Tuple[str, Optional[List[Tuple[Frame, Dict]]], Optional[Exception]]
+
+# A file and its prefetched content, None if the file is read where it is processed
+Prefetched = Tuple[str, Optional[bytes]]
+
+# Larger files are not prefetched, so memory stays below depth times this size
+PREFETCH_MAX_BYTES = 64 << 20
+
+# Upper bound of the I/O threads, however deep the prefetch
+PREFETCH_MAX_THREADS = 8
+
+
+def _read_ahead(file_path: str, max_bytes: int) -> Optional[bytes]:
+    if not is_compressed(file_path):
+        # Archive members are compared by their uncompressed size
+        if source_size(file_path) > max_bytes:
+            return None
+        return read_source(file_path)
+
+    # The uncompressed size is only known once read, reading stops past the limit
+    chunks: List[bytes] = []
+    size = 0
+    with open_source(file_path) as f:
+        while size <= max_bytes:
+            chunk = f.read(max_bytes + 1 - size)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            size += len(chunk)
+    return b"".join(chunks) if size <= max_bytes else None
+
+
+def prefetch(files: Iterable[str], depth: int, max_bytes: int = PREFETCH_MAX_BYTES,
+             recorder: Optional[StageRecorder] = None) -> Generator[Prefetched, None, None]:
+    """Read files ahead of their consumer on a bounded pool of I/O threads.
+
+    Yields (file path, content) in input order. At most ``depth`` files are
+    read ahead; the next one is only submitted when one is consumed, so a
+    slow consumer holds back the readers. Files larger than ``max_bytes``,
+    uncompressed, or that cannot be read yield None and are read by the
+    consumer, which then reports the error. With a ``recorder`` the time spent waiting for the
+    content is recorded as the "prefetch_wait" stage.
+    """
+    if depth <= 0:
+        yield from ((file_path, None) for file_path in files)
+        return
+
+    remaining = iter(files)
+    pending: Deque[Tuple[str, Future]] = deque()
+    executor = ThreadPoolExecutor(max_workers=min(depth, PREFETCH_MAX_THREADS),
+                                  thread_name_prefix="prefetch")
+    try:
+        for file_path in islice(remaining, depth):
+            pending.append((file_path, executor.submit(_read_ahead, file_path, max_bytes)))
+
+        while pending:
+            file_path, future = pending.popleft()
+            with stage(recorder, "prefetch_wait", file_path) as record:
+                try:
+                    content = future.result()
+                except Exception as e:
+                    # E.g. a corrupt .gz or .xz file, processing it reports the error
+                    LOGGER.debug(f"Could not prefetch {file_path}: {e}")
+                    content = None
+                record["bytes_read"] = len(content or b"")
+
+            next_file = next(remaining, None)
+            if next_file is not None:
+                pending.append((next_file, executor.submit(_read_ahead, next_file, max_bytes)))
+
+            yield file_path, content
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _process_file(file_path: str, options: ReaderOptions, cache: Optional[ParseCache],
+                  recorder: Optional[StageRecorder] = None, content: Optional[bytes] = None):
+    """Process one file, going through the parse cache if one is configured"""
+    if cache is None:
+        return process_file(file_path, options, recorder, content)
+    return cache.load_or_process(file_path, options, recorder, content)
+
+
+def _process_recorded(file_path: str, options: ReaderOptions, cache: Optional[ParseCache],
+                      content: Optional[bytes] = None, trace_memory: bool = False):
+    """Worker entry point returning the stage metrics along with the results"""
+    with StageRecorder(trace_memory) as recorder:
+        results = _process_file(file_path, options, cache, recorder, content)
+    return results, recorder.records
+
+
+def _process_sequential(files: Iterable[Prefetched], options: ReaderOptions,
+                        cache: Optional[ParseCache],
+                        recorder: Optional[StageRecorder] = None) -> Iterator[FileResult]:
+    """Process files one after another in this process"""
+    for file_path, content in files:
+        try:
+            yield file_path, _process_file(file_path, options, cache, recorder, content), None
+        except Exception as e:
+            yield file_path, None, e
+
+
+def process_files(files: Iterable[str], options: ReaderOptions, workers: int = 1,
+                  cache: Optional[ParseCache] = None,
+                  recorder: Optional[StageRecorder] = None,
+                  prefetch_depth: int = 0) -> Generator[FileResult, None, None]:
+    """Process files, yielding one result per file in input order.
+
+    ``files`` may be a lazy iterator, e.g. of discover_files; processing
+    starts with the first file while later ones are still being discovered.
+
+    With ``workers`` other than 1 the files are fanned out over a process pool
+    (0 means one worker per CPU core). Only a bounded window of files is
+    submitted ahead of the consumer, so closing the iterator (e.g. on
+    cancellation) stops the remaining work quickly. If the pool cannot be
+    used, the remaining files are processed sequentially. With a ``cache``
+    unchanged files are loaded from it instead of being parsed. With a
+    ``recorder`` the stage metrics of every file, also those measured in
+    worker processes, are added to it. With a ``prefetch_depth`` the bytes of
+    that many upcoming files are read ahead by I/O threads, see prefetch;
+    streaming mode reads files in chunks and is not prefetched.
+    """
+    depth = 0 if options.streaming else prefetch_depth
+    max_workers = workers or os.cpu_count() or 1
+    if isinstance(files, list):
+        max_workers = min(max_workers, len(files))
+    if max_workers <= 1:
+        prefetched = prefetch(files, depth, recorder=recorder)
+        try:
+            yield from _process_sequential(prefetched, options, cache, recorder)
+        finally:
+            prefetched.close()
+        return
+
+    # Each file already has its own process, splitting tables would oversubscribe the cores
+    options = replace(options, split_workers=1)
+
+    def submit(file_path, content):
+        if recorder is None:
+            return executor.submit(_process_file, file_path, options, cache, None, content)
+        return executor.submit(_process_recorded, file_path, options, cache, content,
+                               recorder.trace_memory)
+
+    remaining = prefetch(files, depth, recorder=recorder)
+    pending: Deque[Tuple[str, Future]] = deque()
+    executor = ProcessPoolExecutor(max_workers=max_workers)
+    try:
+        for file_path, content in islice(remaining, 2 * max_workers):
+            pending.append((file_path, submit(file_path, content)))
+
+        while pending:
+            file_path, future = pending.popleft()
+            try:
+                result, error = future.result(), None
+            except BrokenProcessPool as e:
+                LOGGER.warning(f"Process pool failed ({e}), continuing sequentially")
+                retry = [(file_path, None)] + [(path, None) for path, _ in pending]
+                pending.clear()
+                yield from _process_sequential(retry, options, cache, recorder)
+                yield from _process_sequential(remaining, options, cache, recorder)
+                return
+            except Exception as e:
+                result, error = None, e
+
+            if recorder is not None and result is not None:
+                result, records = result
+                recorder.records.extend(records)
+
+            upcoming = next(remaining, None)
+            if upcoming is not None:
+                pending.append((upcoming[0], submit(*upcoming)))
+
+            yield file_path, result, error
+    finally:
+        remaining.close()
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,83 @@
+"""Normalization of column names.
+
+Headers repeat across the tables and files of a batch, so cleaned names are
+memoized per raw header and the patterns are compiled once. Labels of
+multi-row headers are flattened to one name, and names that collide after
+cleaning (e.g. "Total" and "Total!") are made unique with a numeric suffix.
+"""
+
+import re
+from functools import lru_cache
+from typing import Hashable, Iterable, List
+
+# Number of distinct raw headers whose cleaned names are kept
+CACHE_SIZE = 4096
+
+_TAG_PATTERN = re.compile(r'<.*?>')
+_SPECIAL_PATTERN = re.compile(r'[^\w\s]')
+_SEPARATOR_PATTERN = re.compile(r'[\s_]+')
+
+# Placeholder labels of empty header cells, see table_extraction
+_UNNAMED_PATTERN = re.compile(r'^Unnamed: \d+(_level_\d+)?$')
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def clean_column_name(name: str) -> str:
+    """Clean column name by removing special characters"""
+    # Remove HTML tags if any
+    name = _TAG_PATTERN.sub('', name)
+    # Replace special characters with underscore
+    name = _SPECIAL_PATTERN.sub('_', name)
+    # Replace multiple spaces/underscores with single underscore
+    name = _SEPARATOR_PATTERN.sub('_', name)
+    # Remove leading/trailing underscores
+    name = name.strip('_')
+    # If empty, generate a name
+    if not name:
+        name = 'column'
+    return name
+
+
+def flatten_label(label: Hashable) -> str:
+    """Join the levels of a multi-row header label into one name.
+
+    Placeholders of empty header cells and levels repeating the previous one
+    (a cell spanning several header rows) are left out, e.g.
+    ('Region', 'Region') -> 'Region' and ('Sales', 'Q1') -> 'Sales Q1'.
+    """
+    if not isinstance(label, tuple):
+        return str(label)
+    parts: List[str] = []
+    for level in label:
+        level = str(level)
+        if _UNNAMED_PATTERN.match(level) or (parts and parts[-1] == level):
+            continue
+        parts.append(level)
+    # A column without any header text keeps its first placeholder
+    return " ".join(parts) if parts else str(label[0])
+
+
+def dedupe_names(names: Iterable[str]) -> List[str]:
+    """Make names unique, later duplicates get a suffix (Total, Total_1, ...)"""
+    names = list(names)
+    taken = set(names)
+    seen = set()
+    result = []
+    for name in names:
+        unique = name
+        suffix = 0
+        # Suffixed names must not clash with another column, e.g. one named Total_1
+        while unique in seen or (suffix and unique in taken):
+            suffix += 1
+            unique = f"{name}_{suffix}"
+        seen.add(unique)
+        result.append(unique)
+    return result
+
+
+def normalize_columns(labels: Iterable[Hashable], clean: bool = True) -> List[str]:
+    """Flatten, optionally clean, and dedupe the column labels of a table"""
+    names = [flatten_label(label) for label in labels]
+    if clean:
+        names = [clean_column_name(name) for name in names]
+    return dedupe_names(names)
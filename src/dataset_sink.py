@@ -0,0 +1,287 @@
+"""Direct output of extracted tables to a partitioned Parquet or Arrow dataset.
+
+Backfills over years of exports that only feed a data lake gain nothing
+from a node output: every table would first be collected into one
+in-memory table. The sink writes the tables of each file straight to a
+dataset folder instead, in hive style partition folders
+(``date=2024-01-31/part-....parquet``), and keeps only one manifest row per
+table. Rows are buffered per open data file until a row group is full, so
+memory is bounded by the row group size and the number of open partitions,
+not by the number of files processed.
+
+Data files are written under a name starting with ``.``, which dataset
+readers skip, and all of them are renamed once the sink is closed, so a
+failed execution leaves nothing behind that a rerun would write again;
+every execution adds files with its own run id, so existing datasets are
+appended to.
+"""
+
+import os
+import uuid
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, List, Tuple
+from urllib.parse import quote
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from arrow_output import StreamingConcat, conform, unify_schema
+from input_sources import source_mtime
+from table_extraction import Frame
+
+# Set up logging
+LOGGER = logging.getLogger(__name__)
+
+FORMAT_PARQUET = "parquet"
+FORMAT_ARROW = "arrow"
+
+PARTITION_NONE = "none"
+PARTITION_FOLDER = "folder"
+PARTITION_DATE = "date"
+PARTITION_MONTH = "month"
+
+# Codecs per format; Arrow IPC files only support these two
+PARQUET_COMPRESSIONS = ("zstd", "snappy", "lz4", "gzip", "none")
+ARROW_COMPRESSIONS = ("zstd", "lz4", "none")
+
+# A data file is closed and a new one started after this many rows
+MAX_FILE_ROWS = 1 << 24
+
+# Open data files, each holding up to a row group of buffered rows
+MAX_OPEN_FILES = 32
+
+# Arrow types of the manifest output, one row per written table
+MANIFEST_TYPES = {
+    'source_file': pa.string(),
+    'file_path': pa.string(),
+    'table_index': pa.int32(),
+    'num_rows': pa.int32(),
+    'num_cols': pa.int32(),
+    'partition': pa.string(),
+    'dataset_file': pa.string(),
+}
+
+
+@dataclass(frozen=True)
+class SinkOptions:
+    """Layout and encoding of the dataset written by DatasetSink"""
+
+    folder: str
+    format: str = FORMAT_PARQUET
+    partition_by: str = PARTITION_NONE
+    row_group_rows: int = 1 << 20
+    compression: str = "zstd"
+
+
+def _decoded(schema: pa.Schema) -> pa.Schema:
+    """Schema with dictionary columns stored as their values.
+
+    The IPC file format cannot hold a dictionary that changes between record
+    batches, which the metadata columns of consecutive files do.
+    """
+    return pa.schema([
+        (field.name, field.type.value_type if pa.types.is_dictionary(field.type) else field.type)
+        for field in schema
+    ])
+
+
+class _DataFile:
+    """An open data file of one partition, written in row groups"""
+
+    def __init__(self, path: str, schema: pa.Schema, options: SinkOptions):
+        self.path = path
+        self.schema = schema
+        self.num_rows = 0
+        self._staging = os.path.join(os.path.dirname(path), "." + os.path.basename(path))
+        self._row_group_rows = options.row_group_rows
+        self._parquet = options.format == FORMAT_PARQUET
+        compression = None if options.compression == "none" else options.compression
+        if self._parquet:
+            self._writer = pq.ParquetWriter(self._staging, schema,
+                                            compression=compression or "none")
+        else:
+            self._writer = pa.ipc.new_file(self._staging, schema,
+                                           options=pa.ipc.IpcWriteOptions(compression=compression))
+        self._buffered: List[pa.Table] = []
+        self._buffered_rows = 0
+
+    def fits(self, schema: pa.Schema) -> bool:
+        """Whether tables of a schema can be cast into the file, e.g. int into float columns"""
+        return self.num_rows < MAX_FILE_ROWS and unify_schema([self.schema, schema]) == self.schema
+
+    def write(self, table: pa.Table):
+        if table.schema != self.schema:
+            table = conform(table, self.schema)
+        self._buffered.append(table)
+        self._buffered_rows += table.num_rows
+        self.num_rows += table.num_rows
+        if self._buffered_rows >= self._row_group_rows:
+            self._flush(final=False)
+
+    def _flush(self, final: bool):
+        """Write the buffered rows as full row groups, the rest too if final"""
+        if not self._buffered_rows:
+            return
+        table = pa.concat_tables(self._buffered)
+        size = table.num_rows
+        if not final:
+            size -= size % self._row_group_rows
+        if self._parquet:
+            self._writer.write_table(table.slice(0, size), row_group_size=self._row_group_rows)
+        else:
+            self._writer.write_table(table.slice(0, size).combine_chunks(),
+                                     max_chunksize=self._row_group_rows)
+        rest = table.slice(size)
+        self._buffered = [rest] if rest.num_rows else []
+        self._buffered_rows = rest.num_rows
+
+    def finish(self):
+        """Write the remaining rows and complete the file, still under its staging name"""
+        self._flush(final=True)
+        self._writer.close()
+
+    def publish(self):
+        """Rename the finished file to its name, making it part of the dataset"""
+        os.replace(self._staging, self.path)
+
+    def abort(self):
+        """Close and delete the file, finished or not"""
+        try:
+            self._writer.close()
+        finally:
+            if os.path.exists(self._staging):
+                os.remove(self._staging)
+
+
+class DatasetSink:
+    """Writer of the tables of many files to a partitioned dataset.
+
+    ``root`` is the batch folder that ``folder`` partitions are relative to.
+    Tables of one file go to one data file; consecutive files of a partition
+    share it while their columns fit its schema, so small reports do not end
+    up as many tiny files.
+    """
+
+    def __init__(self, options: SinkOptions, root: str = ""):
+        if not options.folder:
+            raise ValueError("No dataset folder specified")
+        if options.format not in (FORMAT_PARQUET, FORMAT_ARROW):
+            raise ValueError(f"Unknown dataset format: {options.format}")
+        compressions = (PARQUET_COMPRESSIONS if options.format == FORMAT_PARQUET
+                        else ARROW_COMPRESSIONS)
+        if options.compression not in compressions:
+            raise ValueError(f"{options.format} datasets support {', '.join(compressions)} "
+                             f"compression, not {options.compression}")
+        if options.partition_by not in (PARTITION_NONE, PARTITION_FOLDER, PARTITION_DATE,
+                                        PARTITION_MONTH):
+            raise ValueError(f"Unknown dataset partitioning: {options.partition_by}")
+        self.options = options
+        self.root = root
+        self.num_rows = 0
+        self.num_tables = 0
+        self._run_id = uuid.uuid4().hex[:12]
+        self._num_files = 0
+        self._open: "OrderedDict[str, _DataFile]" = OrderedDict()
+        # Files finished early (their partition changed schema or too many were open)
+        self._finished: List[_DataFile] = []
+        self._manifest: List[Dict] = []
+
+    def partition(self, file_path: str) -> str:
+        """Partition folder of a source file, e.g. ``date=2024-01-31``, or ''"""
+        partition_by = self.options.partition_by
+        if partition_by == PARTITION_NONE:
+            return ""
+        if partition_by == PARTITION_FOLDER:
+            folder = os.path.dirname(os.path.relpath(file_path, self.root) if self.root
+                                     else file_path)
+            value = folder.replace(os.sep, "/") or "."
+        else:
+            modified = datetime.fromtimestamp(source_mtime(file_path))
+            value = modified.strftime("%Y-%m-%d" if partition_by == PARTITION_DATE else "%Y-%m")
+        # Readers decode the value, so nested folders stay one partition level
+        return f"{partition_by}={quote(value, safe='')}"
+
+    def _data_file(self, partition: str, schema: pa.Schema) -> _DataFile:
+        """The open data file of a partition, a new one if the columns do not fit"""
+        data_file = self._open.get(partition)
+        if data_file is not None:
+            if data_file.fits(schema):
+                self._open.move_to_end(partition)
+                return data_file
+            del self._open[partition]
+            data_file.finish()
+            self._finished.append(data_file)
+        elif len(self._open) >= MAX_OPEN_FILES:
+            # Least recently written partition first
+            _, oldest = self._open.popitem(last=False)
+            oldest.finish()
+            self._finished.append(oldest)
+
+        folder = os.path.join(self.options.folder, partition)
+        os.makedirs(folder, exist_ok=True)
+        extension = ".parquet" if self.options.format == FORMAT_PARQUET else ".arrow"
+        path = os.path.join(folder, f"part-{self._run_id}-{self._num_files:05d}{extension}")
+        self._num_files += 1
+        data_file = self._open[partition] = _DataFile(path, schema, self.options)
+        return data_file
+
+    def write(self, file_path: str, results: Iterable[Tuple[Frame, Dict]],
+              include_metadata: bool = True) -> int:
+        """Write the tables extracted from a file, returns the number of rows written.
+
+        With ``include_metadata`` the rows carry the metadata columns, as in
+        the node output.
+        """
+        results = list(results)
+        if not results:
+            return 0
+        concat = StreamingConcat()
+        for table, metadata in results:
+            concat.add(table, metadata if include_metadata else None)
+        schema = concat.schema
+        if self.options.format == FORMAT_ARROW:
+            schema = _decoded(schema)
+
+        partition = self.partition(file_path)
+        data_file = self._data_file(partition, schema)
+        num_rows = concat.num_rows
+        for batch in concat.iter_batches():
+            data_file.write(pa.Table.from_batches([batch]))
+
+        self.num_rows += num_rows
+        self.num_tables += len(results)
+        self._manifest.extend({**{key: metadata.get(key) for key in MANIFEST_TYPES},
+                               'partition': partition, 'dataset_file': data_file.path}
+                              for _, metadata in results)
+        return num_rows
+
+    def close(self):
+        """Complete all data files and publish them under their names"""
+        while self._open:
+            _, data_file = self._open.popitem(last=False)
+            data_file.finish()
+            self._finished.append(data_file)
+        for data_file in self._finished:
+            data_file.publish()
+        self._finished = []
+
+    def abort(self):
+        """Delete every data file not yet published, so no rows of the run are kept"""
+        data_files = list(self._open.values()) + self._finished
+        self._open.clear()
+        self._finished = []
+        for data_file in data_files:
+            try:
+                data_file.abort()
+            except OSError as e:
+                LOGGER.warning(f"Could not remove incomplete file {data_file.path}: {e}")
+
+    def manifest_table(self) -> pa.Table:
+        """One row per written table with its partition and data file"""
+        return pa.table({
+            key: pa.array([row[key] for row in self._manifest], data_type)
+            for key, data_type in MANIFEST_TYPES.items()
+        })
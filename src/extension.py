@@ -1,14 +1,39 @@
 import os
+import time
 import logging
+from dataclasses import replace
 import pandas as pd
 import numpy as np
+import pyarrow as pa
 from pathlib import Path
-from typing import List, Dict, Union, Optional, Tuple
-import chardet
-from bs4 import BeautifulSoup
+from itertools import chain, islice
+from typing import Iterator, List, Dict, Union, Optional, Tuple
 import warnings
 import knime.extension as knext
 
+from arrow_output import (
+    METADATA_TYPES, TABLE_ID_TYPES, StreamingConcat, append_metadata, metadata_table,
+)
+from batch_processing import process_files
+from column_names import clean_column_name
+from dataset_sink import MANIFEST_TYPES, DatasetSink, SinkOptions
+from file_reader import (
+    ReaderOptions,
+    clean_dataframe,
+    clear_encoding_memo,
+    detect_encoding,
+    extract_clean_tables,
+    process_file,
+    read_html_xls,
+)
+from file_discovery import discover_files, parse_modified_since, split_patterns
+from incremental import IngestManifest, default_state_dir
+from input_sources import source_exists
+from metrics import METRICS_COLUMNS, StageRecorder, stage
+from parse_cache import ParseCache
+from schema_inference import infer_schema, sample_tables
+from table_extraction import ParseOptions
+
 # Set up logging
 LOGGER = logging.getLogger(__name__)
 
@@ -21,6 +46,20 @@ html_category = knext.category(
     icon="icon.png",
 )
 
+def _knime_type(data_type: pa.DataType):
+    """KNIME column type for an Arrow type of the extracted tables"""
+    if pa.types.is_int32(data_type):
+        return knext.int32()
+    if pa.types.is_integer(data_type):
+        return knext.int64()
+    if pa.types.is_floating(data_type):
+        return knext.double()
+    if pa.types.is_boolean(data_type):
+        return knext.bool_()
+    if pa.types.is_timestamp(data_type):
+        return knext.datetime()
+    return knext.string()
+
 @knext.parameter_group(label="File Selection")
 class FileSelectionSettings:
     """Settings for file selection and batch processing"""
@@ -45,15 +84,95 @@ class FileSelectionSettings:
     
     file_pattern = knext.StringParameter(
         "File Pattern",
-        "Pattern to match files (e.g., *.xls, report_*.xls)",
+        "Pattern to match files (e.g., *.xls, report_*.xls). Separate several patterns with "
+        "commas.",
         "*.xls",
     ).rule(knext.OneOf(batch_mode, [True]), knext.Effect.SHOW)
     
+    exclude_pattern = knext.StringParameter(
+        "Exclude Pattern",
+        "Comma-separated patterns of files to skip (e.g., ~$*, *_backup.xls). Patterns containing "
+        "a '/' match the path relative to the folder; '**/' also matches no folder, so "
+        "'**/~$*' skips such files at the top too.",
+        "",
+    ).rule(knext.OneOf(batch_mode, [True]), knext.Effect.SHOW)
+    
     recursive = knext.BoolParameter(
         "Recursive Search",
         "Search for files recursively in subdirectories.",
         False,
     ).rule(knext.OneOf(batch_mode, [True]), knext.Effect.SHOW)
+    
+    read_archives = knext.BoolParameter(
+        "Read Archives and Compressed Files",
+        "Read the files inside zip and tar archives (.zip, .tar, .tar.gz, .tgz, .tar.bz2, .tar.xz) "
+        "and match compressed files (.gz, .bz2, .xz, .zst) by their name without the "
+        "compression suffix, e.g. report.xls.gz by *.xls. Files are read straight from the "
+        "archive and decompressed while reading, nothing is extracted to disk. The patterns "
+        "and filters apply to the files inside archives; their paths are reported as "
+        "archive.zip!/member.xls.",
+        False,
+    ).rule(knext.OneOf(batch_mode, [True]), knext.Effect.SHOW)
+    
+    min_size_kb = knext.IntParameter(
+        "Minimum File Size (KB)",
+        "Skip files smaller than this size. 0 disables the limit.",
+        0,
+        min_value=0,
+    ).rule(knext.OneOf(batch_mode, [True]), knext.Effect.SHOW)
+    
+    max_size_kb = knext.IntParameter(
+        "Maximum File Size (KB)",
+        "Skip files larger than this size. 0 disables the limit.",
+        0,
+        min_value=0,
+    ).rule(knext.OneOf(batch_mode, [True]), knext.Effect.SHOW)
+    
+    modified_since = knext.StringParameter(
+        "Modified Since",
+        "Only process files modified at or after this date (e.g., 2024-01-31 or 2024-01-31T08:00). "
+        "Leave empty to process all files.",
+        "",
+    ).rule(knext.OneOf(batch_mode, [True]), knext.Effect.SHOW)
+    
+    max_files = knext.IntParameter(
+        "Maximum Files",
+        "Process at most this many files, in name order. 0 processes all matching files. "
+        "In incremental mode the limit applies to the new or modified files.",
+        0,
+        min_value=0,
+    ).rule(knext.OneOf(batch_mode, [True]), knext.Effect.SHOW)
+    
+    name_order = knext.BoolParameter(
+        "Process in Name Order",
+        "Visit the files of each folder in name order, so the output order is deterministic. "
+        "A folder is then listed completely before its first file is processed; disable for "
+        "folders with very many files to start right away, in the order the file system "
+        "lists them.",
+        True,
+    ).rule(knext.OneOf(batch_mode, [True]), knext.Effect.SHOW)
+    
+    incremental = knext.BoolParameter(
+        "Incremental Mode",
+        "Only process files that are new or modified since the last execution. "
+        "Ingested files are tracked in a manifest (path, size, modification time, row counts).",
+        False,
+    ).rule(knext.OneOf(batch_mode, [True]), knext.Effect.SHOW)
+    
+    incremental_output = knext.StringParameter(
+        "Incremental Output",
+        "'delta' outputs only the newly ingested tables, 'merged' merges them into the "
+        "persisted result of earlier executions.",
+        "delta",
+        enum=["delta", "merged"]
+    ).rule(knext.OneOf(incremental, [True]), knext.Effect.SHOW)
+    
+    state_folder = knext.StringParameter(
+        "Incremental State Folder",
+        "Folder holding the manifest and the persisted result. Leave empty to use a folder "
+        "in the system temp folder derived from the input folder and file pattern.",
+        "",
+    ).rule(knext.OneOf(incremental, [True]), knext.Effect.SHOW)
 
 @knext.parameter_group(label="Table Parsing Options")
 class ParsingSettings:
@@ -111,6 +230,80 @@ class ParsingSettings:
         "Comma-separated list of strings to treat as missing values.",
         "NA,N/A,null,NULL,None,NONE"
     )
+    
+    parser_backend = knext.StringParameter(
+        "Parser Backend",
+        "HTML parser used to read the tables. 'auto' parses with the fast lxml parser and checks "
+        "that every table and row of the markup was found; files where lxml loses some are "
+        "parsed again with html5lib, then html.parser. The backend that worked is remembered per "
+        "folder and tried right after lxml for its other files. Streaming mode always uses "
+        "lxml in 'auto'.",
+        "auto",
+        enum=["auto", "lxml", "html5lib", "html.parser"]
+    )
+    
+    fill_merged = knext.BoolParameter(
+        "Repeat Merged Cell Values",
+        "Repeat the value of a merged data cell (colspan/rowspan) in every column and row it "
+        "covers. If unchecked, only the first covered cell holds the value and the others are "
+        "missing. Merged header cells always name every column they cover.",
+        True
+    )
+    
+    strip_office = knext.BoolParameter(
+        "Strip Office Formatting",
+        "Drop the formatting markup of files exported by Excel or other Office programs before "
+        "parsing: style blocks, conditional comments, XML islands and the class, style (mso-) "
+        "and x: attributes of every cell. Parsing is faster and the data is the same. Other "
+        "files are not changed.",
+        True
+    )
+    
+    office_numbers = knext.BoolParameter(
+        "Use Unformatted Office Numbers",
+        "Read numeric cells of Office exports from their unformatted value (the x:num "
+        "attribute) instead of their displayed text, so e.g. '$1,234.50' is read as 1234.5 and "
+        "'17.9%' as 0.179. Dates and times keep their displayed text.",
+        False
+    )
+    
+    max_rows = knext.IntParameter(
+        "Max Rows per Table",
+        "Read at most this many data rows of each table; parsing of a table stops once it has "
+        "enough rows. 0 reads all rows.",
+        0,
+        min_value=0
+    )
+    
+    sample_fraction = knext.DoubleParameter(
+        "Sample Fraction",
+        "Share of the data rows kept, chosen at random while parsing (e.g. 0.01 for 1%). "
+        "Rows that are not sampled are never built. 1 keeps all rows.",
+        1.0,
+        min_value=0.0001,
+        max_value=1.0
+    )
+    
+    reservoir_sample = knext.BoolParameter(
+        "Random Sample of Max Rows",
+        "Instead of the first rows, keep a uniform random sample of Max Rows per Table rows from "
+        "the whole table (reservoir sampling). The whole table is parsed, but only the sample is "
+        "held.",
+        False
+    )
+    
+    sample_seed = knext.IntParameter(
+        "Sample Seed",
+        "Seed of the random row sampling, so samples can be reproduced.",
+        0
+    )
+    
+    coerce_types = knext.BoolParameter(
+        "Coerce Types",
+        "Convert text columns to numbers or dates when every value allows it, stripping currency "
+        "symbols and percent signs and handling swapped locale separators (e.g. 1.050,00).",
+        False
+    )
 
 @knext.parameter_group(label="Table Selection GUI", is_advanced=True)
 class GUISettings:
@@ -146,6 +339,13 @@ class OutputSettings:
         True
     )
     
+    metadata_table = knext.BoolParameter(
+        "Separate Metadata Table",
+        "Output the metadata once per table in the third port and add only a compact "
+        "table_id column to the rows. Ignored for merged incremental output.",
+        False
+    ).rule(knext.OneOf(include_metadata, [True]), knext.Effect.SHOW)
+    
     clean_column_names = knext.BoolParameter(
         "Clean Column Names",
         "Clean column names (remove special characters, spaces).",
@@ -164,6 +364,151 @@ class OutputSettings:
         True
     )
 
+@knext.parameter_group(label="Performance", is_advanced=True)
+class PerformanceSettings:
+    """Options for reading large files and batches efficiently"""
+    
+    streaming = knext.BoolParameter(
+        "Streaming Mode",
+        "Read files in chunks and emit each table, or each batch of rows of a very large table, "
+        "as soon as it has been parsed. Keeps memory bounded for very large files.",
+        False
+    )
+    
+    stream_batch_rows = knext.IntParameter(
+        "Rows per Batch",
+        "Number of parsed rows of one table held as Python values before they are packed into "
+        "compact Arrow string columns. Each table is still converted and output as a whole.",
+        100000,
+        min_value=100
+    ).rule(knext.OneOf(streaming, [True]), knext.Effect.SHOW)
+    
+    parallel_workers = knext.IntParameter(
+        "Parallel Workers",
+        "Number of worker processes used to process files in batch mode. "
+        "1 processes files sequentially, 0 uses one worker per CPU core.",
+        1,
+        min_value=0
+    )
+    
+    split_workers = knext.IntParameter(
+        "Workers per Large Table",
+        "Number of processes parsing row ranges of one very large table (32 MB and more) in "
+        "parallel, e.g. a single export holding millions of rows. 1 parses every table in one "
+        "process, 0 uses one process per CPU core. Tables with rowspans or nested tables in their "
+        "data rows are parsed in one process. Not used with parallel workers or streaming mode.",
+        1,
+        min_value=0
+    )
+    
+    prefetch_depth = knext.IntParameter(
+        "Prefetch Depth",
+        "Number of upcoming files whose bytes are read ahead by background I/O threads in batch "
+        "mode while earlier files are parsed. Helps on network shares where every read blocks. "
+        "0 disables prefetching; memory grows with the depth times the file size.",
+        0,
+        min_value=0,
+        max_value=64
+    )
+    
+    arrow_output = knext.BoolParameter(
+        "Arrow-Native Output",
+        "Convert parsed cells straight into Arrow columns and write the output in record batches, "
+        "without building pandas DataFrames. Lowers peak memory for large batch runs.",
+        False
+    )
+    
+    collect_metrics = knext.BoolParameter(
+        "Collect Stage Metrics",
+        "Time each processing stage (encoding detection, reading, extraction, cleaning, cache, "
+        "output) per file and output the measurements in the second port and as flow variables.",
+        False
+    )
+    
+    trace_memory = knext.BoolParameter(
+        "Trace Python Memory",
+        "Also measure the peak Python allocations of each stage. Tracing slows parsing down "
+        "several times, so stage times of such a run are not comparable with runs without it; "
+        "measure times and memory in separate executions.",
+        False
+    ).rule(knext.OneOf(collect_metrics, [True]), knext.Effect.SHOW)
+    
+    compact_dtypes = knext.BoolParameter(
+        "Compact Column Types",
+        "Store columns in the smallest type that keeps every value: int32 instead of int64, "
+        "float32 where no precision is lost and categories for repetitive text.",
+        False
+    )
+    
+    use_cache = knext.BoolParameter(
+        "Use Parse Cache",
+        "Cache extracted tables on disk, keyed by file path, size, modification time and "
+        "the parsing options. Unchanged files are loaded from the cache instead of being parsed.",
+        False
+    )
+    
+    cache_dir = knext.StringParameter(
+        "Cache Folder",
+        "Folder holding the parse cache. Leave empty to use the system temp folder.",
+        ""
+    ).rule(knext.OneOf(use_cache, [True]), knext.Effect.SHOW)
+    
+    cache_size_mb = knext.IntParameter(
+        "Cache Size Limit (MB)",
+        "Maximum size of the parse cache. Least recently used entries are removed after each "
+        "execution.",
+        1024,
+        min_value=1
+    ).rule(knext.OneOf(use_cache, [True]), knext.Effect.SHOW)
+
+@knext.parameter_group(label="Dataset Output", is_advanced=True)
+class DatasetSettings:
+    """Options for writing the rows straight to a Parquet or Arrow dataset"""
+    
+    write_dataset = knext.BoolParameter(
+        "Write to Dataset",
+        "Write the tables of each file straight to a partitioned Parquet or Arrow IPC dataset "
+        "instead of the output table, which then lists one row per written table (manifest). "
+        "Memory stays bounded however many files are processed. Merged incremental output "
+        "and the separate metadata table are not used.",
+        False
+    )
+    
+    dataset_folder = knext.StringParameter(
+        "Dataset Folder",
+        "Folder of the dataset. Every execution adds new data files, existing files are kept.",
+        ""
+    ).rule(knext.OneOf(write_dataset, [True]), knext.Effect.SHOW)
+    
+    dataset_format = knext.StringParameter(
+        "Dataset Format",
+        "'parquet' writes Parquet files, 'arrow' Arrow IPC (Feather) files.",
+        "parquet",
+        enum=["parquet", "arrow"]
+    ).rule(knext.OneOf(write_dataset, [True]), knext.Effect.SHOW)
+    
+    partition_by = knext.StringParameter(
+        "Partition By",
+        "Hive style partition folders: 'folder' by the folder of the file relative to the batch "
+        "folder, 'date' and 'month' by the modification time of the file.",
+        "none",
+        enum=["none", "folder", "date", "month"]
+    ).rule(knext.OneOf(write_dataset, [True]), knext.Effect.SHOW)
+    
+    row_group_rows = knext.IntParameter(
+        "Rows per Row Group",
+        "Rows buffered per data file and written as one Parquet row group or Arrow record batch.",
+        1048576,
+        min_value=1000
+    ).rule(knext.OneOf(write_dataset, [True]), knext.Effect.SHOW)
+    
+    compression = knext.StringParameter(
+        "Compression",
+        "Compression codec of the data files. Arrow files support zstd, lz4 and none.",
+        "zstd",
+        enum=["zstd", "snappy", "lz4", "gzip", "none"]
+    ).rule(knext.OneOf(write_dataset, [True]), knext.Effect.SHOW)
+
 @knext.node(
     name="HTML-XLS Table Reader",
     node_type=knext.NodeType.SOURCE,
@@ -174,6 +519,17 @@ class OutputSettings:
     name="Extracted Tables",
     description="Tables extracted from HTML-XLS files"
 )
+@knext.output_table(
+    name="Stage Metrics",
+    description="One row per file and processing stage with wall time, bytes read, rows and "
+                "memory, plus one row per extracted table. Empty unless Collect Stage Metrics is "
+                "enabled."
+)
+@knext.output_table(
+    name="Table Metadata",
+    description="One row per extracted table with its table_id, source file, path, table index "
+                "and size. Empty unless Separate Metadata Table is enabled."
+)
 class HTMLXLSReaderNode:
     """Read HTML tables from XLS files.
     
@@ -193,204 +549,223 @@ class HTMLXLSReaderNode:
     parsing_settings = ParsingSettings()
     gui_settings = GUISettings()
     output_settings = OutputSettings()
+    performance_settings = PerformanceSettings()
+    dataset_settings = DatasetSettings()
     
     def _detect_encoding(self, file_path: str) -> str:
         """Detect file encoding automatically"""
-        try:
-            with open(file_path, 'rb') as f:
-                raw_data = f.read(10000)  # Read first 10KB
-                result = chardet.detect(raw_data)
-                encoding = result['encoding']
-                confidence = result['confidence']
-                
-                LOGGER.info(f"Detected encoding: {encoding} (confidence: {confidence:.2f})")
-                
-                if confidence < 0.7:
-                    LOGGER.warning("Low confidence in encoding detection, using utf-8")
-                    return 'utf-8'
-                
-                return encoding or 'utf-8'
-        except Exception as e:
-            LOGGER.error(f"Error detecting encoding: {e}")
-            return 'utf-8'
+        return detect_encoding(file_path)
     
     def _read_html_xls(self, file_path: str) -> str:
         """Read HTML content from XLS file"""
-        encoding = self.parsing_settings.encoding
-        
-        if encoding == 'auto':
-            encoding = self._detect_encoding(file_path)
-        
-        try:
-            with open(file_path, 'r', encoding=encoding) as f:
-                content = f.read()
-            return content
-        except UnicodeDecodeError:
-            LOGGER.warning(f"Failed to read with {encoding}, trying latin-1")
-            with open(file_path, 'r', encoding='latin-1') as f:
-                return f.read()
+        return read_html_xls(file_path, self.parsing_settings.encoding)
+    
+    def _parse_options(self) -> ParseOptions:
+        """Snapshot the parsing settings for the extraction engine"""
+        return ParseOptions(
+            header_rows=self.parsing_settings.header_rows,
+            skip_rows=self.parsing_settings.skip_rows,
+            thousands=self.parsing_settings.thousands_sep,
+            decimal=self.parsing_settings.decimal_sep,
+            na_values=tuple(v.strip() for v in self.parsing_settings.na_values.split(',')),
+            parse_dates=self.parsing_settings.parse_dates,
+            max_rows=self.parsing_settings.max_rows,
+            sample_fraction=self.parsing_settings.sample_fraction,
+            reservoir=self.parsing_settings.reservoir_sample,
+            sample_seed=self.parsing_settings.sample_seed,
+            fill_merged=self.parsing_settings.fill_merged,
+            engine=self.parsing_settings.parser_backend,
+            strip_office=self.parsing_settings.strip_office,
+            office_numbers=self.parsing_settings.office_numbers,
+        )
+    
+    def _reader_options(self) -> ReaderOptions:
+        """Snapshot the settings needed to process a file, e.g. in a worker process"""
+        return ReaderOptions(
+            encoding=self.parsing_settings.encoding,
+            table_index=self.parsing_settings.table_index,
+            parse=self._parse_options(),
+            clean_column_names=self.output_settings.clean_column_names,
+            drop_empty_rows=self.output_settings.drop_empty_rows,
+            drop_empty_cols=self.output_settings.drop_empty_cols,
+            streaming=self.performance_settings.streaming,
+            stream_batch_rows=self.performance_settings.stream_batch_rows,
+            arrow_output=self.performance_settings.arrow_output,
+            coerce_types=self.parsing_settings.coerce_types,
+            compact_dtypes=self.performance_settings.compact_dtypes,
+            collect_metrics=self.performance_settings.collect_metrics,
+            split_workers=self.performance_settings.split_workers,
+        )
+    
+    def _parse_cache(self) -> Optional[ParseCache]:
+        """Create the on-disk parse cache if enabled"""
+        if not self.performance_settings.use_cache:
+            return None
+        return ParseCache(self.performance_settings.cache_dir,
+                          self.performance_settings.cache_size_mb * 1024 * 1024)
+    
+    def _dataset_sink(self) -> Optional[DatasetSink]:
+        """Create the dataset sink if the rows are written to a dataset"""
+        settings = self.dataset_settings
+        if not settings.write_dataset:
+            return None
+        options = SinkOptions(
+            folder=settings.dataset_folder,
+            format=settings.dataset_format,
+            partition_by=settings.partition_by,
+            row_group_rows=settings.row_group_rows,
+            compression=settings.compression,
+        )
+        # Folder partitions are relative to the batch folder
+        if self.file_settings.batch_mode:
+            return DatasetSink(options, self.file_settings.folder_path)
+        return DatasetSink(options, os.path.dirname(self.file_settings.file_path))
+    
+    def _ingest_manifest(self) -> IngestManifest:
+        """Load the manifest of files ingested by earlier executions"""
+        state_dir = self.file_settings.state_folder or default_state_dir(
+            self.file_settings.folder_path, self.file_settings.file_pattern)
+        # Output changes with any of these settings, so they invalidate the manifest
+        options_key = repr((self._reader_options(), self.output_settings.include_metadata,
+                            self.output_settings.metadata_table))
+        manifest = IngestManifest(state_dir, options_key)
+        manifest.load()
+        return manifest
     
     def _extract_tables(self, html_content: str) -> List[pd.DataFrame]:
         """Extract tables from HTML content"""
-        soup = BeautifulSoup(html_content, 'html.parser')
-        tables = soup.find_all('table')
-        
-        if not tables:
-            raise ValueError("No tables found in the HTML content")
-        
-        extracted_tables = []
-        na_values = [v.strip() for v in self.parsing_settings.na_values.split(',')]
-        
-        for i, table in enumerate(tables):
-            try:
-                # Convert HTML table to pandas DataFrame
-                df = pd.read_html(
-                    str(table),
-                    header=list(range(self.parsing_settings.header_rows)) if self.parsing_settings.header_rows > 0 else None,
-                    skiprows=self.parsing_settings.skip_rows,
-                    thousands=self.parsing_settings.thousands_sep,
-                    decimal=self.parsing_settings.decimal_sep,
-                    parse_dates=self.parsing_settings.parse_dates,
-                    na_values=na_values
-                )[0]
-                
-                # Clean the dataframe
-                df = self._clean_dataframe(df)
-                
-                extracted_tables.append(df)
-                
-            except Exception as e:
-                LOGGER.warning(f"Failed to parse table {i}: {e}")
-                continue
-        
-        return extracted_tables
+        return extract_clean_tables(html_content, self._reader_options())
     
     def _clean_dataframe(self, df: pd.DataFrame) -> pd.DataFrame:
         """Clean and format the dataframe"""
-        # Drop empty rows
-        if self.output_settings.drop_empty_rows:
-            df = df.dropna(how='all')
-        
-        # Drop empty columns
-        if self.output_settings.drop_empty_cols:
-            df = df.dropna(axis=1, how='all')
-        
-        # Clean column names
-        if self.output_settings.clean_column_names:
-            df.columns = [self._clean_column_name(str(col)) for col in df.columns]
-        
-        # Reset index
-        df = df.reset_index(drop=True)
-        
-        return df
+        return clean_dataframe(df, self._reader_options())
     
     def _clean_column_name(self, name: str) -> str:
         """Clean column name by removing special characters"""
-        import re
-        # Remove HTML tags if any
-        name = re.sub('<.*?>', '', name)
-        # Replace special characters with underscore
-        name = re.sub(r'[^\w\s]', '_', name)
-        # Replace multiple spaces/underscores with single underscore
-        name = re.sub(r'[\s_]+', '_', name)
-        # Remove leading/trailing underscores
-        name = name.strip('_')
-        # If empty, generate a name
-        if not name:
-            name = 'column'
-        return name
+        return clean_column_name(name)
     
     def _process_single_file(self, file_path: str) -> List[Tuple[pd.DataFrame, Dict]]:
         """Process a single HTML-XLS file"""
-        LOGGER.info(f"Processing file: {file_path}")
-        
-        # Read HTML content
-        html_content = self._read_html_xls(file_path)
+        cache = self._parse_cache()
+        if cache is not None:
+            return cache.load_or_process(file_path, self._reader_options())
+        return process_file(file_path, self._reader_options())
+    
+    def _discover_files(self) -> Iterator[str]:
+        """Lazily walk the batch folder, applying the pattern and filter settings"""
+        settings = self.file_settings
+        return discover_files(
+            settings.folder_path,
+            split_patterns(settings.file_pattern),
+            split_patterns(settings.exclude_pattern),
+            recursive=settings.recursive,
+            min_size=settings.min_size_kb * 1024,
+            max_size=settings.max_size_kb * 1024,
+            modified_since=parse_modified_since(settings.modified_since),
+            # Incremental mode limits the files left after skipping unchanged ones
+            max_files=0 if settings.incremental else settings.max_files,
+            archives=settings.read_archives,
+            ordered=settings.name_order,
+        )
+    
+    def _iter_files_to_process(self, exec_context) -> Iterator[str]:
+        """Files to process based on settings, discovered lazily in batch mode"""
+        if self.file_settings.batch_mode:
+            # Batch mode - process folder
+            folder = Path(self.file_settings.folder_path)
+            if not folder.exists():
+                raise ValueError(f"Folder does not exist: {folder}")
+            
+            files = self._discover_files()
+            first = next(files, None)
+            if first is None:
+                pattern = self.file_settings.file_pattern
+                raise ValueError(f"No files matching pattern '{pattern}' found in {folder}")
+            return chain([first], files)
         
-        # Extract tables
-        tables = self._extract_tables(html_content)
+        # Single file mode
+        file_path = self.file_settings.file_path
         
-        if not tables:
-            raise ValueError(f"No valid tables found in {file_path}")
+        # Check flow variables
+        if not file_path and 'file_path' in exec_context.flow_variables:
+            file_path = exec_context.flow_variables['file_path']
         
-        # Filter tables based on index
-        if self.parsing_settings.table_index >= 0:
-            if self.parsing_settings.table_index >= len(tables):
-                raise ValueError(f"Table index {self.parsing_settings.table_index} out of range. "
-                               f"File contains {len(tables)} tables.")
-            tables = [tables[self.parsing_settings.table_index]]
+        if not file_path:
+            raise ValueError("No file path specified")
         
-        # Add metadata
-        results = []
-        for i, table in enumerate(tables):
-            metadata = {
-                'source_file': os.path.basename(file_path),
-                'file_path': file_path,
-                'table_index': i,
-                'num_rows': len(table),
-                'num_cols': len(table.columns)
-            }
-            results.append((table, metadata))
+        if not source_exists(file_path):
+            raise ValueError(f"File does not exist: {file_path}")
         
-        return results
+        return iter([file_path])
     
     def _get_files_to_process(self, exec_context) -> List[str]:
         """Get list of files to process based on settings"""
-        files = []
-        
-        if self.file_settings.batch_mode:
-            # Batch mode - process folder
-            folder = Path(self.file_settings.folder_path)
-            if not folder.exists():
-                raise ValueError(f"Folder does not exist: {folder}")
-            
-            pattern = self.file_settings.file_pattern
-            if self.file_settings.recursive:
-                files = list(folder.rglob(pattern))
-            else:
-                files = list(folder.glob(pattern))
-            
-            files = [str(f) for f in files if f.is_file()]
-            
-            if not files:
-                raise ValueError(f"No files matching pattern '{pattern}' found in {folder}")
-                
-        else:
-            # Single file mode
-            file_path = self.file_settings.file_path
-            
-            # Check flow variables
-            if not file_path and 'file_path' in exec_context.flow_variables:
-                file_path = exec_context.flow_variables['file_path']
-            
-            if not file_path:
-                raise ValueError("No file path specified")
-            
-            if not os.path.exists(file_path):
-                raise ValueError(f"File does not exist: {file_path}")
-            
-            files = [file_path]
+        return list(self._iter_files_to_process(exec_context))
+    
+    def _schema_file(self) -> Optional[str]:
+        """File the output schema is inferred from, the first one in batch mode"""
+        if not self.file_settings.batch_mode:
+            return self.file_settings.file_path or None
         
-        return files
+        if not self.file_settings.folder_path or not os.path.isdir(self.file_settings.folder_path):
+            return None
+        return next(self._discover_files(), None)
+    
+    def _separate_metadata(self) -> bool:
+        """Whether metadata goes to its own table, merged output keeps it in the rows"""
+        merged = (self.file_settings.incremental
+                  and self.file_settings.incremental_output == "merged")
+        return (self.output_settings.include_metadata and self.output_settings.metadata_table
+                and not (self.file_settings.batch_mode and merged)
+                and not self.dataset_settings.write_dataset)
+    
+    def _infer_schema(self, file_path: str) -> pa.Schema:
+        """Output schema inferred from the header and a sample of rows"""
+        return infer_schema(file_path, self._reader_options(),
+                            self.output_settings.include_metadata,
+                            separate_metadata=self._separate_metadata())
+    
+    def _expected_schema(self, file_path: Optional[str]) -> Optional[pa.Schema]:
+        """Schema announced in configure, so the output keeps its columns"""
+        if file_path is None:
+            return None
+        try:
+            # Memoized by configure, usually no parsing happens here
+            return self._infer_schema(file_path)
+        except Exception:
+            return None
     
     def configure(self, config_context):
         """Configure the node"""
-        # Create output schema
-        columns = []
-        
-        # Add metadata columns if enabled
-        if self.output_settings.include_metadata:
-            columns.extend([
-                knext.Column(knext.string(), "source_file"),
-                knext.Column(knext.string(), "file_path"),
-                knext.Column(knext.int32(), "table_index"),
-                knext.Column(knext.int32(), "num_rows"),
-                knext.Column(knext.int32(), "num_cols")
-            ])
+        # Infer the real columns from a cheap sniff of the file
+        file_path = None if self.dataset_settings.write_dataset else self._schema_file()
+        if self.dataset_settings.write_dataset:
+            # The rows go to the dataset, the output lists the written tables
+            columns = [knext.Column(_knime_type(data_type), name)
+                       for name, data_type in MANIFEST_TYPES.items()]
+        elif file_path and source_exists(file_path):
+            try:
+                schema = self._infer_schema(file_path)
+                columns = [knext.Column(_knime_type(field.type), field.name) for field in schema]
+            except Exception as e:
+                LOGGER.warning(f"Could not infer columns from {file_path}: {e}")
+                columns = []
+        else:
+            columns = []
         
-        # We can't determine the actual table columns until execution
-        # So we'll add a placeholder column
-        columns.append(knext.Column(knext.string(), "data"))
+        if not columns:
+            # Without a readable file the columns are unknown until execution
+            if self._separate_metadata():
+                columns.append(knext.Column(knext.int32(), "table_id"))
+            elif self.output_settings.include_metadata:
+                columns.extend([
+                    knext.Column(knext.string(), "source_file"),
+                    knext.Column(knext.string(), "file_path"),
+                    knext.Column(knext.int32(), "table_index"),
+                    knext.Column(knext.int32(), "num_rows"),
+                    knext.Column(knext.int32(), "num_cols")
+                ])
+            columns.append(knext.Column(knext.string(), "data"))
         
         schema = knext.Schema(columns)
         
@@ -403,23 +778,31 @@ class HTMLXLSReaderNode:
             except Exception as e:
                 config_context.set_warning(f"Could not generate preview: {str(e)}")
         
-        return schema
+        metrics_schema = knext.Schema([
+            knext.Column(_knime_type(data_type), name)
+            for name, data_type in METRICS_COLUMNS.items()
+        ])
+        
+        table_metadata_schema = knext.Schema([
+            knext.Column(_knime_type(data_type), name)
+            for name, data_type in {**TABLE_ID_TYPES, **METADATA_TYPES}.items()
+        ])
+        
+        return schema, metrics_schema, table_metadata_schema
     
     def _show_preview(self, file_path: str):
         """Show preview of available tables"""
         try:
-            html_content = self._read_html_xls(file_path)
-            soup = BeautifulSoup(html_content, 'html.parser')
-            tables = soup.find_all('table')
+            # Only the first rows of the first 3 tables are parsed
+            options = replace(self._reader_options(), table_index=-1)
+            tables = sample_tables(file_path, options, self.gui_settings.preview_rows, max_tables=3)
             
-            LOGGER.info(f"Found {len(tables)} tables in file")
-            
-            for i, table in enumerate(tables[:3]):  # Show first 3 tables
+            for i, table in tables:
                 try:
-                    df = pd.read_html(str(table))[0]
-                    LOGGER.info(f"\nTable {i}: {df.shape[0]} rows × {df.shape[1]} columns")
+                    df = table.to_pandas()
+                    LOGGER.info(f"\nTable {i}: {df.shape[1]} columns")
                     LOGGER.info(f"Columns: {list(df.columns)[:5]}...")
-                    LOGGER.info(f"Preview:\n{df.head(self.gui_settings.preview_rows)}")
+                    LOGGER.info(f"Preview:\n{df}")
                 except Exception as e:
                     LOGGER.warning(f"Could not preview table {i}: {e}")
                     
@@ -428,48 +811,162 @@ class HTMLXLSReaderNode:
     
     def execute(self, exec_context):
         """Execute the node"""
-        # Get files to process
-        files = self._get_files_to_process(exec_context)
+        start_time = time.perf_counter()
+        recorder = (StageRecorder(self.performance_settings.trace_memory)
+                    if self.performance_settings.collect_metrics else None)
         
-        LOGGER.info(f"Processing {len(files)} file(s)")
+        # Encodings detected in earlier executions may be outdated
+        clear_encoding_memo()
         
-        all_results = []
+        # Files are discovered lazily, processing starts with the first one found
+        files = self._iter_files_to_process(exec_context)
         
-        # Process each file
-        for file_path in files:
-            try:
-                results = self._process_single_file(file_path)
-                
-                for df, metadata in results:
-                    if self.output_settings.include_metadata:
-                        # Add metadata columns to dataframe
-                        for key, value in metadata.items():
-                            df[key] = value
-                    
-                    all_results.append(df)
-                    
-            except Exception as e:
-                LOGGER.error(f"Error processing {file_path}: {e}")
-                if not self.file_settings.batch_mode:
-                    raise
+        # Incremental mode skips files already ingested unchanged
+        manifest = None
+        skipped = []
+        if self.file_settings.batch_mode and self.file_settings.incremental:
+            manifest = self._ingest_manifest()
+            changed, skipped = manifest.split(list(files))
+            files = islice(changed, self.file_settings.max_files or None)
+            LOGGER.info(f"Skipping {len(skipped)} unchanged file(s)")
+        
+        first_file = next(files, None)
+        found = 0
+        
+        def counted(paths):
+            nonlocal found
+            for path in paths:
+                found += 1
+                yield path
+        
+        files = counted(chain([first_file], files) if first_file is not None else files)
+        
+        # Rows written to a dataset never reach the output table
+        sink = self._dataset_sink()
+        
+        # Tables are concatenated as they arrive, only merged output needs them all
+        merged = (manifest is not None and self.file_settings.incremental_output == "merged"
+                  and sink is None)
+        # Without changed files the first file found still carries the announced columns
+        concat = StreamingConcat(None if merged or sink is not None
+                                 else self._expected_schema(first_file or self._schema_file()))
+        merge_frames = []
+        separate_metadata = self._separate_metadata()
+        table_metadata = []
+        
+        # Only batch mode fans files out over worker processes and prefetches them
+        batch_mode = self.file_settings.batch_mode
+        workers = self.performance_settings.parallel_workers if batch_mode else 1
+        prefetch_depth = self.performance_settings.prefetch_depth if batch_mode else 0
+        cache = self._parse_cache()
+        processed = process_files(files, self._reader_options(), workers, cache, recorder,
+                                  prefetch_depth)
+        if recorder is not None:
+            recorder.start_tracing()
+        
+        # Process each file, results arrive in input order
+        done = 0
+        try:
+            for done, (file_path, results, error) in enumerate(processed, 1):
+                if error is not None:
+                    LOGGER.error(f"Error processing {file_path}: {error}")
+                    if not self.file_settings.batch_mode:
+                        raise error
+                    else:
+                        exec_context.set_warning(f"Failed to process {file_path}: {str(error)}")
+                elif sink is not None:
+                    with stage(recorder, "write", file_path) as record:
+                        record["rows"] = sink.write(file_path, results,
+                                                    self.output_settings.include_metadata)
                 else:
-                    exec_context.set_warning(f"Failed to process {file_path}: {str(e)}")
+                    for df, metadata in results:
+                        if not self.output_settings.include_metadata:
+                            metadata = None
+                        elif separate_metadata:
+                            # The rows only carry the id of their row in the metadata table
+                            table_id = {'table_id': len(table_metadata)}
+                            table_metadata.append({**table_id, **metadata})
+                            metadata = table_id
+                        
+                        if merged:
+                            if metadata and isinstance(df, pa.Table):
+                                df = append_metadata(df, metadata)
+                            elif metadata:
+                                # Add metadata columns to dataframe
+                                for key, value in metadata.items():
+                                    df[key] = value
+                            merge_frames.append((file_path, df))
+                        else:
+                            # Metadata becomes dictionary encoded columns
+                            concat.add(df, metadata)
+                    
+                if error is None and manifest is not None:
+                    manifest.record(file_path, len(results), sum(len(df) for df, _ in results))
+                
+                exec_context.set_progress(done / found,
+                                          f"Processed {done} of {found} file(s) found so far")
+                if exec_context.is_canceled():
+                    raise RuntimeError("Execution canceled")
+            if sink is not None:
+                sink.close()
+        except BaseException:
+            if sink is not None:
+                # The manifest is not saved, so every file written by this run is deleted
+                sink.abort()
+            raise
+        finally:
+            processed.close()
+            if cache is not None:
+                cache.evict()
+            if recorder is not None:
+                recorder.stop_tracing()
         
-        if not all_results:
+        num_tables = (len(merge_frames) + concat.num_tables
+                      + (sink.num_tables if sink is not None else 0))
+        
+        # Nothing new is not an error in incremental mode
+        if not num_tables and (manifest is None or done):
             raise ValueError("No tables were successfully extracted")
         
-        # Combine all results
-        if len(all_results) == 1:
-            final_df = all_results[0]
-        else:
-            # Concatenate with outer join to handle different columns
-            final_df = pd.concat(all_results, ignore_index=True, sort=False)
+        with stage(recorder, "output") as record:
+            if sink is not None:
+                output = knext.Table.from_pyarrow(sink.manifest_table())
+                total_rows = sink.num_rows
+            elif merged:
+                if self.performance_settings.arrow_output:
+                    merge_frames = [(path, table.to_pandas()) for path, table in merge_frames]
+                final_df = manifest.merge(merge_frames)
+                output = knext.Table.from_pandas(final_df)
+                total_rows = len(final_df)
+            elif self.performance_settings.arrow_output:
+                # Arrow tables go to the output in record batches, no combined table;
+                # RowIDs are generated as by Table.from_pyarrow, not taken from a column
+                output = knext.BatchOutputTable.create(row_ids="generate")
+                total_rows = concat.write(output.append)
+            else:
+                table = concat.to_table()
+                output = knext.Table.from_pyarrow(table)
+                total_rows = table.num_rows
+            record["rows"] = total_rows
+        
+        if manifest is not None:
+            manifest.save()
+            exec_context.flow_variables['num_files_skipped'] = len(skipped)
+            exec_context.flow_variables['skipped_files'] = "\n".join(skipped)
         
         # Set flow variables
-        exec_context.flow_variables['num_files_processed'] = len(files)
-        exec_context.flow_variables['num_tables_extracted'] = len(all_results)
-        exec_context.flow_variables['total_rows'] = len(final_df)
+        exec_context.flow_variables['num_files_processed'] = done
+        exec_context.flow_variables['num_tables_extracted'] = num_tables
+        exec_context.flow_variables['total_rows'] = total_rows
+        
+        metrics = recorder or StageRecorder()
+        if recorder is not None:
+            for name, seconds in recorder.summary().items():
+                exec_context.flow_variables[f'stage_seconds_{name}'] = seconds
+            exec_context.flow_variables['total_seconds'] = time.perf_counter() - start_time
         
-        LOGGER.info(f"Successfully extracted {len(all_results)} tables with {len(final_df)} total rows")
+        LOGGER.info(f"Successfully extracted {num_tables} tables with {total_rows} total rows "
+                    f"from {done} file(s)")
         
-        return knext.Table.from_pandas(final_df)
+        return (output, knext.Table.from_pyarrow(metrics.to_arrow()),
+                knext.Table.from_pyarrow(metadata_table(table_metadata)))
@@ -0,0 +1,172 @@
+"""Streaming discovery of the input files of batch mode.
+
+Folders are walked with ``os.scandir``, so the file type comes from the
+directory entry and a file is only stat'ed when a size or modification time
+filter needs it. Paths are yielded as they are found, so processing can start
+before a large tree has been walked completely. Optionally the members of
+zip/tar archives are yielded as virtual paths and compressed files are
+matched by their uncompressed names, see input_sources.
+"""
+
+import os
+import re
+import fnmatch
+import logging
+import tarfile
+import zipfile
+from datetime import datetime
+from typing import Iterable, Iterator, List, Optional, Pattern, Tuple
+
+from input_sources import (
+    MEMBER_SEPARATOR, is_archive, is_compressed, iter_members, uncompressed_name,
+)
+
+# Set up logging
+LOGGER = logging.getLogger(__name__)
+
+
+def split_patterns(patterns: str) -> List[str]:
+    """Comma-separated glob patterns of a setting, e.g. '*.xls, *.htm'"""
+    return [pattern.strip() for pattern in patterns.split(",") if pattern.strip()]
+
+
+def _compile(patterns: Iterable[str]) -> List[Tuple[Pattern, bool]]:
+    """Compiled patterns, each with whether it matches the relative path or the file name"""
+    # Matching follows the file system, case-insensitive on Windows
+    flags = re.IGNORECASE if os.name == "nt" else 0
+    compiled = []
+    for pattern in patterns:
+        if "/" not in pattern:
+            compiled.append((re.compile(fnmatch.translate(pattern), flags), False))
+            continue
+        # Paths are relative to the folder ("./a/*" is "a/*"), and "**/" also
+        # stands for no folder, so "**/*.xls" matches files at the top too
+        pattern = re.sub(r"^(?:\.?/)+", "", pattern)
+        for variant in dict.fromkeys((pattern, pattern.replace("**/", ""))):
+            compiled.append((re.compile(fnmatch.translate(variant), flags), True))
+    return compiled
+
+
+def _matches(patterns: List[Tuple[Pattern, bool]], name: str, relative_path: str) -> bool:
+    """Patterns with a separator match the relative path, others the file name"""
+    return any(pattern.match(relative_path if by_path else name) for pattern, by_path in patterns)
+
+
+def parse_modified_since(value: str) -> Optional[float]:
+    """Timestamp of an ISO date or date-time setting, None if it is empty"""
+    if not value.strip():
+        return None
+    try:
+        return datetime.fromisoformat(value.strip()).timestamp()
+    except ValueError:
+        raise ValueError(f"Invalid date '{value}', expected e.g. 2024-01-31 or 2024-01-31T08:00")
+
+
+def discover_files(folder: str, patterns: Iterable[str] = ("*",), exclude: Iterable[str] = (),
+                   recursive: bool = False, min_size: int = 0, max_size: int = 0,
+                   modified_since: Optional[float] = None, max_files: int = 0,
+                   archives: bool = False, ordered: bool = True) -> Iterator[str]:
+    """Yield the files of a folder matching any of the glob patterns.
+
+    Files matching an ``exclude`` pattern are skipped, as are files smaller
+    than ``min_size`` or larger than ``max_size`` bytes (0 for no limit) and
+    files last modified before the ``modified_since`` timestamp. At most
+    ``max_files`` files are yielded (0 for all). Entries are visited in name
+    order, the files of a folder before its subfolders, so the order is
+    deterministic. Without ``ordered`` the entries of a folder are visited as
+    the file system lists them instead, so the first files of a huge flat
+    folder are yielded before the rest of it has been listed.
+
+    With ``archives`` the files of zip/tar archives are yielded instead of
+    the archives, in archive order and filtered like files of a folder by
+    their name, path in the archive, uncompressed size and modification time.
+    Compressed files (``report.xls.gz``) also match by their name without
+    the compression suffix.
+    """
+    include = _compile(patterns)
+    excluded = _compile(exclude)
+    needs_stat = bool(min_size or max_size or modified_since is not None)
+
+    def selected(name: str, relative_path: str) -> bool:
+        if not _matches(include, name, relative_path):
+            if not (archives and is_compressed(name)
+                    and _matches(include, uncompressed_name(name),
+                                 uncompressed_name(relative_path))):
+                return False
+        return not (excluded and _matches(excluded, name, relative_path))
+
+    def in_limits(size: int, mtime: float) -> bool:
+        if size < min_size or (max_size and size > max_size):
+            return False
+        return modified_since is None or mtime >= modified_since
+
+    found = 0
+    pending = [(folder, "")]
+    while pending:
+        directory, prefix = pending.pop()
+        try:
+            scan = os.scandir(directory)
+        except OSError as e:
+            LOGGER.warning(f"Could not list {directory}: {e}")
+            continue
+
+        subfolders = []
+        with scan:
+            try:
+                # Sorting lists the whole folder before its first file is yielded
+                entries = sorted(scan, key=lambda entry: entry.name) if ordered else scan
+            except OSError as e:
+                LOGGER.warning(f"Could not list {directory}: {e}")
+                continue
+
+            for entry in entries:
+                relative_path = prefix + entry.name
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if recursive:
+                            subfolders.append((entry.path, relative_path + "/"))
+                        continue
+                    if not entry.is_file():
+                        continue
+                except OSError:
+                    continue
+
+                if archives and is_archive(entry.name):
+                    if excluded and _matches(excluded, entry.name, relative_path):
+                        continue
+                    try:
+                        members = list(iter_members(entry.path))
+                    except (OSError, EOFError, zipfile.BadZipFile, tarfile.TarError) as e:
+                        LOGGER.warning(f"Could not list archive {entry.path}: {e}")
+                        continue
+                    for member in members:
+                        name = member.path.rpartition(MEMBER_SEPARATOR)[2]
+                        member_path = f"{relative_path}{MEMBER_SEPARATOR}{name}"
+                        if not selected(name.rpartition("/")[2], member_path):
+                            continue
+                        if needs_stat and not in_limits(member.size, member.mtime):
+                            continue
+                        yield member.path
+                        found += 1
+                        if max_files and found >= max_files:
+                            return
+                    continue
+
+                if not selected(entry.name, relative_path):
+                    continue
+                if needs_stat:
+                    # Cached by the entry, and free on Windows where scandir returns it
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    if not in_limits(stat.st_size, stat.st_mtime):
+                        continue
+
+                yield entry.path
+                found += 1
+                if max_files and found >= max_files:
+                    return
+
+        # Visited in listing order, as the stack pops the last one first
+        pending.extend(reversed(subfolders))
@@ -0,0 +1,163 @@
+"""File format sniffing over memory-mapped files.
+
+Files saved as ``.xls`` may be HTML (Excel's "Save as Web Page") or real
+spreadsheets: BIFF workbooks in an OLE2 container or zipped XLSX workbooks.
+The first bytes of the mapped file decide which engine reads it, so binary
+workbooks are never decoded as text. HTML content is decoded straight from
+the mapping without reading the file into an intermediate bytes object.
+"""
+
+import mmap
+import logging
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator, List, Optional, Union
+
+import pandas as pd
+
+try:
+    import python_calamine
+except ImportError:
+    python_calamine = None
+
+try:
+    import xlrd
+except ImportError:
+    xlrd = None
+
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+from arrow_output import frame_to_arrow
+from column_names import flatten_label
+from table_extraction import Buffer, Frame, ParseOptions
+
+# Set up logging
+LOGGER = logging.getLogger(__name__)
+
+FORMAT_HTML = "html"
+FORMAT_OLE2 = "ole2"
+FORMAT_ZIP = "zip"
+
+# Formats read with a spreadsheet engine instead of the HTML parser
+BINARY_FORMATS = (FORMAT_OLE2, FORMAT_ZIP)
+
+_OLE2_MAGIC = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"
+_ZIP_MAGIC = b"PK\x03\x04"
+
+# Markup expected near the start of an HTML export
+_HTML_MARKERS = (b"<html", b"<table", b"<!doctype", b"<?xml", b"<meta", b"<head", b"<body")
+
+# Bytes inspected for the HTML markers
+SNIFF_SIZE = 4096
+
+
+@contextmanager
+def mapped_file(file_path: str) -> Iterator[Buffer]:
+    """Map a file read-only; empty files, which cannot be mapped, yield b''"""
+    with open(file_path, "rb") as f:
+        try:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            yield b""
+            return
+        try:
+            yield buffer
+        finally:
+            buffer.close()
+
+
+def sniff_format(buffer: Buffer) -> str:
+    """Format of file content from its magic bytes, FORMAT_HTML for anything textual"""
+    if buffer[:len(_OLE2_MAGIC)] == _OLE2_MAGIC:
+        return FORMAT_OLE2
+    if buffer[:len(_ZIP_MAGIC)] == _ZIP_MAGIC:
+        return FORMAT_ZIP
+
+    head = bytes(buffer[:SNIFF_SIZE]).lower()
+    # UTF-16/32 markup has NUL bytes between the ASCII characters
+    if not any(marker in head.replace(b"\x00", b"") for marker in _HTML_MARKERS):
+        LOGGER.debug("No HTML markup found at the start of the file, parsing it as HTML anyway")
+    return FORMAT_HTML
+
+
+def sniff_file(file_path: str) -> str:
+    """Format of a file, see sniff_format"""
+    with mapped_file(file_path) as buffer:
+        return sniff_format(buffer)
+
+
+def decode_buffer(buffer: Buffer, encoding: str) -> str:
+    """Decode mapped content without copying it into a bytes object first"""
+    return str(buffer, encoding)
+
+
+def _excel_engine(file_format: str) -> str:
+    """Fastest installed pandas engine for a spreadsheet format"""
+    if python_calamine is not None:
+        return "calamine"
+    if file_format == FORMAT_OLE2 and xlrd is not None:
+        return "xlrd"
+    if file_format == FORMAT_ZIP and openpyxl is not None:
+        return "openpyxl"
+    package = "xlrd" if file_format == FORMAT_OLE2 else "openpyxl"
+    kind = "binary Excel (BIFF)" if file_format == FORMAT_OLE2 else "XLSX"
+    raise ValueError(f"File is a {kind} workbook, not HTML. Install python-calamine or "
+                     f"{package} to read it.")
+
+
+def _sample_rows(df: pd.DataFrame, options: ParseOptions, index: int) -> pd.DataFrame:
+    """Random rows of a sheet in their original order, as sampled for HTML tables"""
+    seed = options.sample_seed * 1000003 + index
+    if options.sample_fraction < 1:
+        df = df.sample(frac=options.sample_fraction, random_state=seed)
+    df = df.sort_index()
+    if options.max_rows and len(df) > options.max_rows:
+        if options.reservoir:
+            df = df.sample(n=options.max_rows, random_state=seed).sort_index()
+        else:
+            df = df.head(options.max_rows)
+    return df.reset_index(drop=True)
+
+
+def read_excel_tables(file_path: Union[str, BinaryIO], file_format: str, options: ParseOptions,
+                      sheet_index: int = -1, arrow: bool = False,
+                      nrows: Optional[int] = None) -> List[Frame]:
+    """Read the sheets of a real spreadsheet as tables, one per sheet.
+
+    Sheets play the role of HTML tables, so ``sheet_index`` selects one
+    sheet (-1 for all). Header rows, skipped rows, separators, NA values,
+    row limits and sampling are applied as for HTML tables.
+    """
+    if options.max_rows and not options.sampled:
+        nrows = min(nrows, options.max_rows) if nrows else options.max_rows
+
+    header_rows = options.header_rows
+    header: Union[None, int, List[int]]
+    if header_rows == 0:
+        header = None
+    elif header_rows == 1:
+        header = 0
+    else:
+        header = list(range(header_rows))
+
+    sheets = pd.read_excel(
+        file_path,
+        sheet_name=sheet_index if sheet_index >= 0 else None,
+        header=header,
+        skiprows=options.skip_rows or None,
+        nrows=nrows,
+        na_values=list(options.na_values),
+        thousands=options.thousands or None,
+        decimal=options.decimal or ".",
+        engine=_excel_engine(file_format),
+    )
+    frames = list(sheets.values()) if isinstance(sheets, dict) else [sheets]
+    if options.sampled:
+        frames = [_sample_rows(df, options, index) for index, df in enumerate(frames)]
+
+    if arrow:
+        return [frame_to_arrow(df.set_axis([flatten_label(label) for label in df.columns], axis=1))
+                for df in frames]
+    return frames
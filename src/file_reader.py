@@ -0,0 +1,429 @@
+"""Reading and parsing of single HTML-XLS files.
+
+This module has no KNIME dependency and works on a plain, picklable
+``ReaderOptions`` snapshot of the node settings, so files can be processed in
+worker processes as well as in the node itself.
+"""
+
+import io
+import os
+import re
+import codecs
+import logging
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import chardet
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+try:
+    import cchardet
+except ImportError:
+    cchardet = None
+
+try:
+    import charset_normalizer
+except ImportError:
+    charset_normalizer = None
+
+from column_names import normalize_columns
+from table_extraction import Frame, ParseOptions, extract_table, extract_tables, iter_tables
+from file_format import (
+    BINARY_FORMATS,
+    SNIFF_SIZE,
+    Buffer,
+    decode_buffer,
+    mapped_file,
+    read_excel_tables,
+    sniff_format,
+)
+from input_sources import is_plain, open_source, read_source, source_buffer, source_size
+from metrics import StageRecorder, stage
+from split_parsing import extract_split
+from type_coercion import coerce_table
+
+# Set up logging
+LOGGER = logging.getLogger(__name__)
+
+# Bytes at the start of a file used to detect its encoding
+ENCODING_SAMPLE_SIZE = 10000
+
+# Number of characters read per chunk in streaming mode
+STREAM_CHUNK_SIZE = 1 << 20
+
+# Byte order marks, longest first so UTF-32 is not taken for UTF-16
+_BOMS = [
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+]
+
+_CHARSET_PATTERN = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([\w.:-]+)', re.IGNORECASE)
+_XML_ENCODING_PATTERN = re.compile(rb'<\?xml[^>]+encoding\s*=\s*["\']([\w.:-]+)', re.IGNORECASE)
+
+# Fastest available statistical detector, all share chardet's result format
+if cchardet is not None:
+    _statistical_detect = cchardet.detect
+elif charset_normalizer is not None:
+    _statistical_detect = charset_normalizer.detect
+else:
+    _statistical_detect = chardet.detect
+
+# Single-byte encoding of unsure detections; Windows exports use it, and unlike
+# latin-1 it decodes bytes such as 0x80 (€) to the characters they stand for
+FALLBACK_ENCODING = 'cp1252'
+
+# Statistical detection results and their fallbacks by folder, cleared per execution
+_folder_encodings: Dict[str, str] = {}
+
+
+@dataclass(frozen=True)
+class ReaderOptions:
+    """Plain snapshot of the node settings needed to process one file"""
+
+    encoding: str = "auto"
+    table_index: int = 0
+    parse: ParseOptions = field(default_factory=ParseOptions)
+    clean_column_names: bool = True
+    drop_empty_rows: bool = True
+    drop_empty_cols: bool = True
+    streaming: bool = False
+    stream_batch_rows: int = 100000
+    arrow_output: bool = False
+    coerce_types: bool = False
+    compact_dtypes: bool = False
+    # Instrumentation does not change the output, so it is not part of cache keys
+    collect_metrics: bool = field(default=False, repr=False, compare=False)
+    # Processes parsing row ranges of one very large table; nor does splitting
+    split_workers: int = field(default=1, repr=False, compare=False)
+
+
+def _bom_encoding(raw_data: bytes) -> Optional[str]:
+    """Encoding declared by a byte order mark"""
+    for bom, encoding in _BOMS:
+        if raw_data.startswith(bom):
+            return encoding
+    return None
+
+
+def _declared_encoding(raw_data: bytes) -> Optional[str]:
+    """Encoding declared by <meta charset>, http-equiv or the XML declaration"""
+    match = _CHARSET_PATTERN.search(raw_data) or _XML_ENCODING_PATTERN.search(raw_data)
+    if not match:
+        return None
+    try:
+        encoding = codecs.lookup(match.group(1).decode('ascii')).name
+    except (LookupError, UnicodeDecodeError):
+        return None
+    # A declaration readable as ASCII bytes rules out UTF-16/32
+    if encoding.startswith(('utf-16', 'utf-32')):
+        return None
+    return encoding
+
+
+def _decodes(raw_data: bytes, encoding: str) -> bool:
+    try:
+        raw_data.decode(encoding)
+        return True
+    except UnicodeDecodeError:
+        return False
+
+
+def _is_utf8(raw_data: bytes) -> bool:
+    """Strict UTF-8 check, tolerating a sequence cut off at the end of the sample"""
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(raw_data, final=False)
+        return True
+    except UnicodeDecodeError:
+        return False
+
+
+def _detect_statistically(raw_data: bytes) -> Optional[str]:
+    """Last resort: statistical detection with the fastest available detector.
+
+    Returns None when the detector is not confident.
+    """
+    result = _statistical_detect(raw_data)
+    encoding = result['encoding']
+    confidence = result['confidence'] or 0.0
+
+    LOGGER.info(f"Detected encoding: {encoding} (confidence: {confidence:.2f})")
+
+    if confidence < 0.7 or not encoding:
+        LOGGER.warning(f"Low confidence in encoding detection, using {FALLBACK_ENCODING}")
+        return None
+
+    return encoding
+
+
+def clear_encoding_memo():
+    """Forget the per-folder detection results, e.g. at the start of an execution"""
+    _folder_encodings.clear()
+
+
+def detect_encoding(file_path: str) -> str:
+    """Detect file encoding automatically.
+
+    Tries, in order: a byte order mark, the charset declared in the document
+    (Excel always writes one), a strict UTF-8 decode and finally a statistical
+    detector, falling back to cp1252 when it is unsure. The result is memoized
+    per folder until clear_encoding_memo() is called, so a batch of
+    same-origin files pays for it only once.
+    """
+    try:
+        with open_source(file_path) as f:
+            raw_data = f.read(ENCODING_SAMPLE_SIZE)
+    except Exception as e:
+        LOGGER.error(f"Error detecting encoding: {e}")
+        return 'utf-8'
+
+    return _detect_in_sample(raw_data, file_path)
+
+
+def _detect_in_sample(raw_data: bytes, file_path: str) -> str:
+    """Tiered encoding detection on the first bytes of a file"""
+    encoding = _bom_encoding(raw_data) or _declared_encoding(raw_data)
+    if encoding:
+        return encoding
+    if _is_utf8(raw_data):
+        return 'utf-8'
+
+    folder = os.path.dirname(os.path.abspath(file_path))
+    encoding = _folder_encodings.get(folder)
+    if encoding is None:
+        try:
+            encoding = _detect_statistically(raw_data)
+        except Exception as e:
+            LOGGER.error(f"Error detecting encoding: {e}")
+            return 'utf-8'
+        if encoding is None:
+            # Not UTF-8, so a single-byte encoding; latin-1 only if cp1252 cannot decode it
+            encoding = FALLBACK_ENCODING if _decodes(raw_data, FALLBACK_ENCODING) else 'latin-1'
+        _folder_encodings[folder] = encoding
+    return encoding
+
+
+def _decode_html(buffer: Buffer, encoding: str) -> str:
+    """Decode mapped HTML content, falling back to cp1252, then latin-1"""
+    for candidate in dict.fromkeys((encoding, FALLBACK_ENCODING)):
+        try:
+            return decode_buffer(buffer, candidate)
+        except UnicodeDecodeError:
+            LOGGER.warning(f"Failed to read with {candidate}")
+    LOGGER.warning("Reading as latin-1")
+    return decode_buffer(buffer, 'latin-1')
+
+
+def read_html_xls(file_path: str, encoding: str = 'auto') -> str:
+    """Read HTML content from XLS file"""
+    with source_buffer(file_path) as buffer:
+        if encoding == 'auto':
+            encoding = _detect_in_sample(buffer[:ENCODING_SAMPLE_SIZE], file_path)
+        return _decode_html(buffer, encoding)
+
+
+def iter_html_chunks(file_path: str, encoding: str = 'auto',
+                     chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[str]:
+    """Read HTML content from XLS file in chunks of characters"""
+    if encoding == 'auto':
+        encoding = detect_encoding(file_path)
+
+    # Undecodable bytes are replaced since earlier chunks are already parsed
+    with open_source(file_path) as raw, \
+            io.TextIOWrapper(raw, encoding=encoding, errors='replace') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+
+def clean_dataframe(df: pd.DataFrame, options: ReaderOptions) -> pd.DataFrame:
+    """Clean and format the dataframe"""
+    # Drop empty rows
+    if options.drop_empty_rows:
+        df = df.dropna(how='all')
+
+    # Drop empty columns
+    if options.drop_empty_cols:
+        df = df.dropna(axis=1, how='all')
+
+    # Flatten multi-row headers, clean and dedupe column names
+    df.columns = normalize_columns(df.columns, options.clean_column_names)
+
+    # Reset index
+    df = df.reset_index(drop=True)
+
+    return df
+
+
+def clean_arrow_table(table: pa.Table, options: ReaderOptions) -> pa.Table:
+    """Clean and format an Arrow table, like clean_dataframe"""
+    # Drop empty rows
+    if options.drop_empty_rows and table.num_columns and table.num_rows:
+        empty = pc.is_null(table.column(0))
+        for column in table.columns[1:]:
+            empty = pc.and_(empty, pc.is_null(column))
+        if pc.any(empty).as_py():
+            table = table.filter(pc.invert(empty))
+
+    # Drop empty columns
+    if options.drop_empty_cols:
+        keep = [i for i, column in enumerate(table.columns) if column.null_count < table.num_rows]
+        if len(keep) < table.num_columns:
+            table = table.select(keep)
+
+    # Clean and dedupe column names
+    table = table.rename_columns(normalize_columns(table.column_names, options.clean_column_names))
+
+    return table
+
+
+def clean_table(table: Frame, options: ReaderOptions) -> Frame:
+    """Clean a DataFrame or Arrow table, then coerce column types if enabled"""
+    if isinstance(table, pa.Table):
+        table = clean_arrow_table(table, options)
+    else:
+        table = clean_dataframe(table, options)
+    if options.coerce_types or options.compact_dtypes:
+        table = coerce_table(table, options.parse, options.coerce_types, options.compact_dtypes)
+    return table
+
+
+def extract_clean_tables(html_content: str, options: ReaderOptions) -> List[Frame]:
+    """Extract and clean all tables from HTML content"""
+    # Single pass over the document, no soup tree and no pd.read_html re-parse
+    tables = extract_tables(html_content, options.parse, arrow=options.arrow_output)
+
+    return [clean_table(table, options) for table in tables]
+
+
+def stream_tables(file_path: str, options: ReaderOptions) -> List[Tuple[int, Frame]]:
+    """Parse a file chunk by chunk, keeping only the selected table.
+
+    Row batches of a table are packed into Arrow string columns as they
+    fill up; each table is converted and cleaned once, as a whole, so the
+    result is the same as without streaming.
+    """
+    # Other tables are skipped by the parser, which stops after the selected one
+    tables = iter_tables(iter_html_chunks(file_path, options.encoding), options.parse,
+                         options.stream_batch_rows, arrow=options.arrow_output,
+                         table_index=options.table_index, whole=True)
+    return [(ordinal, clean_table(table, options)) for ordinal, (_, table) in enumerate(tables)]
+
+
+@contextmanager
+def _content_buffer(file_path: str, content: Optional[bytes]) -> Iterator[Buffer]:
+    """Prefetched content of a file, or a mapping of the file if there is none"""
+    if content is not None:
+        yield content
+        return
+    if not is_plain(file_path):
+        # Streaming mode reads other sources chunk by chunk, their start is enough to sniff
+        with open_source(file_path) as f:
+            yield f.read(SNIFF_SIZE)
+        return
+    with mapped_file(file_path) as buffer:
+        yield buffer
+
+
+def process_file(file_path: str, options: ReaderOptions,
+                 recorder: Optional[StageRecorder] = None,
+                 content: Optional[bytes] = None) -> List[Tuple[Frame, Dict]]:
+    """Process a single HTML-XLS file, timing each stage if a recorder is given.
+
+    ``content`` holds the bytes of the file if they were already read, e.g.
+    by the prefetch threads of batch mode; the file is then not opened again.
+    Compressed files and archive members (see input_sources) are read into
+    memory decompressed, streaming mode decompresses them chunk by chunk.
+    """
+    LOGGER.info(f"Processing file: {file_path}")
+    plain = is_plain(file_path)
+    if content is None and not plain and not options.streaming:
+        content = read_source(file_path)
+    if content is not None:
+        file_size = len(content)
+    else:
+        file_size = source_size(file_path) if recorder is not None else 0
+
+    # One buffer serves format sniffing, encoding detection and decoding
+    html_content: Optional[str] = None
+    tables: Optional[List[Frame]] = None
+    with _content_buffer(file_path, content) as buffer:
+        file_format = sniff_format(buffer)
+        if file_format not in BINARY_FORMATS and not options.streaming:
+            encoding = options.encoding
+            if encoding == 'auto':
+                with stage(recorder, "detect_encoding", file_path):
+                    encoding = _detect_in_sample(buffer[:ENCODING_SAMPLE_SIZE], file_path)
+
+            # Workers map the file themselves, which needs a plain file
+            if options.split_workers != 1 and plain:
+                # Very large tables are parsed in row ranges by several processes
+                with stage(recorder, "extract_split", file_path, bytes_read=file_size) as record:
+                    tables = extract_split(buffer, file_path, encoding, options.parse,
+                                           options.table_index, options.split_workers,
+                                           arrow=options.arrow_output)
+                    record["rows"] = sum(len(table) for table in tables or [])
+
+            if tables is None:
+                # Read HTML content
+                with stage(recorder, "read", file_path, bytes_read=file_size):
+                    html_content = _decode_html(buffer, encoding)
+
+    if file_format in BINARY_FORMATS:
+        # Real spreadsheets are read by a spreadsheet engine, sheets act as tables
+        with stage(recorder, "read_excel", file_path, bytes_read=file_size) as record:
+            if content is None and not plain:
+                content = read_source(file_path)
+            source = io.BytesIO(content) if content is not None else file_path
+            tables = read_excel_tables(source, file_format, options.parse, options.table_index,
+                                       arrow=options.arrow_output)
+            record["rows"] = sum(len(table) for table in tables)
+    elif options.streaming:
+        # Streaming mode selects the table while parsing
+        with stage(recorder, "stream", file_path, bytes_read=file_size) as record:
+            indexed_tables = stream_tables(file_path, options)
+            record["rows"] = sum(len(table) for _, table in indexed_tables)
+    elif html_content is not None:
+        # Extract tables, only the selected one is parsed
+        with stage(recorder, "extract", file_path) as record:
+            # Files of a folder usually come from the same exporter and need the same parser
+            group = os.path.dirname(os.path.abspath(file_path))
+            if options.table_index >= 0:
+                tables = [extract_table(html_content, options.parse, options.table_index,
+                                        arrow=options.arrow_output, group=group)]
+            else:
+                tables = extract_tables(html_content, options.parse, arrow=options.arrow_output,
+                                        group=group)
+            record["rows"] = sum(len(table) for table in tables)
+
+    if tables is not None:
+        with stage(recorder, "clean", file_path) as record:
+            tables = [clean_table(table, options) for table in tables]
+            record["rows"] = sum(len(table) for table in tables)
+        indexed_tables = list(enumerate(tables))
+
+    if not indexed_tables:
+        raise ValueError(f"No valid tables found in {file_path}")
+
+    # Add metadata
+    results = []
+    for i, table in indexed_tables:
+        metadata = {
+            'source_file': os.path.basename(file_path),
+            'file_path': file_path,
+            'table_index': i,
+            'num_rows': len(table),
+            'num_cols': len(table.columns)
+        }
+        results.append((table, metadata))
+        if recorder is not None:
+            recorder.record_table(file_path, i, len(table))
+
+    return results
@@ -0,0 +1,122 @@
+"""Incremental folder ingestion.
+
+A manifest records every successfully ingested file (size, modification time,
+table and row counts) together with the reader options it was ingested with.
+On the next execution only new or modified files are processed. Optionally the
+combined result is persisted so the delta can be merged into it.
+"""
+
+import os
+import json
+import hashlib
+import logging
+import tempfile
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from input_sources import source_stat
+
+# Set up logging
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_STATE_ROOT = os.path.join(tempfile.gettempdir(), "html_xls_reader_state")
+
+# Internal column tying rows of the persisted result to their source file
+SOURCE_COLUMN = "__ingest_source__"
+
+
+def default_state_dir(folder_path: str, file_pattern: str) -> str:
+    """State folder used when none is configured, one per input folder and pattern"""
+    key = json.dumps([os.path.abspath(folder_path), file_pattern])
+    return os.path.join(DEFAULT_STATE_ROOT, hashlib.sha256(key.encode("utf-8")).hexdigest()[:16])
+
+
+class IngestManifest:
+    """Manifest of ingested files plus the optionally persisted prior result"""
+
+    def __init__(self, state_dir: str, options_key: str):
+        self.state_dir = state_dir
+        self.options_key = options_key
+        self.files: Dict[str, Dict] = {}
+        self._manifest_path = os.path.join(state_dir, "manifest.json")
+        self._result_path = os.path.join(state_dir, "result.arrow")
+
+    def load(self):
+        """Load the manifest, starting over if the reader options changed"""
+        try:
+            with open(self._manifest_path, encoding="utf-8") as f:
+                stored = json.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            LOGGER.warning(f"Ignoring unreadable manifest {self._manifest_path}: {e}")
+            return
+
+        if stored.get("options") != self.options_key:
+            LOGGER.info("Reader options changed since the last run, re-ingesting all files")
+            return
+        self.files = stored.get("files", {})
+
+    def split(self, files: List[str]) -> Tuple[List[str], List[str]]:
+        """Split files into (new or modified, unchanged)"""
+        changed, skipped = [], []
+        for file_path in files:
+            entry = self.files.get(os.path.abspath(file_path))
+            stat = source_stat(file_path)
+            if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+                skipped.append(file_path)
+            else:
+                changed.append(file_path)
+        return changed, skipped
+
+    def record(self, file_path: str, num_tables: int, num_rows: int):
+        """Record a successfully ingested file"""
+        stat = source_stat(file_path)
+        self.files[os.path.abspath(file_path)] = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "num_tables": num_tables,
+            "num_rows": num_rows,
+        }
+
+    def save(self):
+        """Persist the manifest atomically"""
+        os.makedirs(self.state_dir, exist_ok=True)
+        staging = self._manifest_path + ".tmp"
+        with open(staging, "w", encoding="utf-8") as f:
+            json.dump({"options": self.options_key, "files": self.files}, f)
+        os.replace(staging, self._manifest_path)
+
+    def merge(self, frames: List[Tuple[str, pd.DataFrame]]) -> pd.DataFrame:
+        """Merge delta frames into the persisted result and persist the merge.
+
+        Rows previously ingested from a modified file are replaced by its new
+        rows. Files that disappeared from the folder keep their rows.
+        """
+        parts = []
+        prior = self._load_result()
+        if prior is not None:
+            replaced = {os.path.abspath(file_path) for file_path, _ in frames}
+            parts.append(prior[~prior[SOURCE_COLUMN].isin(replaced)])
+        for file_path, df in frames:
+            parts.append(df.assign(**{SOURCE_COLUMN: os.path.abspath(file_path)}))
+
+        if not parts:
+            return pd.DataFrame()
+        merged = pd.concat(parts, ignore_index=True, sort=False)
+        self._save_result(merged)
+        return merged.drop(columns=[SOURCE_COLUMN])
+
+    def _load_result(self) -> Optional[pd.DataFrame]:
+        if not self.files or not os.path.exists(self._result_path):
+            return None
+        return feather.read_table(self._result_path).to_pandas()
+
+    def _save_result(self, df: pd.DataFrame):
+        os.makedirs(self.state_dir, exist_ok=True)
+        staging = self._result_path + ".tmp"
+        feather.write_feather(pa.Table.from_pandas(df, preserve_index=False), staging)
+        os.replace(staging, self._result_path)
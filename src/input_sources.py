@@ -0,0 +1,241 @@
+"""Compressed files and archive members as input sources.
+
+Exports often arrive as ``report.xls.gz`` or as zip/tar bundles of many
+reports. Compressed files are decompressed while they are read and archive
+members are read straight out of their archive, so nothing is extracted to
+disk. A member is addressed by a virtual path, the archive path and the
+member name joined by MEMBER_SEPARATOR (``bundle.zip!/reports/a.xls``); it
+travels through batch processing, the parse cache, the incremental manifest
+and the metadata columns like any file path.
+
+Sources other than plain files cannot be memory-mapped, so their content is
+read into memory, file by file.
+"""
+
+import os
+import io
+import bz2
+import gzip
+import lzma
+import tarfile
+import zipfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, BinaryIO, Callable, Dict, Iterator, NamedTuple, Optional, Tuple, Union
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from file_format import mapped_file
+from table_extraction import Buffer
+
+# Joins an archive path and a member name into the virtual path of the member
+MEMBER_SEPARATOR = "!/"
+
+ARCHIVE_SUFFIXES = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+
+# Single compressed files, decompressed while read
+COMPRESSION_SUFFIXES = (".gz", ".bz2", ".xz", ".zst")
+
+Archive = Union[zipfile.ZipFile, tarfile.TarFile]
+
+
+class Member(NamedTuple):
+    """A file in an archive, with its uncompressed size and modification time"""
+
+    path: str
+    size: int
+    mtime: float
+
+
+def is_archive(path: str) -> bool:
+    """Whether a file is a zip or tar archive, by its name"""
+    return path.lower().endswith(ARCHIVE_SUFFIXES)
+
+
+def is_compressed(path: str) -> bool:
+    """Whether a file is a single compressed file, by its name"""
+    return path.lower().endswith(COMPRESSION_SUFFIXES) and not is_archive(path)
+
+
+def split_member(path: str) -> Tuple[str, Optional[str]]:
+    """(archive path, member name) of a virtual path, (path, None) for other paths.
+
+    Only a path whose part before MEMBER_SEPARATOR is an existing archive is
+    virtual; a file named like one (``Urgent!/report.xls``) is opened as it
+    is. Member paths only come from discovery with archives enabled, and
+    without it every discovered path exists as it is.
+    """
+    start = path.find(MEMBER_SEPARATOR)
+    while start >= 0:
+        # The separator may also occur in folder names before the archive
+        archive_path = path[:start]
+        if is_archive(archive_path) and os.path.isfile(archive_path) and not os.path.exists(path):
+            return archive_path, path[start + len(MEMBER_SEPARATOR):]
+        start = path.find(MEMBER_SEPARATOR, start + 1)
+    return path, None
+
+
+def member_path(archive_path: str, name: str) -> str:
+    """Virtual path of an archive member"""
+    return f"{archive_path}{MEMBER_SEPARATOR}{name}"
+
+
+def is_plain(path: str) -> bool:
+    """Whether a path is a plain file, which can be mapped and stat'ed as it is"""
+    return split_member(path)[1] is None and not is_compressed(path)
+
+
+def uncompressed_name(name: str) -> str:
+    """File name without a compression suffix, e.g. report.xls for report.xls.gz"""
+    root, suffix = os.path.splitext(name)
+    return root if suffix.lower() in COMPRESSION_SUFFIXES else name
+
+
+def _open_zstd(path: str) -> BinaryIO:
+    if zstandard is None:
+        raise ValueError(f"Reading {os.path.basename(path)} requires the zstandard package")
+    return zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+
+
+# Binary stream openers by suffix; the stream classes do not derive from BinaryIO
+_DECOMPRESSORS: Dict[str, Callable[[str], Any]] = {
+    ".gz": gzip.open, ".bz2": bz2.open, ".xz": lzma.open, ".zst": _open_zstd,
+}
+
+
+class _OpenArchive:
+    """The archive read last, kept open so its members are read in one forward pass"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.key: Optional[Tuple] = None
+        self.archive: Optional[Archive] = None
+
+    def get(self, archive_path: str) -> Archive:
+        """The open archive, called with the lock held"""
+        stat = os.stat(archive_path)
+        key = (os.getpid(), os.path.abspath(archive_path), stat.st_size, stat.st_mtime_ns)
+        if key == self.key and self.archive is not None:
+            return self.archive
+        if self.key is not None and self.key[0] != key[0]:
+            # Inherited by a forked worker, its file position is shared with the parent
+            self.archive = None
+        self.close()
+        archive: Archive
+        if archive_path.lower().endswith(".zip"):
+            archive = zipfile.ZipFile(archive_path)
+        else:
+            archive = tarfile.open(archive_path)
+        self.archive, self.key = archive, key
+        return archive
+
+    def close(self):
+        if self.archive is not None:
+            self.archive.close()
+        self.archive, self.key = None, None
+
+
+_open_archive = _OpenArchive()
+
+
+def iter_members(archive_path: str) -> Iterator[Member]:
+    """The files of an archive in archive order, with virtual paths"""
+    with _open_archive.lock:
+        archive = _open_archive.get(archive_path)
+        if isinstance(archive, zipfile.ZipFile):
+            members = [Member(member_path(archive_path, info.filename), info.file_size,
+                              datetime(*info.date_time).timestamp())
+                       for info in archive.infolist() if not info.is_dir()]
+        else:
+            # Listing a compressed tar decompresses it once; the offsets are kept for reading
+            members = [Member(member_path(archive_path, info.name), info.size, info.mtime)
+                       for info in archive.getmembers() if info.isfile()]
+    yield from members
+
+
+def _read_member(archive_path: str, name: str) -> bytes:
+    with _open_archive.lock:
+        archive = _open_archive.get(archive_path)
+        if isinstance(archive, zipfile.ZipFile):
+            return archive.read(name)
+        f = archive.extractfile(name)
+        if f is None:
+            raise ValueError(f"{name} is not a file in {archive_path}")
+        return f.read()
+
+
+def read_source(path: str) -> bytes:
+    """Content of a plain file, a compressed file or an archive member"""
+    archive_path, name = split_member(path)
+    if name is not None:
+        return _read_member(archive_path, name)
+    with open_source(path) as f:
+        return f.read()
+
+
+@contextmanager
+def open_source(path: str) -> Iterator[BinaryIO]:
+    """Binary stream of a source; compressed files are decompressed as they are read"""
+    archive_path, name = split_member(path)
+    f: BinaryIO
+    if name is not None:
+        # Members are read as a whole, reading an archive is not thread-safe
+        f = io.BytesIO(_read_member(archive_path, name))
+    elif is_compressed(path):
+        f = _DECOMPRESSORS[os.path.splitext(path)[1].lower()](path)
+    else:
+        f = open(path, "rb")
+    with f:
+        yield f
+
+
+@contextmanager
+def source_buffer(path: str) -> Iterator[Buffer]:
+    """Mapped content of a plain file, the decompressed bytes of other sources"""
+    if is_plain(path):
+        with mapped_file(path) as buffer:
+            yield buffer
+        return
+    yield read_source(path)
+
+
+def source_stat(path: str) -> os.stat_result:
+    """Stat of the file holding a source, the archive for its members.
+
+    Size and modification time fingerprint the source: a member changes
+    whenever its archive does.
+    """
+    return os.stat(split_member(path)[0])
+
+
+def source_exists(path: str) -> bool:
+    """Whether the file holding a source exists"""
+    return os.path.exists(split_member(path)[0])
+
+
+def source_size(path: str) -> int:
+    """Size of a source, its uncompressed size for archive members"""
+    archive_path, name = split_member(path)
+    if name is None:
+        return os.path.getsize(path)
+    with _open_archive.lock:
+        archive = _open_archive.get(archive_path)
+        if isinstance(archive, zipfile.ZipFile):
+            return archive.getinfo(name).file_size
+        return archive.getmember(name).size
+
+
+def source_mtime(path: str) -> float:
+    """Modification time of a source, as stored in the archive for its members"""
+    archive_path, name = split_member(path)
+    if name is None:
+        return os.path.getmtime(path)
+    with _open_archive.lock:
+        archive = _open_archive.get(archive_path)
+        if isinstance(archive, zipfile.ZipFile):
+            return datetime(*archive.getinfo(name).date_time).timestamp()
+        return archive.getmember(name).mtime
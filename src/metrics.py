@@ -0,0 +1,123 @@
+"""Per-stage timing and memory instrumentation.
+
+A ``StageRecorder`` is passed down to the processing functions, which wrap
+each stage in ``stage(recorder, ...)``. Without a recorder the wrapper is a
+shared no-op context, so disabled instrumentation costs one function call
+per stage. Records are plain dicts, so worker processes can send them back.
+
+Tracing Python allocations slows every allocation down, several times over
+for parsing, so peak memory is only measured on request; the stage times of
+such a run are not comparable with those of a run without it.
+"""
+
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Iterator, List, Optional
+
+import pyarrow as pa
+
+# Columns of the metrics table, one row per file and stage
+METRICS_COLUMNS = {
+    "file_path": pa.string(),
+    "stage": pa.string(),
+    "table_index": pa.int32(),
+    "seconds": pa.float64(),
+    "bytes_read": pa.int64(),
+    "rows": pa.int64(),
+    "peak_python_bytes": pa.int64(),
+    "arrow_bytes": pa.int64(),
+}
+
+
+class StageRecorder:
+    """Collects one record per file and stage.
+
+    With ``trace_memory``, used as a context manager or between
+    start_tracing and stop_tracing, it traces Python allocations for the
+    peak memory of each stage, unless tracing is already running. Otherwise
+    peak_python_bytes is 0 and stage times are not inflated by tracing.
+    """
+
+    def __init__(self, trace_memory: bool = False):
+        self.records: List[Dict] = []
+        self.trace_memory = trace_memory
+        self._started_tracing = False
+
+    def __enter__(self):
+        self.start_tracing()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop_tracing()
+
+    def start_tracing(self):
+        """Trace Python allocations if requested, unless something else already does"""
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+    def stop_tracing(self):
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    @contextmanager
+    def stage(self, name: str, file_path: str = "", table_index: int = -1,
+              bytes_read: int = 0) -> Iterator[Dict]:
+        """Time a stage; the yielded record can be updated, e.g. with rows"""
+        record = {
+            "file_path": file_path,
+            "stage": name,
+            "table_index": table_index,
+            "bytes_read": bytes_read,
+            "rows": 0,
+        }
+        tracing = self.trace_memory and tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+            start_traced = tracemalloc.get_traced_memory()[0]
+        start_arrow = pa.total_allocated_bytes()
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record["seconds"] = time.perf_counter() - start
+            record["arrow_bytes"] = pa.total_allocated_bytes() - start_arrow
+            record["peak_python_bytes"] = (tracemalloc.get_traced_memory()[1] - start_traced
+                                           if tracing else 0)
+            self.records.append(record)
+
+    def record_table(self, file_path: str, table_index: int, rows: int):
+        """Record the size of one extracted table"""
+        self.records.append({
+            "file_path": file_path,
+            "stage": "table",
+            "table_index": table_index,
+            "seconds": 0.0,
+            "bytes_read": 0,
+            "rows": rows,
+            "peak_python_bytes": 0,
+            "arrow_bytes": 0,
+        })
+
+    def summary(self) -> Dict[str, float]:
+        """Total seconds per stage"""
+        totals: Dict[str, float] = {}
+        for record in self.records:
+            if record["stage"] != "table":
+                totals[record["stage"]] = totals.get(record["stage"], 0.0) + record["seconds"]
+        return totals
+
+    def to_arrow(self) -> pa.Table:
+        """Records as a table with METRICS_COLUMNS"""
+        return pa.table({name: pa.array([record[name] for record in self.records], data_type)
+                         for name, data_type in METRICS_COLUMNS.items()})
+
+
+def stage(recorder: Optional[StageRecorder], name: str, file_path: str = "",
+          table_index: int = -1, bytes_read: int = 0):
+    """Context timing a stage if a recorder is given, a no-op context otherwise"""
+    if recorder is None:
+        return nullcontext({})
+    return recorder.stage(name, file_path, table_index, bytes_read)
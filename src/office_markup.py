@@ -0,0 +1,142 @@
+"""Pre-filter for the markup bloat of Office HTML exports.
+
+Excel's "Save as Web Page" output carries much more formatting than data:
+a ``<style>`` block, conditional comments (``<![if ...]>``), ``<xml>``
+islands with workbook settings, and ``class``/``style`` (``mso-*``),
+``x:num``/``x:str`` and sizing attributes on every row and cell. Often four
+fifths of the document never reach a table cell, yet all of it is decoded,
+tokenized and handed to the parser target. The filter drops these
+constructs with a few regex passes before the document is parsed, and works
+on streamed chunks as well. Documents without Office markers near their
+start are passed through unchanged.
+
+Excel also writes the unformatted value of numeric cells into ``x:num``
+(``<td x:num="0.179">17.9%</td>``); office_number() lets the parser use it
+instead of the displayed text.
+"""
+
+import re
+from typing import Iterable, Iterator
+
+# Characters at the start of a document searched for Office markers
+DETECT_SIZE = 1 << 16
+
+_OFFICE_MARKER_PATTERN = re.compile(r"urn:schemas-microsoft-com:office|mso-|\sx:(?:num|str)\b",
+                                    re.IGNORECASE)
+
+# Blocks that never hold table content; Excel's conditional comments are
+# <![if ...]> ... <![endif]> pairs around content that is kept
+_BLOCK_PATTERN = re.compile(
+    r"<style\b.*?</style\s*>|<xml\b.*?</xml\s*>|<!--.*?-->|<!\[(?:if\b[^\]]*|endif)\]>",
+    re.IGNORECASE | re.DOTALL,
+)
+_BLOCK_STARTS = (("<style", "</style"), ("<xml", "</xml"), ("<!--", "-->"))
+
+# Start tags with attributes; quoted values may hold ">"
+_ATTRIBUTED_TAG_PATTERN = re.compile(r"""<[a-zA-Z][\w:-]*\s(?:[^<>"']|"[^"]*"|'[^']*')*>""")
+
+# Formatting attributes, with a value except for Excel's bare x: flags. Spans are
+# kept, and x:num when the typed values are used. Only applied within start
+# tags, so cell text reading like an attribute (" width=10") is kept.
+_VALUE = r"""=(?:'[^']*'|"[^"]*"|[^\s'">]*)"""
+_ATTRIBUTE_PATTERN = re.compile(
+    rf"""\s(?:(?:style|class|height|width|align|valign){_VALUE}|x:[\w-]+(?:{_VALUE})?)""",
+    re.IGNORECASE,
+)
+_ATTRIBUTE_KEEP_NUM_PATTERN = re.compile(
+    rf"""\s(?:(?:style|class|height|width|align|valign){_VALUE}|x:(?!num\b)[\w-]+(?:{_VALUE})?)""",
+    re.IGNORECASE,
+)
+
+_NON_DIGIT_PATTERN = re.compile(r"\D")
+# Dates and times are stored as serial numbers, their text is kept
+_DATE_TIME_PATTERN = re.compile(r"\d\s*[-/.]\s*\d+\s*[-/.]\s*\d|\d\s*:\s*\d")
+
+
+def is_office_markup(html_content: str) -> bool:
+    """Whether content looks like an Office export, judged by its start"""
+    return _OFFICE_MARKER_PATTERN.search(html_content, 0, DETECT_SIZE) is not None
+
+
+def strip_office_markup(html_content: str, keep_numbers: bool = False) -> str:
+    """Drop style blocks, comments, XML islands and formatting attributes.
+
+    Table structure, spans and cell text are kept, and so are the ``x:num``
+    attributes with ``keep_numbers``.
+    """
+    html_content = _BLOCK_PATTERN.sub("", html_content)
+    pattern = _ATTRIBUTE_KEEP_NUM_PATTERN if keep_numbers else _ATTRIBUTE_PATTERN
+    return _ATTRIBUTED_TAG_PATTERN.sub(lambda tag: pattern.sub("", tag[0]), html_content)
+
+
+def _complete_end(text: str) -> int:
+    """End of the part of a chunk that can be filtered on its own.
+
+    The part ends after the last complete tag and before any block whose
+    end has not arrived yet.
+    """
+    end = text.rfind(">") + 1
+    lowered = text.lower()
+    for start_tag, end_tag in _BLOCK_STARTS:
+        start = lowered.rfind(start_tag, 0, end)
+        if start >= 0 and lowered.find(end_tag, start, end) < 0:
+            end = min(end, start)
+    return end
+
+
+def iter_stripped(chunks: Iterable[str], keep_numbers: bool = False) -> Iterator[str]:
+    """Filter streamed chunks, see strip_office_markup.
+
+    Chunks are passed on unchanged until an Office marker is found in the
+    first DETECT_SIZE characters; nothing is held back for the decision, so
+    early stops and row batches are not delayed. Once filtering, partial
+    tags and unclosed blocks at the end of a chunk are held back until the
+    chunk completing them arrives.
+    """
+    chunks = iter(chunks)
+    seen = 0
+    tail = ""
+    for chunk in chunks:
+        if is_office_markup(tail + chunk):
+            pending = chunk
+            break
+        yield chunk
+        seen += len(chunk)
+        if seen >= DETECT_SIZE:
+            yield from chunks
+            return
+        # A marker may be cut by the chunk boundary
+        tail = (tail + chunk)[-40:]
+    else:
+        return
+
+    for chunk in chunks:
+        pending += chunk
+        end = _complete_end(pending)
+        if end:
+            yield strip_office_markup(pending[:end], keep_numbers)
+            pending = pending[end:]
+    if pending:
+        yield strip_office_markup(pending, keep_numbers)
+
+
+def office_number(text: str, value: str, decimal: str = ".") -> str:
+    """The x:num value of a cell in place of its text, if both are the same number.
+
+    The digits of one must start with those of the other, so rounded,
+    grouped, currency and percent text is replaced, while dates and times
+    (stored as day serials) and text unrelated to the value are kept. The
+    value is written with the ``decimal`` separator used for parsing.
+    """
+    if not value:
+        return text
+    if text != value:
+        if _DATE_TIME_PATTERN.search(text):
+            return text
+        text_digits = _NON_DIGIT_PATTERN.sub("", text).lstrip("0")
+        value_digits = _NON_DIGIT_PATTERN.sub("", value).lstrip("0")
+        # Text without digits only stands for zero, e.g. "-" in accounting formats
+        if not (text_digits.startswith(value_digits)
+                or text_digits and value_digits.startswith(text_digits)):
+            return text
+    return value.replace(".", decimal) if decimal and decimal != "." else value
@@ -0,0 +1,164 @@
+"""Persistent on-disk cache of extracted tables.
+
+Entries are keyed by the file fingerprint (absolute path, size and
+modification time) and the effective reader options, and hold the extracted
+tables as Arrow IPC files, so unchanged files are loaded instead of being
+re-parsed. The total cache size is bounded with least-recently-used eviction.
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import logging
+import tempfile
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from file_reader import ReaderOptions, process_file
+from input_sources import source_stat
+from metrics import StageRecorder, stage
+from table_extraction import Frame
+
+# Set up logging
+LOGGER = logging.getLogger(__name__)
+
+# Bump when the entry layout or the extraction output changes
+CACHE_VERSION = 1
+
+DEFAULT_CACHE_DIR = os.path.join(tempfile.gettempdir(), "html_xls_reader_cache")
+
+
+def _encode_label(label):
+    """Make a column label JSON serializable"""
+    return list(label) if isinstance(label, tuple) else label
+
+
+def _decode_columns(labels: List) -> pd.Index:
+    """Restore column labels stored by _encode_label"""
+    if labels and all(isinstance(label, list) for label in labels):
+        return pd.MultiIndex.from_tuples([tuple(label) for label in labels])
+    return pd.Index(labels, dtype=object)
+
+
+class ParseCache:
+    """Cache of extracted tables keyed by file fingerprint and options"""
+
+    def __init__(self, cache_dir: str = "", max_bytes: int = 1 << 30):
+        self.cache_dir = cache_dir or DEFAULT_CACHE_DIR
+        self.max_bytes = max_bytes
+
+    def key(self, file_path: str, options: ReaderOptions) -> str:
+        """Cache key of a file in its current state for the given options"""
+        stat = source_stat(file_path)
+        fingerprint = json.dumps([
+            CACHE_VERSION,
+            os.path.abspath(file_path),
+            stat.st_size,
+            stat.st_mtime_ns,
+            repr(options),
+        ])
+        return hashlib.sha256(fingerprint.encode("utf-8")).hexdigest()
+
+    def get(self, file_path: str, options: ReaderOptions) -> Optional[List[Tuple[Frame, Dict]]]:
+        """Load the cached tables of a file, or None on a cache miss"""
+        entry = os.path.join(self.cache_dir, self.key(file_path, options))
+        try:
+            with open(os.path.join(entry, "metadata.json"), encoding="utf-8") as f:
+                stored = json.load(f)
+            results = []
+            for i, table in enumerate(stored):
+                arrow_table = feather.read_table(os.path.join(entry, f"{i}.arrow"))
+                if options.arrow_output:
+                    results.append((arrow_table.rename_columns(table["columns"]),
+                                    table["metadata"]))
+                    continue
+                df = arrow_table.to_pandas()
+                df.columns = _decode_columns(table["columns"])
+                results.append((df, table["metadata"]))
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            LOGGER.warning(f"Ignoring unreadable cache entry for {file_path}: {e}")
+            return None
+
+        # Mark the entry as recently used for LRU eviction
+        try:
+            os.utime(entry)
+        except OSError:
+            pass
+        LOGGER.info(f"Loaded {file_path} from cache")
+        return results
+
+    def put(self, file_path: str, options: ReaderOptions, results: List[Tuple[Frame, Dict]]):
+        """Store the extracted tables of a file"""
+        key = self.key(file_path, options)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        staging = tempfile.mkdtemp(prefix=f".{key}.", dir=self.cache_dir)
+        try:
+            stored = []
+            for i, (df, metadata) in enumerate(results):
+                # Positional names keep duplicate and non-string labels intact
+                positional = [str(j) for j in range(len(df.columns))]
+                if isinstance(df, pa.Table):
+                    table = df.rename_columns(positional)
+                    labels = df.column_names
+                else:
+                    table = pa.Table.from_pandas(df.set_axis(positional, axis=1),
+                                                 preserve_index=False)
+                    labels = df.columns
+                feather.write_feather(table, os.path.join(staging, f"{i}.arrow"))
+                stored.append({
+                    "columns": [_encode_label(label) for label in labels],
+                    "metadata": metadata,
+                })
+            with open(os.path.join(staging, "metadata.json"), "w", encoding="utf-8") as f:
+                json.dump(stored, f)
+            # Atomic publish; if another process won the race its entry is kept
+            try:
+                os.replace(staging, os.path.join(self.cache_dir, key))
+            except OSError:
+                shutil.rmtree(staging, ignore_errors=True)
+        except Exception as e:
+            LOGGER.warning(f"Could not cache {file_path}: {e}")
+            shutil.rmtree(staging, ignore_errors=True)
+
+    def load_or_process(self, file_path: str, options: ReaderOptions,
+                        recorder: Optional[StageRecorder] = None,
+                        content: Optional[bytes] = None) -> List[Tuple[Frame, Dict]]:
+        """Return the cached tables of a file, parsing and caching it on a miss"""
+        with stage(recorder, "cache_load", file_path) as record:
+            results = self.get(file_path, options)
+            record["rows"] = sum(len(df) for df, _ in results or [])
+        if results is None:
+            results = process_file(file_path, options, recorder, content)
+            with stage(recorder, "cache_store", file_path):
+                self.put(file_path, options, results)
+        return results
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits its size limit"""
+        try:
+            names = os.listdir(self.cache_dir)
+        except FileNotFoundError:
+            return
+
+        entries = []
+        total = 0
+        for name in names:
+            entry = os.path.join(self.cache_dir, name)
+            try:
+                size = sum(e.stat().st_size for e in os.scandir(entry) if e.is_file())
+                entries.append((os.stat(entry).st_mtime, size, entry))
+            except OSError:
+                continue
+            total += size
+
+        for _, size, entry in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
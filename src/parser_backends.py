@@ -0,0 +1,104 @@
+"""HTML parser backends driving a parser target.
+
+The extraction engine consumes the start/end/data/close events of an lxml
+parser target. lxml's libxml2 parser is by far the fastest; html5lib follows
+the browsers' error recovery exactly and Python's ``html.parser`` recovers
+differently again, so either may parse files that lxml gets wrong. Both are
+adapted here to drive the same target, so backends can be swapped per file.
+"""
+
+from html.parser import HTMLParser
+from typing import List, Optional, Tuple
+
+from lxml import etree
+
+try:
+    import html5lib
+except ImportError:
+    html5lib = None
+
+# Try the backends in order, keeping the first result that passes the checks
+ENGINE_AUTO = "auto"
+ENGINE_LXML = "lxml"
+ENGINE_HTML5LIB = "html5lib"
+ENGINE_HTML_PARSER = "html.parser"
+
+# Fastest first, the order in which backends are tried
+ENGINES = (ENGINE_LXML, ENGINE_HTML5LIB, ENGINE_HTML_PARSER)
+
+
+class _StdlibParser(HTMLParser):
+    """html.parser adapter forwarding events to a parser target"""
+
+    def __init__(self, target):
+        super().__init__(convert_charrefs=True)
+        self._target = target
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]):
+        self._target.start(tag, {name: value or "" for name, value in attrs} if attrs else {})
+
+    def handle_startendtag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]):
+        self.handle_starttag(tag, attrs)
+        self._target.end(tag)
+
+    def handle_endtag(self, tag: str):
+        self._target.end(tag)
+
+    def handle_data(self, data: str):
+        self._target.data(data)
+
+    def close(self):
+        super().close()
+        return self._target.close()
+
+
+class _Html5libParser:
+    """html5lib adapter: parses the whole document on close, then replays its tree as events"""
+
+    def __init__(self, target):
+        self._target = target
+        self._chunks: List[str] = []
+
+    def feed(self, data: str):
+        self._chunks.append(data)
+
+    def close(self):
+        root = html5lib.parse("".join(self._chunks), treebuilder="etree",
+                              namespaceHTMLElements=False)
+        self._chunks = []
+        target = self._target
+        # Iterative walk, deeply nested documents must not hit the recursion limit
+        stack = [(root, False)]
+        while stack:
+            element, closing = stack.pop()
+            if closing:
+                target.end(element.tag)
+            elif isinstance(element.tag, str):
+                target.start(element.tag, dict(element.attrib))
+                if element.text:
+                    target.data(element.text)
+                stack.append((element, True))
+                stack.extend((child, False) for child in reversed(element))
+                continue
+            # Comments are skipped, the text following an element is not
+            if element.tail:
+                target.data(element.tail)
+        return target.close()
+
+
+def available_engines() -> Tuple[str, ...]:
+    """Backends that can be used, html5lib is optional"""
+    return tuple(engine for engine in ENGINES if engine != ENGINE_HTML5LIB or html5lib is not None)
+
+
+def make_parser(engine: str, target):
+    """A parser of the backend feeding the target, with feed() and close()"""
+    if engine == ENGINE_LXML:
+        return etree.HTMLParser(target=target, huge_tree=True)
+    if engine == ENGINE_HTML_PARSER:
+        return _StdlibParser(target)
+    if engine == ENGINE_HTML5LIB:
+        if html5lib is None:
+            raise ValueError("The html5lib parser backend requires the html5lib package")
+        return _Html5libParser(target)
+    raise ValueError(f"Unknown parser backend: {engine}")
@@ -0,0 +1,145 @@
+"""Cheap schema inference for configure.
+
+Only the header rows plus a small sample of rows of each selected table are
+parsed, so the output columns can be announced without reading the whole
+file. The latest results are memoized per file version and reader options, so
+repeated configure calls (e.g. opening the dialog) and the following execute
+reuse them.
+"""
+
+import io
+import os
+import logging
+from collections import OrderedDict
+from dataclasses import replace
+from typing import Dict, Iterable, List, Tuple
+
+import pyarrow as pa
+
+from arrow_output import METADATA_TYPES, TABLE_ID_TYPES, frame_to_arrow, unify_schema
+from file_format import BINARY_FORMATS, read_excel_tables, sniff_format
+from file_reader import ReaderOptions, clean_table, iter_html_chunks, read_html_xls
+from input_sources import is_plain, read_source, source_buffer, source_stat
+from table_extraction import Frame, iter_tables, scan_tables
+
+# Set up logging
+LOGGER = logging.getLogger(__name__)
+
+# Number of data rows sampled per table to infer column types
+SAMPLE_ROWS = 100
+
+# Small chunks so parsing stops shortly after the sampled rows
+SNIFF_CHUNK_SIZE = 1 << 16
+
+# Number of most recently inferred schemas kept
+SCHEMA_CACHE_SIZE = 256
+
+# Inferred schemas by file version, options and metadata flag, least recent first
+_schemas: "OrderedDict[Tuple, pa.Schema]" = OrderedDict()
+
+
+def _chunks(content: str) -> Iterable[str]:
+    for start in range(0, len(content), SNIFF_CHUNK_SIZE):
+        yield content[start:start + SNIFF_CHUNK_SIZE]
+
+
+def _sample(table: Frame, options: ReaderOptions, sample_rows: int) -> pa.Table:
+    """Cleaned first rows of a table as Arrow, typed as in the output of execute"""
+    if isinstance(table, pa.Table):
+        return clean_table(table.slice(0, sample_rows), options)
+    # DataFrame columns with gaps are float, as they reach the output
+    return frame_to_arrow(clean_table(table.head(sample_rows), options))
+
+
+def _first_frames(chunks: Iterable[str], options: ReaderOptions, sample_rows: int,
+                  table_index: int = -1, max_tables: int = 0) -> List[Tuple[int, pa.Table]]:
+    """First row batch of each table, parsing stops once enough tables are sampled"""
+    samples: Dict[int, pa.Table] = {}
+    parse = options.parse
+    if not parse.sampled and not 0 < parse.max_rows <= sample_rows:
+        # Rows after the sample of a table are skipped instead of built
+        parse = replace(parse, max_rows=max(sample_rows, 1))
+    tables = iter_tables(chunks, parse, max(sample_rows, 1),
+                         arrow=options.arrow_output, table_index=table_index)
+    try:
+        for index, table in tables:
+            if index not in samples:
+                samples[index] = _sample(table, options, sample_rows)
+            if table_index >= 0 or (max_tables and len(samples) >= max_tables):
+                break
+    finally:
+        tables.close()
+    return sorted(samples.items(), key=lambda item: item[0])
+
+
+def sample_tables(file_path: str, options: ReaderOptions, sample_rows: int = SAMPLE_ROWS,
+                  max_tables: int = 0) -> List[Tuple[int, pa.Table]]:
+    """Parse the header and the first rows of the selected table(s) of a file.
+
+    Returns (table index, cleaned Arrow sample) pairs in document order. With a
+    table index selected, or ``max_tables`` limiting the number of tables
+    sampled, the file is streamed and reading stops after the sample;
+    otherwise the table index locates every table and only the start of each
+    one is parsed.
+    """
+    with source_buffer(file_path) as buffer:
+        file_format = sniff_format(buffer)
+    if file_format in BINARY_FORMATS:
+        source = file_path if is_plain(file_path) else io.BytesIO(read_source(file_path))
+        sheets = read_excel_tables(source, file_format, options.parse, options.table_index,
+                                   arrow=options.arrow_output, nrows=sample_rows)
+        sheets = sheets[:max_tables or None]
+        return [(index, _sample(sheet, options, sample_rows)) for index, sheet in enumerate(sheets)]
+
+    if options.table_index >= 0 or max_tables:
+        chunks = iter_html_chunks(file_path, options.encoding, SNIFF_CHUNK_SIZE)
+        return _first_frames(chunks, options, sample_rows, options.table_index, max_tables)
+
+    html_content = read_html_xls(file_path, options.encoding)
+    locations = scan_tables(html_content)
+    if locations is None:
+        # Unbalanced markup, sample from a parse of the whole document
+        return _first_frames(_chunks(html_content), options, sample_rows, max_tables=max_tables)
+    if not locations:
+        raise ValueError("No tables found in the HTML content")
+
+    samples = []
+    for index, location in enumerate(locations[:max_tables or None]):
+        table_html = html_content[location.start:location.end]
+        for _, table in _first_frames(_chunks(table_html), options, sample_rows, table_index=0):
+            samples.append((index, table))
+    return samples
+
+
+def infer_schema(file_path: str, options: ReaderOptions, include_metadata: bool = True,
+                 sample_rows: int = SAMPLE_ROWS, separate_metadata: bool = False) -> pa.Schema:
+    """Output schema of a file, inferred from a sample of its rows.
+
+    Columns are ordered as in the output of execute: the columns of each table
+    followed by the metadata columns, unified over all selected tables. With
+    ``separate_metadata`` only the table id joining the metadata table is added.
+    """
+    stat = source_stat(file_path)
+    key = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns,
+           repr(options), include_metadata, sample_rows, separate_metadata)
+    schema = _schemas.get(key)
+    if schema is not None:
+        _schemas.move_to_end(key)
+        return schema
+
+    metadata_types = TABLE_ID_TYPES if separate_metadata else METADATA_TYPES
+    schemas = []
+    for _, table in sample_tables(file_path, options, sample_rows):
+        schema = table.schema
+        if include_metadata:
+            for name, data_type in metadata_types.items():
+                if name not in schema.names:
+                    schema = schema.append(pa.field(name, data_type))
+        schemas.append(schema)
+
+    schema = unify_schema(schemas)
+    LOGGER.info(f"Inferred {len(schema)} column(s) from {file_path}")
+    _schemas[key] = schema
+    while len(_schemas) > SCHEMA_CACHE_SIZE:
+        _schemas.popitem(last=False)
+    return schema
@@ -0,0 +1,193 @@
+"""Parallel parsing of one very large table split into row ranges.
+
+A single huge table is otherwise parsed by one process. Here the table's
+``<tr>`` boundaries are located with a byte scan of the mapped file, the rows
+are cut into ranges, and worker processes each map the same file and parse
+one range; only offsets travel to the workers, not the content. The cell
+strings of the ranges are concatenated in row order and converted once, so
+types are the same as for a single parse. Skipped and header rows are parsed
+by the first range only.
+
+A range boundary is only safe if no row state crosses it, so a table is not
+split when its data rows hold rowspans, nested tables, comments, scripts or
+styles; it is then parsed as a whole.
+"""
+
+import os
+import re
+import codecs
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import replace
+from typing import List, Optional, Tuple
+
+import pyarrow as pa
+
+from file_format import mapped_file
+from table_extraction import (
+    Buffer,
+    Frame,
+    ParseOptions,
+    TableLocation,
+    assemble_table,
+    iter_tables,
+    parse_rows,
+    scan_tables,
+)
+
+# Set up logging
+LOGGER = logging.getLogger(__name__)
+
+# Tables smaller than this are parsed in one piece
+SPLIT_MIN_BYTES = 32 << 20
+
+_ROW_BYTES_PATTERN = re.compile(rb"<tr\b", re.IGNORECASE)
+
+# Markup that would carry state across a row boundary or hide rows from the scan
+_UNSAFE_BYTES_PATTERN = re.compile(rb"rowspan|<table\b|<!--|<script\b|<style\b", re.IGNORECASE)
+
+RowRange = Tuple[int, int]
+
+
+def _ascii_compatible(encoding: str) -> bool:
+    """Whether markup of the encoding can be located by its ASCII bytes"""
+    try:
+        name = codecs.lookup(encoding).name
+    except LookupError:
+        return False
+    return not name.startswith(("utf-16", "utf-32"))
+
+
+def split_rows(buffer: Buffer, location: TableLocation, parts: int,
+               options: ParseOptions) -> Optional[Tuple[int, List[RowRange]]]:
+    """Byte ranges of about equal size cutting a table at <tr> boundaries.
+
+    Returns the offset of the first data row and the ranges. The first range
+    starts at the <table> tag and holds all skipped and header rows, the last
+    one ends with the closing tag. Returns None if the table has too few rows
+    to be split.
+    """
+    first_data_row = options.skip_rows + options.header_rows
+    data_start = None
+    rows = _ROW_BYTES_PATTERN.finditer(buffer, location.start, location.end)
+    for number, match in enumerate(rows):
+        if number == first_data_row:
+            data_start = match.start()
+            break
+    if data_start is None:
+        return None
+
+    size = location.end - data_start
+    boundaries = [location.start]
+    for part in range(1, parts):
+        target = max(data_start + size * part // parts, boundaries[-1] + 1)
+        row = _ROW_BYTES_PATTERN.search(buffer, target, location.end)
+        if row is None:
+            break
+        boundaries.append(row.start())
+    if len(boundaries) < 2:
+        return None
+    boundaries.append(location.end)
+    return data_start, list(zip(boundaries, boundaries[1:]))
+
+
+def _parse_range(file_path: str, encoding: str, row_range: RowRange, check_from: int,
+                 first: bool, last: bool,
+                 options: ParseOptions) -> Optional[Tuple[List, List[pa.Array]]]:
+    """Worker entry point: parse one row range of a mapped file.
+
+    Returns None if the range holds markup that makes the split unsafe.
+    """
+    start, end = row_range
+    with mapped_file(file_path) as buffer:
+        if _UNSAFE_BYTES_PATTERN.search(buffer, check_from, end):
+            return None
+        html_content = str(buffer[start:end], encoding)
+
+    if not first:
+        # Later ranges hold data rows only
+        html_content = "<table>" + html_content
+        options = replace(options, skip_rows=0, header_rows=0, infer_header=False)
+    if not last:
+        html_content += "</table>"
+    return parse_rows(html_content, options)
+
+
+def _parse_whole(buffer: Buffer, location: TableLocation, encoding: str,
+                 options: ParseOptions, arrow: bool) -> List[Frame]:
+    """Parse one located table in this process"""
+    table_html = str(buffer[location.start:location.end], encoding)
+    return [frame for _, frame in iter_tables([table_html], options, arrow=arrow, table_index=0)]
+
+
+def extract_split(buffer: Buffer, file_path: str, encoding: str, options: ParseOptions,
+                  table_index: int = -1, workers: int = 0, arrow: bool = False,
+                  min_bytes: Optional[int] = None) -> Optional[List[Frame]]:
+    """Extract the selected table(s) of a file, splitting large ones across processes.
+
+    ``buffer`` is the mapped content of ``file_path``; workers map the file
+    themselves. Tables of at least ``min_bytes`` (default SPLIT_MIN_BYTES)
+    are parsed in ``workers`` row ranges (0 for one per CPU core), smaller
+    ones in this process.
+    Returns None if no selected table is large enough, or the file cannot be
+    split (a UTF-16/32 encoding, unbalanced table tags, a row limit,
+    sampling or inferred header rows); the caller then parses the document
+    as usual.
+    """
+    workers = workers or os.cpu_count() or 1
+    min_bytes = SPLIT_MIN_BYTES if min_bytes is None else min_bytes
+    if workers < 2 or options.max_rows or options.sampled or not _ascii_compatible(encoding):
+        return None
+    if options.header_rows == 0 and options.infer_header:
+        # The header rows are only known once the rows are parsed
+        return None
+    locations = scan_tables(buffer)
+    if not locations or table_index >= len(locations):
+        return None
+    selected = locations if table_index < 0 else [locations[table_index]]
+    if all(location.end - location.start < min_bytes for location in selected):
+        return None
+
+    plans = {}
+    for position, location in enumerate(selected):
+        if location.end - location.start >= min_bytes:
+            plan = split_rows(buffer, location, workers, options)
+            if plan:
+                plans[position] = plan
+
+    frames = []
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                position: [executor.submit(_parse_range, file_path, encoding, row_range,
+                                           # Header rows may hold spans, data rows may not
+                                           data_start if number == 0 else row_range[0],
+                                           number == 0, number == len(ranges) - 1, options)
+                           for number, row_range in enumerate(ranges)]
+                for position, (data_start, ranges) in plans.items()
+            }
+
+            for position, location in enumerate(selected):
+                index = table_index if table_index >= 0 else position
+                results = [future.result() for future in futures.get(position, [])]
+                parsed = [result for result in results if result is not None]
+                if results and len(parsed) == len(results):
+                    header = parsed[0][0]
+                    frame = assemble_table(header, [columns for _, columns in parsed], options,
+                                           arrow)
+                    LOGGER.info(f"Parsed table {index} of {file_path} in {len(results)} row ranges")
+                    frames.append(frame)
+                    continue
+                if results:
+                    LOGGER.info(f"Table {index} of {file_path} cannot be split safely, "
+                                f"parsing it as a whole")
+                frames.extend(_parse_whole(buffer, location, encoding, options, arrow))
+    except UnicodeDecodeError as e:
+        # The whole-document path falls back to cp1252, then latin-1
+        LOGGER.warning(f"Failed to decode {file_path} with {encoding}: {e}")
+        return None
+    except BrokenProcessPool as e:
+        LOGGER.warning(f"Process pool failed ({e}), parsing {file_path} in one process")
+        return None
+    return frames
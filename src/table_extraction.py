@@ -0,0 +1,939 @@
+"""Single-pass HTML table extraction engine.
+
+The document is walked once with lxml's event-driven HTML parser. Cells are
+buffered row by row as ``<tr>``/``<td>`` events arrive, so no document tree is
+built and no table is serialized back to a string for a second parse. The
+parser can be fed incrementally, so tables (or row batches of very large
+tables) are emitted as soon as they are complete. Buffered rows are transposed
+into columns and converted with pyarrow compute kernels into Arrow arrays,
+which are either returned as ``pyarrow.Table`` or handed to pandas.
+"""
+
+import re
+import sys
+import mmap
+import random
+import logging
+import warnings
+from dataclasses import dataclass
+from typing import (
+    Dict, Generator, Iterable, Iterator, List, NamedTuple, Optional, Pattern, Sequence, Tuple,
+    Union,
+)
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from column_names import flatten_label
+from office_markup import is_office_markup, iter_stripped, office_number
+from parser_backends import ENGINE_AUTO, ENGINES, available_engines, make_parser
+
+# Set up logging
+LOGGER = logging.getLogger(__name__)
+
+# Cell texts pandas reads as booleans
+TRUE_VALUES = pa.array(["True", "TRUE", "true"])
+FALSE_VALUES = pa.array(["False", "FALSE", "false"])
+
+# Strings pandas treats as missing by default (``keep_default_na=True``)
+DEFAULT_NA_VALUES = frozenset([
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan",
+    "1.#IND", "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a",
+    "nan", "null",
+])
+
+
+@dataclass(frozen=True)
+class ParseOptions:
+    """Plain snapshot of the parsing settings used by the extraction engine"""
+
+    header_rows: int = 1
+    skip_rows: int = 0
+    thousands: str = ","
+    decimal: str = "."
+    na_values: Tuple[str, ...] = ()
+    parse_dates: bool = True
+    # At most this many data rows per table, 0 for all
+    max_rows: int = 0
+    # Share of data rows kept, chosen at random with the seed
+    sample_fraction: float = 1.0
+    # With max_rows: a uniform random sample of the whole table instead of the first rows
+    reservoir: bool = False
+    sample_seed: int = 0
+    # Merged data cells repeat their value in every covered cell, or only fill the first
+    fill_merged: bool = True
+    # Parser backend, see parser_backends; auto falls back from lxml for files it fails on
+    engine: str = ENGINE_AUTO
+    # Office exports lose their styling markup before parsing, see office_markup
+    strip_office: bool = True
+    # Numeric cells of Office exports take their unformatted x:num value
+    office_numbers: bool = False
+    # With header_rows 0, <thead> rows or leading rows of <th> cells become the
+    # header, as with pd.read_html
+    infer_header: bool = True
+
+    @property
+    def sampled(self) -> bool:
+        """Whether rows are chosen at random"""
+        return self.sample_fraction < 1 or (self.reservoir and self.max_rows > 0)
+
+
+# Table tags for scan_tables; comments, scripts and styles are matched so they
+# can be skipped (group 1 is None for them)
+_TABLE_TAG_PATTERN = re.compile(
+    r"<!--.*?-->|<script\b.*?</script\s*>|<style\b.*?</style\s*>|<(/?table)\b[^>]*>",
+    re.IGNORECASE | re.DOTALL,
+)
+_TABLE_TAG_BYTES_PATTERN = re.compile(_TABLE_TAG_PATTERN.pattern.encode("ascii"),
+                                      re.IGNORECASE | re.DOTALL)
+# Table and row tags outside comments, scripts and styles, see _markup_counts. Cells
+# are not counted, they are many and a backend losing cells loses their rows too.
+_MARKUP_TAG_PATTERN = re.compile(
+    r"<(?:!--.*?-->|script\b.*?</script\s*>|style\b.*?</style\s*>|(/?t(?:able|r))\b)",
+    re.IGNORECASE | re.DOTALL,
+)
+_ROW_PATTERN = re.compile(r"<tr\b", re.IGNORECASE)
+_CELL_PATTERN = re.compile(r"<t[dh]\b", re.IGNORECASE)
+
+# Larger chunks are fed in pieces, so parsing can stop early within a chunk
+FEED_SIZE = 1 << 20
+
+# Parser backend that succeeded after another failed, by document group
+_group_engines: Dict[Optional[str], str] = {}
+
+# A converted table, depending on the requested output
+Frame = Union[pd.DataFrame, pa.Table]
+
+# Undecoded content: a mapped file or its bytes
+Buffer = Union[mmap.mmap, bytes]
+
+
+class _TableBuilder:
+    """Column buffers for a single <table> being parsed"""
+
+    def __init__(self, index: int, options: ParseOptions, active: bool = True):
+        self.index = index
+        self.options = options
+        # Inactive tables are only counted, their cells are not collected
+        self.active = active
+        # Cleared once the row limit is reached, later rows are ignored
+        self.collecting = active
+        self.header: List[List[Optional[str]]] = []
+        # Resolved data rows; transposed into columns once, when converted
+        self.rows: List[List[Optional[str]]] = []
+        self.width = 0
+        self.num_rows = 0
+        self.batches = 0
+        # Cell strings of earlier row batches by column, see take_raw
+        self.parts: List[List[pa.Array]] = []
+        self._cells: Optional[List[str]] = None
+        self._cell_parts: Optional[List[str]] = None
+        self._cell_span = (1, 1)
+        self._cell_number: Optional[str] = None
+        # (colspan, rowspan) of the spanning cells of the current row by position
+        self._spans: Dict[int, Tuple[int, int]] = {}
+        self._rowspans: Dict[int, Tuple[int, Optional[str]]] = {}
+        self._first_data_row = options.skip_rows + options.header_rows
+        # Header rows inferred from the markup, see _infer_head
+        self._infer_header = options.header_rows == 0 and options.infer_header
+        if self._infer_header:
+            self._first_data_row = sys.maxsize
+        # Whether each leading head row has text
+        self._head_filled: List[bool] = []
+        self._in_thead = False
+        self._seen_thead = False
+        self._row_head = False
+        # Row limit and sampling state, see _sample_row
+        self.rows_kept = 0
+        self.rows_seen = 0
+        self._keep = True
+        self._offered = True
+        self._collect_text = True
+        self._slot: Optional[int] = None
+        self._row_ids: List[int] = []
+        self._rng = (random.Random(options.sample_seed * 1000003 + index) if options.sampled
+                     else None)
+
+    def start_row(self) -> List[str]:
+        if self._cells is not None:
+            self.end_row()
+        cells: List[str] = []
+        self._cells = cells
+        # A row of the <thead>, or of <th> cells only until a <td> starts
+        self._row_head = self._in_thead or not self._seen_thead
+        if self.num_rows >= self._first_data_row:
+            self._keep = self._sample_row()
+        else:
+            self._keep, self._offered, self._slot = True, True, None
+        return cells
+
+    def _sample_row(self) -> bool:
+        """Whether the next data row is kept, decided before its cells are built"""
+        options = self.options
+        self._slot = None
+        self._offered = True
+        if self._rng is None:
+            return True
+        if options.sample_fraction < 1 and self._rng.random() >= options.sample_fraction:
+            self._offered = False
+            return False
+        if options.reservoir and options.max_rows and self.rows_seen >= options.max_rows:
+            # Reservoir sampling: the row replaces a kept one with probability k / (n + 1)
+            slot = self._rng.randrange(self.rows_seen + 1)
+            if slot >= options.max_rows:
+                return False
+            self._slot = slot
+        return True
+
+    def start_head(self):
+        self._in_thead = self._seen_thead = True
+
+    def end_head(self):
+        self._in_thead = False
+
+    def start_cell(self, attrib, header_cell: bool = False):
+        cells = self._cells if self._cells is not None else self.start_row()
+        if not header_cell and not self._in_thead:
+            self._row_head = False
+        if self._cell_parts is not None:
+            self.end_cell()
+        self._cell_parts = []
+        # Most cells have no attributes, which spares two lookups per cell
+        if attrib:
+            span = self._cell_span = (_span(attrib.get("colspan")), _span(attrib.get("rowspan")))
+            if span != (1, 1):
+                self._spans[len(cells)] = span
+            if self.options.office_numbers:
+                self._cell_number = attrib.get("x:num")
+        else:
+            self._cell_span = (1, 1)
+        # Text of dropped rows is only needed where a rowspan carries it on
+        self._collect_text = self._keep or self._cell_span[1] > 1
+
+    def add_text(self, text: str):
+        if self._cell_parts is not None and self._collect_text:
+            self._cell_parts.append(text)
+
+    def end_cell(self):
+        if self._cell_parts is None:
+            return
+        text = " ".join("".join(self._cell_parts).split())
+        if self._cell_number is not None:
+            text = office_number(text, self._cell_number, self.options.decimal)
+            self._cell_number = None
+        self._cells.append(text)
+        self._cell_parts = None
+
+    def end_row(self):
+        self.end_cell()
+        cells, self._cells = self._cells, None
+        spans, self._spans = self._spans, {}
+        if not spans and not self._rowspans:
+            # Nothing to resolve, the cells are the row
+            if cells:
+                self._commit_row(cells)
+            return
+
+        # Resolve colspan/rowspan before skipping so that spans started in
+        # skipped rows still land in the right columns. Header rows are always
+        # filled, their labels name every covered column.
+        fill = self.options.fill_merged or self.num_rows < self._first_data_row
+        carried, self._rowspans = self._rowspans, {}
+        values: List[Optional[str]] = []
+        for position, text in enumerate(cells):
+            while len(values) in carried:
+                values.append(self._take_carry(carried, len(values), fill))
+            colspan, rowspan = spans.get(position, (1, 1))
+            for i in range(colspan):
+                if rowspan > 1:
+                    self._rowspans[len(values)] = (rowspan - 1, text)
+                values.append(text if fill or i == 0 else None)
+        for col in sorted(c for c in carried if c >= len(values)):
+            values.extend([None] * (col - len(values)))
+            values.append(self._take_carry(carried, col, fill))
+
+        self._commit_row(values)
+
+    def _take_carry(self, carried, col: int, fill: bool) -> Optional[str]:
+        remaining, text = carried[col]
+        if remaining > 1:
+            self._rowspans[col] = (remaining - 1, text)
+        return text if fill else None
+
+    def _infer_head(self, row_number: int, values: List[Optional[str]]) -> bool:
+        """Whether a row is skipped or may be a header row, while the header is inferred.
+
+        As with pd.read_html, the table has as many header rows as leading
+        head rows, taken after the skipped rows. The first row after them
+        ends the header, see _end_header.
+        """
+        if self._row_head and len(self._head_filled) == row_number:
+            self._head_filled.append(any(values))
+        if row_number < self.options.skip_rows:
+            return True
+        if row_number - self.options.skip_rows < len(self._head_filled):
+            self.header.append(values)
+            return True
+        self._end_header()
+        self._first_data_row = row_number
+        # Rows are kept while they may be header rows; this one is sampled now
+        self._keep = self._sample_row()
+        return False
+
+    def _end_header(self):
+        """Pick the inferred header rows from the candidates, the rows after them are data"""
+        self._infer_header = False
+        filled = self._head_filled
+        # Of several head rows, pandas only takes those with text
+        positions = ([0] if len(filled) == 1
+                     else [i for i, has_text in enumerate(filled) if has_text])
+        candidates = self.header
+        self.header = [candidates[i] for i in positions if i < len(candidates)]
+        for values in candidates[positions[-1] + 1 if positions else 0:]:
+            self._keep = self._sample_row()
+            self._commit_data(values)
+
+    def _commit_row(self, values: List[Optional[str]]):
+        row_number = self.num_rows
+        self.num_rows += 1
+        if self._infer_header:
+            if self._infer_head(row_number, values):
+                return
+        elif row_number < self.options.skip_rows:
+            return
+        elif row_number < self._first_data_row:
+            self.header.append(values)
+            return
+        self._commit_data(values)
+
+    def _commit_data(self, values: List[Optional[str]]):
+        if self._offered:
+            self.rows_seen += 1
+        if not self._keep:
+            return
+        if len(values) > self.width:
+            self.width = len(values)
+        if self._slot is not None:
+            self.rows[self._slot] = values
+            self._row_ids[self._slot] = self.rows_seen
+            return
+
+        self.rows.append(values)
+        self.rows_kept += 1
+        if self.options.reservoir:
+            self._row_ids.append(self.rows_seen)
+        elif self.options.max_rows and self.rows_kept >= self.options.max_rows:
+            self.collecting = False
+
+    def finish(self):
+        if self._cells is not None:
+            self.end_row()
+        if self._infer_header:
+            self._end_header()
+
+    def take_batch(self, na_values: pa.Array, arrow: bool = False) -> Frame:
+        """Convert the buffered data rows and release them, keeping the header"""
+        frame = self.convert(na_values, arrow)
+        self.rows = []
+        self.batches += 1
+        return frame
+
+    def take_raw(self):
+        """Pack the buffered data rows into string columns, converted with the whole table"""
+        self.parts.append(self.raw_columns())
+        self.rows = []
+        self.batches += 1
+
+    def convert_whole(self, arrow: bool = False) -> Frame:
+        """Convert the packed and the buffered rows as one table"""
+        return assemble_table(self.header, self.parts + [self.raw_columns()], self.options, arrow)
+
+    def convert(self, na_values: pa.Array, arrow: bool = False) -> Frame:
+        """Convert the column buffers into an Arrow table or a DataFrame"""
+        return self.to_arrow(na_values) if arrow else self.to_frame(na_values)
+
+    def _columns(self) -> List[Tuple[Optional[str], ...]]:
+        """Cell strings of the buffered rows by column, as wide as the widest row or header"""
+        width = max([self.width] + [len(row) for row in self.header])
+        rows = self.rows
+        if self._row_ids:
+            # Reservoir rows back in document order
+            rows = [rows[i] for i in sorted(range(len(rows)), key=self._row_ids.__getitem__)]
+
+        # Short rows are padded, then the rows are transposed in one C-level pass
+        rows = [row if len(row) == width else row + [None] * (width - len(row)) for row in rows]
+        return list(zip(*rows)) if rows else [()] * width
+
+    def to_arrow(self, na_values: pa.Array) -> pa.Table:
+        """Convert the column buffers into an Arrow table"""
+        columns = self._columns()
+        arrays = [_convert_column(values, self.options, na_values) for values in columns]
+        return _to_frame(arrays, _build_column_index(self.header, len(columns)), arrow=True)
+
+    def to_frame(self, na_values: pa.Array) -> pd.DataFrame:
+        """Convert the column buffers into a typed DataFrame"""
+        columns = self._columns()
+        arrays = [_convert_column(values, self.options, na_values) for values in columns]
+        return _to_frame(arrays, _build_column_index(self.header, len(columns)))
+
+    def raw_columns(self) -> List[pa.Array]:
+        """The buffered cell strings by column, without any conversion"""
+        return [pa.array(values, type=pa.string()) for values in self._columns()]
+
+
+class _TableCollector:
+    """lxml parser target turning table events into column buffers"""
+
+    def __init__(self, options: ParseOptions, arrow: bool = False, table_index: int = -1):
+        self.options = options
+        self.arrow = arrow
+        self.table_index = table_index
+        self.done = False
+        # Whether the row limit ended the selected table before its end tag
+        self.truncated = False
+        self.tables: List[_TableBuilder] = []
+        self._stack: List[_TableBuilder] = []
+        self._table_count = 0
+        # Row tags parsed inside tables, checked against the markup
+        self.row_tags = 0
+
+    def start(self, tag, attrib):
+        if tag == "table":
+            active = self.table_index < 0 or self._table_count == self.table_index
+            self._stack.append(_TableBuilder(self._table_count, self.options, active))
+            self._table_count += 1
+        elif not self._stack:
+            return
+        elif tag == "tr":
+            self.row_tags += 1
+            if self._stack[-1].collecting:
+                self._stack[-1].start_row()
+        elif tag == "thead":
+            self._stack[-1].start_head()
+        elif not self._stack[-1].collecting:
+            return
+        elif tag in ("td", "th"):
+            self._stack[-1].start_cell(attrib, tag == "th")
+        elif tag == "br":
+            self.data("\n")
+
+    def end(self, tag):
+        if not self._stack:
+            return
+        if tag == "table":
+            builder = self._stack.pop()
+            if builder.active:
+                builder.finish()
+                self.tables.append(builder)
+                # Only the selected table was wanted, the rest can be skipped
+                self.done = self.table_index >= 0
+        elif tag == "thead":
+            self._stack[-1].end_head()
+        elif not self._stack[-1].collecting:
+            return
+        elif tag == "tr":
+            builder = self._stack[-1]
+            builder.end_row()
+            if not builder.collecting and self.table_index >= 0:
+                # The selected table has all its rows, the rest is not parsed
+                self.truncated = True
+                self.end("table")
+        elif tag in ("td", "th"):
+            self._stack[-1].end_cell()
+
+    def data(self, text):
+        # Text of nested tables also belongs to the enclosing cell
+        for builder in self._stack:
+            builder.add_text(text)
+
+    def close(self):
+        while self._stack:
+            self.end("table")
+        return self.tables
+
+    def drain(self, na_values: pa.Array, batch_rows: int,
+              whole: bool = False) -> Iterator[Tuple[int, Frame]]:
+        """Yield finished tables and full row batches of open tables.
+
+        With ``whole`` full row batches are packed into string columns
+        instead, and finished tables are converted as a whole.
+        """
+        finished, self.tables = self.tables, []
+        for builder in finished:
+            if builder.batches and not builder.rows and not builder.parts:
+                continue
+            try:
+                if builder.parts:
+                    yield builder.index, builder.convert_whole(self.arrow)
+                else:
+                    yield builder.index, builder.convert(na_values, self.arrow)
+            except Exception as e:
+                LOGGER.warning(f"Failed to parse table {builder.index}: {e}")
+
+        if batch_rows > 0:
+            for builder in self._stack:
+                # A reservoir holds its rows until the table is complete
+                if (builder.active and not self.options.reservoir
+                        and len(builder.rows) >= batch_rows):
+                    if whole:
+                        builder.take_raw()
+                    else:
+                        yield builder.index, builder.take_batch(na_values, self.arrow)
+
+    @property
+    def table_count(self) -> int:
+        return self._table_count
+
+
+def _span(value) -> int:
+    """Parse a colspan/rowspan attribute, defaulting to 1"""
+    if value is None:
+        return 1
+    try:
+        return max(int(value), 1)
+    except (TypeError, ValueError):
+        return 1
+
+
+def _mangle_duplicates(names: List) -> List:
+    """Rename duplicate column names the way pandas does (A, A.1, A.2)"""
+    seen: Dict = {}
+    result = []
+    for name in names:
+        count = seen.get(name, 0)
+        seen[name] = count + 1
+        result.append(name if count == 0 else f"{name}.{count}")
+    return result
+
+
+def _build_column_index(header: List[List[Optional[str]]], width: int):
+    """Build column labels from the collected header rows"""
+    if not header:
+        return pd.RangeIndex(width)
+
+    levels = []
+    for level, row in enumerate(header):
+        row = row + [None] * (width - len(row))
+        if len(header) == 1:
+            levels.append([name or f"Unnamed: {i}" for i, name in enumerate(row)])
+        else:
+            levels.append([name or f"Unnamed: {i}_level_{level}"
+                           for i, name in enumerate(row)])
+
+    if len(levels) == 1:
+        return pd.Index(_mangle_duplicates(levels[0]), dtype=object)
+    return pd.MultiIndex.from_arrays(levels)
+
+
+def _to_frame(arrays: List[pa.Array], labels, arrow: bool = False) -> Frame:
+    """Arrow table or DataFrame of converted columns and their labels"""
+    if arrow:
+        return pa.Table.from_arrays(arrays, names=[flatten_label(label) for label in labels])
+    # Empty columns become float NaN columns, as with pd.read_html
+    arrays = [pa.nulls(len(a), pa.float64()) if a.type == pa.null() and len(a) else a
+              for a in arrays]
+    table = pa.Table.from_arrays(arrays, names=[str(i) for i in range(len(arrays))])
+    df = table.to_pandas()
+    df.columns = labels
+    return df
+
+
+def _convert_column(values: Union[Sequence[Optional[str]], pa.Array], options: ParseOptions,
+                    na_values: pa.Array) -> pa.Array:
+    """Convert one column of cell strings to numbers or dates where possible"""
+    array = values if isinstance(values, pa.Array) else pa.array(values, type=pa.string())
+    missing = pc.is_in(array, value_set=na_values)
+    if pc.any(missing).as_py():
+        array = pc.if_else(missing, pa.scalar(None, pa.string()), array)
+    present = len(array) - array.null_count
+    if present == 0:
+        return pa.nulls(len(array))
+
+    text = array
+    if options.thousands or options.decimal and options.decimal != ".":
+        # Separators are only replaced in values reading as numbers, as pandas does
+        numeric = pc.match_substring_regex(array, _number_pattern(options))
+        replaced = array
+        if options.thousands:
+            replaced = pc.replace_substring(replaced, options.thousands, "")
+        if options.decimal and options.decimal != ".":
+            replaced = pc.replace_substring(replaced, options.decimal, ".")
+        text = pc.if_else(numeric, replaced, array)
+    # Integers beyond int64 stay exact as uint64
+    for numeric_type in (pa.int64(), pa.uint64(), pa.float64()):
+        try:
+            return pc.cast(text, numeric_type)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            continue
+
+    is_true = pc.is_in(array, value_set=TRUE_VALUES)
+    if pc.sum(is_true).as_py() + pc.sum(pc.is_in(array, value_set=FALSE_VALUES)).as_py() == present:
+        return pc.if_else(pc.is_null(array), pa.scalar(None, pa.bool_()), is_true)
+
+    if options.parse_dates:
+        dates = _parse_dates(array, present)
+        if dates is not None:
+            return dates
+
+    return array
+
+
+def _number_pattern(options: ParseOptions) -> str:
+    """Pattern of numbers with the separators of the options, the one pandas' parser uses"""
+    decimal = re.escape(options.decimal or ".")
+    if not options.thousands:
+        return rf"^[\-\+]?[0-9]*({decimal}[0-9]*)?([0-9]?(E|e)\-?[0-9]+)?$"
+    thousands = re.escape(options.thousands)
+    return rf"^[\-\+]?([0-9]+{thousands}|[0-9])*({decimal}[0-9]*)?([0-9]?(E|e)\-?[0-9]+)?$"
+
+
+def _parse_dates(array: pa.Array, present: int) -> Optional[pa.Array]:
+    """Parse a column as dates if every non-missing value is a date"""
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        # Probe a single value first so text columns fail fast
+        first = pc.drop_null(array)[0].as_py()
+        if pd.isna(pd.to_datetime(first, errors="coerce")):
+            return None
+        try:
+            dates = pd.to_datetime(array.to_pandas(), errors="coerce")
+        except (ValueError, TypeError, OverflowError):
+            return None
+    if dates.notna().sum() != present:
+        return None
+    return pa.array(dates)
+
+
+def _na_array(options: ParseOptions) -> pa.Array:
+    """Strings treated as missing, as an Arrow value set"""
+    return pa.array(sorted(DEFAULT_NA_VALUES.union(options.na_values)), type=pa.string())
+
+
+class TableLocation(NamedTuple):
+    """Position and approximate shape of a <table> found by scan_tables"""
+
+    start: int
+    end: int
+    rows: int
+    cols: int
+
+
+def scan_tables(html_content: Union[str, Buffer],
+                shapes: bool = False) -> Optional[List[TableLocation]]:
+    """Locate every <table> in document order without parsing the document.
+
+    Returns None if the table tags are not balanced, in which case offsets
+    cannot be trusted and the document has to be parsed as a whole. Row
+    counts include rows of nested tables, column counts are the number of
+    cells in the first row. Shapes take a second pass over every table, so
+    they are only counted with ``shapes``; otherwise, and always for
+    undecoded content (bytes or a mapped file in an ASCII-compatible
+    encoding, scanned for byte offsets), rows and cols are 0.
+    """
+    table_tag_pattern: Pattern = _TABLE_TAG_PATTERN
+    if not isinstance(html_content, str):
+        table_tag_pattern = _TABLE_TAG_BYTES_PATTERN
+    # Content whose table shapes are counted
+    text = html_content if shapes and isinstance(html_content, str) else None
+
+    locations: List[Optional[TableLocation]] = []
+    open_tables: List[Tuple[int, int]] = []
+    for match in table_tag_pattern.finditer(html_content):
+        tag = match.group(1)
+        if tag is None:
+            continue
+        if tag[:1] not in ("/", b"/"):
+            open_tables.append((len(locations), match.start()))
+            locations.append(None)
+        elif not open_tables:
+            return None
+        else:
+            position, start = open_tables.pop()
+            end = match.end()
+            rows, cols = _table_shape(text, start, end) if text is not None else (0, 0)
+            locations[position] = TableLocation(start, end, rows, cols)
+    if open_tables:
+        return None
+    return [location for location in locations if location is not None]
+
+
+def _table_shape(html_content: str, start: int, end: int) -> Tuple[int, int]:
+    """Rows and columns of the first row of the table between two offsets"""
+    rows = len(_ROW_PATTERN.findall(html_content, start, end))
+    first_row = _ROW_PATTERN.search(html_content, start, end)
+    cols = 0
+    if first_row:
+        next_row = _ROW_PATTERN.search(html_content, first_row.end(), end)
+        cols = len(_CELL_PATTERN.findall(html_content, first_row.end(),
+                                         next_row.start() if next_row else end))
+    return rows, cols
+
+
+def _pieces(chunk: str) -> Iterator[str]:
+    if len(chunk) <= FEED_SIZE:
+        yield chunk
+        return
+    for start in range(0, len(chunk), FEED_SIZE):
+        yield chunk[start:start + FEED_SIZE]
+
+
+def iter_tables(chunks: Iterable[str], options: ParseOptions, batch_rows: int = 0,
+                arrow: bool = False, table_index: int = -1,
+                whole: bool = False) -> Generator[Tuple[int, Frame], None, None]:
+    """Parse HTML incrementally, yielding (table index, frame) pairs.
+
+    Each table is yielded as soon as its closing tag has been parsed and its
+    buffers are released. With ``batch_rows > 0`` a table is additionally cut
+    into frames of at most roughly that many rows, so memory depends on the
+    batch size rather than on the size of the document. With ``whole`` the
+    batches are only packed into Arrow string columns, which hold far less
+    than the Python row lists, and each table is yielded once, converted as
+    a whole, so its columns get the types of the complete table. Nested tables close
+    before their parents, so indexes are not necessarily ascending. With
+    ``arrow`` the frames are ``pyarrow.Table`` objects with string column names.
+    With ``table_index >= 0`` only that table is collected and parsing stops
+    as soon as it is complete, or as soon as it has ``options.max_rows`` rows.
+    Rows dropped by the row limit or by sampling are never built. Streamed
+    content cannot be checked as a whole, so the automatic backend is lxml.
+    """
+    if options.strip_office:
+        chunks = iter_stripped(chunks, options.office_numbers)
+    collector = _TableCollector(options, arrow, table_index)
+    parser = make_parser(_stream_engine(options), collector)
+    na_values = _na_array(options)
+
+    for chunk in chunks:
+        # Only a selected table lets parsing stop early, so only then pieces help
+        pieces = _pieces(chunk) if table_index >= 0 else (chunk,)
+        for piece in pieces:
+            parser.feed(piece)
+            yield from collector.drain(na_values, batch_rows, whole)
+            if collector.done:
+                return
+    parser.close()
+    yield from collector.drain(na_values, batch_rows, whole)
+
+    if not collector.table_count:
+        raise ValueError("No tables found in the HTML content")
+    if 0 <= table_index and not collector.done:
+        raise ValueError(f"Table index {table_index} out of range. "
+                         f"File contains {collector.table_count} tables.")
+
+
+def _stream_engine(options: ParseOptions) -> str:
+    """Backend of incremental parses, which cannot fall back"""
+    return ENGINES[0] if options.engine == ENGINE_AUTO else options.engine
+
+
+def _feed_pieces(html_content: str, options: ParseOptions, split: bool) -> Iterable[str]:
+    """Pieces of a document to feed, without the styling markup of Office exports if enabled.
+
+    Office markup is stripped piece by piece, so no stripped copy of the
+    whole document is made. Other documents are only cut into pieces if
+    ``split``.
+    """
+    if options.strip_office and is_office_markup(html_content):
+        return iter_stripped(_pieces(html_content), options.office_numbers)
+    return _pieces(html_content) if split else (html_content,)
+
+
+def _engine_order(options: ParseOptions, group: Optional[str]) -> List[str]:
+    """Backends to try, the one that last succeeded for the group right after the fastest"""
+    if options.engine != ENGINE_AUTO:
+        return [options.engine]
+    engines = list(available_engines())
+    remembered = _group_engines.get(group)
+    if remembered in engines[1:]:
+        # Only a hint, clean documents of the group still get the fastest backend
+        engines.remove(remembered)
+        engines.insert(1, remembered)
+    return engines
+
+
+def _markup_counts(html_content: str) -> Tuple[int, int]:
+    """Numbers of table tags and of the row tags inside tables in the markup"""
+    tables = rows = depth = 0
+    for tag in _MARKUP_TAG_PATTERN.findall(html_content):
+        tag = tag.lower()
+        if tag == "table":
+            tables += 1
+            depth += 1
+        elif tag == "/table":
+            depth = max(depth - 1, 0)
+        elif tag == "tr" and depth:
+            # Parsers drop rows outside tables, so they are not lost
+            rows += 1
+    return tables, rows
+
+
+def _parse(html_content: str, options: ParseOptions, arrow: bool, table_index: int,
+           engine: str) -> Tuple[List[Tuple[int, Frame]], _TableCollector, bool]:
+    """Parse a whole document with one backend.
+
+    Returns the (table index, frame) pairs, the collector and whether the
+    whole document was parsed, which it is not if parsing stopped early or
+    the row limit ended the table, even within the last piece.
+    """
+    collector = _TableCollector(options, arrow, table_index)
+    parser = make_parser(engine, collector)
+    na_values = _na_array(options)
+    frames: List[Tuple[int, Frame]] = []
+    pieces = iter(_feed_pieces(html_content, options, table_index >= 0))
+    piece = next(pieces, None)
+    while piece is not None:
+        parser.feed(piece)
+        # Looked up before stopping, so a stop within the last piece is known
+        piece = next(pieces, None)
+        frames.extend(collector.drain(na_values, 0))
+        if collector.done:
+            break
+    else:
+        parser.close()
+        frames.extend(collector.drain(na_values, 0))
+    return frames, collector, piece is None and not collector.truncated
+
+
+def _incomplete(collector: _TableCollector, expected: Tuple[int, int]) -> Optional[str]:
+    """What a parse lost compared to the tags of the markup, None if nothing"""
+    tables, rows = expected
+    # Lenient backends may add implied tags, but must not lose any
+    if collector.table_count < tables:
+        return f"{collector.table_count} of {tables} tables"
+    if collector.row_tags < rows:
+        return f"{collector.row_tags} of {rows} rows"
+    return None
+
+
+def _parse_checked(html_content: str, options: ParseOptions, arrow: bool, table_index: int,
+                   group: Optional[str]) -> Tuple[List[Tuple[int, Frame]], _TableCollector]:
+    """Parse with the fastest backend whose result is complete.
+
+    The tables and rows parsed are checked against a scan of the markup; if
+    the parse lost some, the next backend is tried. A backend that succeeds
+    after another failed is remembered for the ``group`` (e.g. the folder of
+    the file) and tried next when the fastest one fails on a later document
+    of the group. If no backend passes, the most complete parse is kept.
+    """
+    engines = _engine_order(options, group)
+    expected = _markup_counts(html_content) if len(engines) > 1 else None
+    best = None
+    error: Optional[Exception] = None
+    for engine in engines:
+        try:
+            frames, collector, complete = _parse(html_content, options, arrow, table_index, engine)
+        except Exception as e:
+            LOGGER.warning(f"Parser backend {engine} failed: {e}")
+            error = e
+            continue
+
+        # A parse stopped early cannot be compared to the whole markup
+        problem = _incomplete(collector, expected) if expected and complete else None
+        if problem is None:
+            if engine != engines[0] and group is not None:
+                LOGGER.info(f"Using parser backend {engine} for {group}")
+                _group_engines[group] = engine
+            return frames, collector
+
+        LOGGER.info(f"Parser backend {engine} only found {problem}, trying the next one")
+        score = (collector.table_count, collector.row_tags)
+        if best is None or score > best[0]:
+            best = (score, frames, collector)
+
+    if best is None:
+        raise error if error is not None else ValueError("No parser backend available")
+    LOGGER.warning("No parser backend parsed every table and row, keeping the most complete result")
+    return best[1], best[2]
+
+
+def extract_tables(html_content: str, options: ParseOptions, arrow: bool = False,
+                   group: Optional[str] = None) -> List[Frame]:
+    """Extract all tables from HTML content in a single parse.
+
+    With a row limit that keeps the first rows, each table is parsed on its
+    own instead, so parsing of a table stops once it has enough rows. The
+    parser backend is chosen per document, see _parse_checked.
+    """
+    if options.max_rows and not options.reservoir:
+        locations = scan_tables(html_content)
+        if locations:
+            frames: List[Frame] = []
+            for location in locations:
+                table_html = html_content[location.start:location.end]
+                indexed, _ = _parse_checked(table_html, options, arrow, 0, group)
+                frames.extend(frame for _, frame in indexed)
+            return frames
+
+    indexed, collector = _parse_checked(html_content, options, arrow, -1, group)
+    if not collector.table_count:
+        raise ValueError("No tables found in the HTML content")
+    return [frame for _, frame in sorted(indexed, key=lambda item: item[0])]
+
+
+def extract_table(html_content: str, options: ParseOptions, table_index: int,
+                  arrow: bool = False, group: Optional[str] = None) -> Frame:
+    """Extract a single table, parsing only that table's part of the document"""
+    locations = scan_tables(html_content)
+    if locations is None:
+        # Unbalanced markup, let the parser find the table
+        table_html, index = html_content, table_index
+    elif not locations:
+        raise ValueError("No tables found in the HTML content")
+    elif table_index >= len(locations):
+        raise ValueError(f"Table index {table_index} out of range. "
+                         f"File contains {len(locations)} tables.")
+    else:
+        location = locations[table_index]
+        table_html, index = html_content[location.start:location.end], 0
+
+    indexed, collector = _parse_checked(table_html, options, arrow, index, group)
+    if indexed:
+        return indexed[0][1]
+    if not collector.table_count:
+        raise ValueError("No tables found in the HTML content")
+    if collector.table_count <= index:
+        raise ValueError(f"Table index {table_index} out of range. "
+                         f"File contains {collector.table_count} tables.")
+    raise ValueError(f"Failed to parse table {table_index}")
+
+
+def parse_rows(html_content: str,
+               options: ParseOptions) -> Tuple[List[List[Optional[str]]], List[pa.Array]]:
+    """Header rows and unconverted cell strings by column of the first table.
+
+    Used for row ranges of a table that are parsed separately, e.g. in
+    parallel, and converted together by assemble_table.
+    """
+    collector = _TableCollector(options, True, 0)
+    parser = make_parser(_stream_engine(options), collector)
+    for piece in _feed_pieces(html_content, options, False):
+        parser.feed(piece)
+    parser.close()
+    if not collector.tables:
+        raise ValueError("No tables found in the HTML content")
+    builder = collector.tables[0]
+    return builder.header, builder.raw_columns()
+
+
+def assemble_table(header: List[List[Optional[str]]], parts: List[List[pa.Array]],
+                   options: ParseOptions, arrow: bool = False) -> Frame:
+    """Convert the cell strings of consecutive row ranges of a table as one table.
+
+    ``parts`` holds the columns of each range as returned by parse_rows, in
+    row order. Columns are concatenated before conversion, so every column
+    gets one type for the whole table.
+    """
+    width = max([len(row) for row in header] + [len(columns) for columns in parts] + [0])
+    na_values = _na_array(options)
+    arrays = []
+    for col in range(width):
+        chunks = []
+        for columns in parts:
+            if col < len(columns):
+                chunks.append(columns[col])
+            elif columns:
+                # A range of shorter rows
+                chunks.append(pa.nulls(len(columns[0]), pa.string()))
+        array = pa.concat_arrays(chunks) if chunks else pa.array([], type=pa.string())
+        arrays.append(_convert_column(array, options, na_values))
+    return _to_frame(arrays, _build_column_index(header, width), arrow)
@@ -0,0 +1,211 @@
+"""Vectorized type coercion of extracted columns.
+
+Text columns that the extraction engine left as strings are coerced as a
+whole with pyarrow compute kernels: currency symbols, accounting negatives
+and percent signs are stripped, locale separators are normalized and dates
+are parsed with a format detected once per value shape. Optionally numeric
+and text columns are stored in compact types (int32, float32, dictionary).
+"""
+
+import re
+import logging
+from typing import Dict, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from table_extraction import Frame, ParseOptions
+
+# Set up logging
+LOGGER = logging.getLogger(__name__)
+
+# Currency symbols stripped from either end of a value
+_CURRENCY = r"[$€£¥₹]"
+_CURRENCY_PATTERN = rf"^{_CURRENCY}\s*|\s*{_CURRENCY}$"
+_SIGNED_CURRENCY_PATTERN = rf"^-\s*{_CURRENCY}\s*"
+
+# Accounting notation for negative numbers, e.g. (1,050.00)
+_PARENTHESES_PATTERN = r"^\((.*)\)$"
+
+# Numbers written with the default separators, e.g. 1,050.00, and swapped
+# ones as in many European locales, e.g. 1.050,00
+_DEFAULT_PATTERN = r"^-?(\d{1,3}(,\d{3})*|\d+)(\.\d+)?$"
+_SWAPPED_PATTERN = r"^-?(\d{1,3}(\.\d{3})*|\d+)(,\d+)?$"
+
+# Date formats tried when a text column looks like dates, most common first
+DATE_FORMATS = [
+    "%Y-%m-%d",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%dT%H:%M:%S",
+    "%Y/%m/%d",
+    "%d.%m.%Y",
+    "%d.%m.%Y %H:%M",
+    "%d/%m/%Y",
+    "%m/%d/%Y",
+    "%m/%d/%Y %H:%M",
+    "%d-%m-%Y",
+    "%d %b %Y",
+    "%b %d, %Y",
+]
+
+# Text columns with at most this share of distinct values become dictionaries
+CATEGORY_MAX_RATIO = 0.5
+
+# Detected date format by value shape, e.g. "00.00.0000"
+_date_formats: Dict[str, Optional[str]] = {}
+
+_INT32_MIN, _INT32_MAX = -(1 << 31), (1 << 31) - 1
+
+
+def _value_shape(value: str) -> str:
+    """Shape of a value, digits and letters replaced by placeholders"""
+    return re.sub(r"[A-Za-z]", "a", re.sub(r"\d", "0", value))
+
+
+def _all_valid(converted: pa.Array, present: int) -> bool:
+    return len(converted) - converted.null_count == present
+
+
+def _to_number(text: pa.Array, thousands: str, decimal: str) -> Optional[pa.Array]:
+    """Cast a whole column to int64 or float64, None if any value is not a number"""
+    if thousands:
+        text = pc.replace_substring(text, thousands, "")
+    if decimal and decimal != ".":
+        text = pc.replace_substring(text, decimal, ".")
+    for numeric_type in (pa.int64(), pa.float64()):
+        try:
+            return pc.cast(text, numeric_type)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            continue
+    return None
+
+
+def _has_swapped_separators(text: pa.Array) -> bool:
+    """Whether a column uses "." for thousands and "," as decimal separator"""
+    values = pc.drop_null(text)
+    if not pc.all(pc.match_substring_regex(values, _SWAPPED_PATTERN)).as_py():
+        return False
+    # Values like 1.050 fit both notations, the default one wins
+    return not pc.all(pc.match_substring_regex(values, _DEFAULT_PATTERN)).as_py()
+
+
+def _coerce_number(array: pa.Array, options: ParseOptions) -> Optional[pa.Array]:
+    """Numbers with currency symbols, percent signs or locale separators"""
+    text = pc.utf8_trim_whitespace(array)
+    text = pc.replace_substring_regex(text, _PARENTHESES_PATTERN, r"-\1")
+    text = pc.replace_substring_regex(text, _SIGNED_CURRENCY_PATTERN, "-")
+    text = pc.replace_substring_regex(text, _CURRENCY_PATTERN, "")
+
+    percent = pc.all(pc.ends_with(pc.drop_null(text), "%")).as_py()
+    if percent:
+        text = pc.utf8_rtrim(text, "%")
+
+    thousands, decimal = options.thousands, options.decimal
+    if (thousands, decimal) == (",", ".") and _has_swapped_separators(text):
+        thousands, decimal = ".", ","
+    numbers = _to_number(text, thousands, decimal)
+    if numbers is None:
+        return None
+    if percent:
+        numbers = pc.divide(pc.cast(numbers, pa.float64()), 100.0)
+    return numbers
+
+
+def _try_format(array: pa.Array, date_format: str, present: int) -> Optional[pa.Array]:
+    dates = pc.strptime(array, format=date_format, unit="s", error_is_null=True)
+    return dates if _all_valid(dates, present) else None
+
+
+def _coerce_date(array: pa.Array, present: int) -> Optional[pa.Array]:
+    """Dates in one of DATE_FORMATS, the format is remembered per value shape"""
+    text = pc.utf8_trim_whitespace(array)
+    shape = _value_shape(pc.drop_null(text)[0].as_py())
+    cached = _date_formats.get(shape, "")
+    if cached is None:
+        return None
+    if cached:
+        dates = _try_format(text, cached, present)
+        if dates is not None:
+            return dates
+
+    for date_format in DATE_FORMATS:
+        if date_format == cached:
+            continue
+        dates = _try_format(text, date_format, present)
+        if dates is not None:
+            _date_formats[shape] = date_format
+            return dates
+    if not cached:
+        _date_formats[shape] = None
+    return None
+
+
+def coerce_array(array: pa.Array, options: ParseOptions) -> pa.Array:
+    """Coerce a text column to numbers or dates if every value converts"""
+    if not pa.types.is_string(array.type) and not pa.types.is_large_string(array.type):
+        return array
+    present = len(array) - array.null_count
+    if present == 0:
+        return array
+
+    numbers = _coerce_number(array, options)
+    if numbers is not None:
+        return numbers
+    if options.parse_dates:
+        dates = _coerce_date(array, present)
+        if dates is not None:
+            return dates
+    return array
+
+
+def compact_array(array: pa.Array) -> pa.Array:
+    """Store a column in the smallest type that keeps every value"""
+    if len(array) == array.null_count:
+        return array
+    if pa.types.is_int64(array.type):
+        bounds = pc.min_max(array)
+        if _INT32_MIN <= bounds["min"].as_py() and bounds["max"].as_py() <= _INT32_MAX:
+            return pc.cast(array, pa.int32())
+    elif pa.types.is_float64(array.type):
+        narrowed = pc.cast(array, pa.float32(), safe=False)
+        same = pc.or_kleene(pc.equal(pc.cast(narrowed, pa.float64()), array), pc.is_nan(array))
+        if pc.all(same).as_py():
+            return narrowed
+    elif pa.types.is_string(array.type):
+        if pc.count_distinct(array).as_py() <= CATEGORY_MAX_RATIO * len(array):
+            return pc.dictionary_encode(array)
+    return array
+
+
+def _convert(array: pa.Array, options: ParseOptions, coerce: bool, compact: bool) -> pa.Array:
+    if coerce:
+        array = coerce_array(array, options)
+    if compact:
+        array = compact_array(array)
+    return array
+
+
+def coerce_table(table: Frame, options: ParseOptions, coerce: bool = True,
+                 compact: bool = False) -> Frame:
+    """Coerce (and optionally compact) every column of a table as a whole"""
+    if isinstance(table, pa.Table):
+        arrays = [_convert(column.combine_chunks(), options, coerce, compact)
+                  for column in table.columns]
+        return pa.Table.from_arrays(arrays, names=table.column_names)
+
+    df = table.copy()
+    for i in range(df.shape[1]):
+        column = df.iloc[:, i]
+        text = pd.api.types.is_object_dtype(column) or pd.api.types.is_string_dtype(column)
+        if not (text or compact):
+            continue
+        try:
+            array = pa.array(column, from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # Mixed Python objects are left as they are
+            continue
+        converted = _convert(array, options, coerce, compact)
+        if converted is not array:
+            df.isetitem(i, pd.Series(converted.to_pandas(), index=df.index))
+    return df
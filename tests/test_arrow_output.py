@@ -0,0 +1,146 @@
+import pytest
+import pandas as pd
+import pyarrow as pa
+import os
+import sys
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from arrow_output import (StreamingConcat, append_metadata, conform, metadata_table, unify_schema,
+                          write_batches)
+
+
+class TestArrowOutput:
+    """Test suite for assembling Arrow tables into the node output"""
+
+    def test_append_metadata(self):
+        """Test metadata becomes typed constant columns"""
+        table = pa.table({'a': [1, 2]})
+        table = append_metadata(table, {'source_file': 'x.xls', 'table_index': 0})
+
+        assert table.column_names == ['a', 'source_file', 'table_index']
+        assert table.schema.field('table_index').type == pa.int32()
+        assert table.column('source_file').to_pylist() == ['x.xls', 'x.xls']
+        assert pa.types.is_dictionary(table.schema.field('source_file').type)
+        assert len(table.column('source_file').chunk(0).dictionary) == 1
+
+    def test_unify_schema(self):
+        """Test the union schema keeps first-appearance order and widens types"""
+        schema = unify_schema([
+            pa.schema([('a', pa.int64()), ('b', pa.string())]),
+            pa.schema([('a', pa.float64()), ('c', pa.null())]),
+            pa.schema([('b', pa.int64())]),
+        ])
+
+        assert schema.names == ['a', 'b', 'c']
+        assert schema.field('a').type == pa.float64()
+        assert schema.field('b').type == pa.string()
+        assert schema.field('c').type == pa.float64()
+
+    def test_conform(self):
+        """Test columns are reordered, cast and null-filled"""
+        schema = pa.schema([('a', pa.float64()), ('b', pa.string())])
+        table = conform(pa.table({'b': ['x'], 'a': [1]}), schema)
+        missing = conform(pa.table({'a': [2.5]}), schema)
+
+        assert table.schema == schema
+        assert table.to_pylist() == [{'a': 1.0, 'b': 'x'}]
+        assert missing.to_pylist() == [{'a': 2.5, 'b': None}]
+
+    def test_write_batches(self):
+        """Test heterogeneous tables are written with one schema"""
+        batches = []
+        total = write_batches([pa.table({'a': [1, 2]}), pa.table({'b': ['x']})], batches.append)
+
+        assert total == 3
+        assert all(batch.schema.names == ['a', 'b'] for batch in batches)
+        assert sum(batch.num_rows for batch in batches) == 3
+
+    def test_write_batches_without_rows(self):
+        """Test an empty result still yields one batch carrying the schema"""
+        batches = []
+        write_batches([pa.table({'a': pa.array([], pa.int64())})], batches.append)
+
+        assert len(batches) == 1
+        assert batches[0].schema.names == ['a']
+
+    def test_write_batches_expected_schema(self):
+        """Test columns of an expected schema come first and are widened if needed"""
+        batches = []
+        expected = pa.schema([('b', pa.int64()), ('c', pa.string())])
+        write_batches([pa.table({'a': [1], 'b': ['x']})], batches.append, expected)
+
+        assert batches[0].schema == pa.schema([('b', pa.string()), ('c', pa.string()),
+                                               ('a', pa.int64())])
+
+    def test_streaming_concat_metadata(self):
+        """Test metadata of grouped DataFrames stays dictionary encoded in the output"""
+        concat = StreamingConcat()
+        for i in range(3):
+            concat.add(pd.DataFrame({'a': range(i + 1)}),
+                       {'source_file': f'{i // 2}.xls', 'table_index': i})
+        concat.add(pa.table({'a': [9]}), {'source_file': '2.xls', 'table_index': 0})
+
+        table = concat.to_table()
+        assert table.schema.field('source_file').type == pa.dictionary(pa.int32(), pa.string())
+        assert table.column('source_file').to_pylist() == ['0.xls'] * 3 + ['1.xls'] * 3 + ['2.xls']
+        assert table.column('table_index').to_pylist() == [0, 1, 1, 2, 2, 2, 0]
+
+    def test_metadata_table(self):
+        """Test the separate metadata table has one plain row per table"""
+        table = metadata_table([
+            {'table_id': 0, 'source_file': 'a.xls', 'file_path': '/a.xls', 'table_index': 0,
+             'num_rows': 5, 'num_cols': 2},
+        ])
+
+        assert table.column_names[0] == 'table_id'
+        assert table.schema.field('source_file').type == pa.string()
+        assert table.column('num_rows').to_pylist() == [5]
+
+    def test_streaming_concat(self):
+        """Test tables are unified incrementally and concatenated in order"""
+        concat = StreamingConcat()
+        concat.add(pa.table({'a': [1, 2]}))
+        concat.add(pd.DataFrame({'b': ['x'], 'a': [3]}))
+        assert concat.schema.names == ['a', 'b']
+        concat.add(pa.table({'a': [0.5], 'c': [True]}))
+
+        table = concat.to_table()
+
+        assert concat.num_tables == 3
+        assert table.schema == pa.schema([('a', pa.float64()), ('b', pa.string()),
+                                          ('c', pa.bool_())])
+        assert table.column('a').to_pylist() == [1, 2, 3, 0.5]
+        assert table.column('b').to_pylist() == [None, None, 'x', None]
+
+    def test_streaming_concat_groups_batches(self):
+        """Test small tables are grouped into large batches"""
+        concat = StreamingConcat()
+        for i in range(10):
+            concat.add(pa.table({'a': [i] * 100}))
+
+        batches = list(concat.iter_batches())
+
+        assert len(batches) == 1
+        assert batches[0].num_rows == 1000
+
+    def test_streaming_concat_mixed_column(self):
+        """Test object columns mixing numbers and text are kept as text"""
+        concat = StreamingConcat()
+        concat.add(pd.DataFrame({'a': [1, 'x', None], 'b': [1, 2, 3]}),
+                   {'source_file': 'r.xls', 'file_path': '/r.xls', 'table_index': 0,
+                    'num_rows': 3, 'num_cols': 2})
+        concat.add(pd.DataFrame({'a': [2.5], 'b': [4]}),
+                   {'source_file': 'r.xls', 'file_path': '/r.xls', 'table_index': 1,
+                    'num_rows': 1, 'num_cols': 2})
+
+        table = concat.to_table()
+
+        assert table.schema.field('a').type == pa.string()
+        assert table.column('a').to_pylist() == ['1', 'x', None, '2.5']
+        assert table.column('b').to_pylist() == [1, 2, 3, 4]
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
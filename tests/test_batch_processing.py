@@ -0,0 +1,98 @@
+import pytest
+import os
+import sys
+import gzip
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from batch_processing import prefetch, process_files
+from file_reader import ReaderOptions
+
+
+class TestBatchProcessing:
+    """Test suite for sequential and parallel batch execution"""
+
+    @pytest.fixture
+    def sample_files(self, tmp_path):
+        """Create a folder of small HTML-XLS files plus one broken file"""
+        files = []
+        for i in range(6):
+            path = tmp_path / f'report_{i}.xls'
+            path.write_text(f"<table><tr><th>id</th></tr><tr><td>{i}</td></tr></table>")
+            files.append(str(path))
+        broken = tmp_path / 'broken.xls'
+        broken.write_text("<html><body>no tables here</body></html>")
+        files.insert(3, str(broken))
+        return files
+
+    @pytest.mark.parametrize('workers', [1, 2])
+    def test_results_in_input_order(self, sample_files, workers):
+        """Test results keep input order and failures are reported per file"""
+        results = list(process_files(sample_files, ReaderOptions(), workers))
+
+        assert [file_path for file_path, _, _ in results] == sample_files
+        assert isinstance(results[3][2], ValueError)
+        ids = [tables[0][0]['id'][0] for _, tables, error in results if error is None]
+        assert ids == [0, 1, 2, 3, 4, 5]
+
+    @pytest.mark.parametrize('workers', [1, 2])
+    def test_lazy_file_iterator(self, sample_files, workers):
+        """Test files may be given as a lazy iterator, e.g. from file discovery"""
+        results = list(process_files(iter(sample_files), ReaderOptions(), workers))
+
+        assert [file_path for file_path, _, _ in results] == sample_files
+
+    @pytest.mark.parametrize('workers', [1, 2])
+    def test_prefetch_matches_direct_reads(self, sample_files, workers):
+        """Test prefetched files give the same results as files read by the workers"""
+        expected = list(process_files(sample_files, ReaderOptions(), workers))
+        results = list(process_files(sample_files, ReaderOptions(), workers, prefetch_depth=3))
+
+        assert [path for path, _, _ in results] == sample_files
+        assert ([error is None for _, _, error in results]
+                == [error is None for _, _, error in expected])
+        for (_, tables, _), (_, expected_tables, _) in zip(results, expected):
+            if expected_tables is not None:
+                assert tables[0][0].equals(expected_tables[0][0])
+
+    def test_prefetch_is_bounded(self, sample_files, tmp_path):
+        """Test content is read ahead in order, oversized and missing files are left alone"""
+        missing = str(tmp_path / 'missing.xls')
+        prefetched = list(prefetch(sample_files + [missing], depth=2, max_bytes=50))
+
+        assert [path for path, _ in prefetched] == sample_files + [missing]
+        with open(sample_files[3], 'rb') as f:
+            assert prefetched[3][1] == f.read()
+        # The reports are longer than max_bytes
+        assert prefetched[0][1] is None
+        assert prefetched[-1][1] is None
+
+    def test_prefetch_compressed_files(self, sample_files, tmp_path):
+        """Test compressed files are bounded by their uncompressed size and corrupt ones reported"""
+        large = tmp_path / 'large.xls.gz'
+        large.write_bytes(gzip.compress(b'<table>' + b' ' * 1000 + b'</table>'))
+        corrupt = tmp_path / 'corrupt.xls.xz'
+        corrupt.write_bytes(b'\xfd7zXZ\x00 not xz data')
+        files = [str(large), str(corrupt), sample_files[0]]
+
+        prefetched = list(prefetch(files, depth=2, max_bytes=500))
+        assert [content for _, content in prefetched[:2]] == [None, None]
+        assert prefetched[2][1] is not None
+
+        results = list(process_files(files, ReaderOptions(), prefetch_depth=2))
+        assert [path for path, _, _ in results] == files
+        assert results[1][2] is not None
+        assert results[2][2] is None
+
+    def test_close_stops_processing(self, sample_files):
+        """Test closing the iterator early (cancellation) shuts the pool down"""
+        processed = process_files(sample_files, ReaderOptions(), workers=2)
+        first = next(processed)
+        processed.close()
+
+        assert first[0] == sample_files[0]
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
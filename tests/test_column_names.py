@@ -0,0 +1,62 @@
+import pytest
+import os
+import sys
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from column_names import clean_column_name, dedupe_names, flatten_label, normalize_columns
+from file_reader import ReaderOptions, clean_dataframe
+from table_extraction import ParseOptions, extract_tables
+
+
+class TestColumnNames:
+    """Test suite for column name normalization"""
+
+    def test_clean_column_name(self):
+        """Test tags and special characters are removed"""
+        assert clean_column_name('<b>Net  Sales (EUR)</b>') == 'Net_Sales_EUR'
+        assert clean_column_name('!!!') == 'column'
+
+    def test_clean_column_name_is_memoized(self):
+        """Test repeated headers are served from the cache"""
+        clean_column_name.cache_clear()
+        clean_column_name('Total')
+        clean_column_name('Total')
+
+        assert clean_column_name.cache_info().hits == 1
+
+    def test_flatten_label(self):
+        """Test multi-row labels drop placeholders and repeated levels"""
+        assert flatten_label(('Sales', 'Q1')) == 'Sales Q1'
+        assert flatten_label(('Region', 'Region')) == 'Region'
+        assert flatten_label(('Unnamed: 2_level_0', 'Q2')) == 'Q2'
+        assert flatten_label(('Unnamed: 3_level_0', 'Unnamed: 3_level_1')) == 'Unnamed: 3_level_0'
+        assert flatten_label(7) == '7'
+
+    def test_dedupe_names(self):
+        """Test collisions get suffixes that clash with no other column"""
+        assert dedupe_names(['Total', 'Total', 'Total_1']) == ['Total', 'Total_2', 'Total_1']
+
+    def test_normalize_columns(self):
+        """Test names colliding after cleaning are made unique"""
+        assert normalize_columns(['Total', 'Total!', ('A', 'B')]) == ['Total', 'Total_1', 'A_B']
+        assert normalize_columns([('A', 'B')], clean=False) == ['A B']
+
+    def test_multi_row_header(self):
+        """Test pandas and Arrow extraction flatten two header rows alike"""
+        html = ("<table>"
+                "<tr><th rowspan=2>Region</th><th colspan=2>Sales</th></tr>"
+                "<tr><th>Q1</th><th>Q2</th></tr>"
+                "<tr><td>North</td><td>10</td><td>20</td></tr>"
+                "</table>")
+        parse = ParseOptions(header_rows=2)
+        df = clean_dataframe(extract_tables(html, parse)[0], ReaderOptions(parse=parse))
+        table = extract_tables(html, parse, arrow=True)[0]
+
+        assert list(df.columns) == ['Region', 'Sales_Q1', 'Sales_Q2']
+        assert table.column_names == ['Region', 'Sales Q1', 'Sales Q2']
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,56 @@
+import pytest
+import os
+import sys
+
+# Add src and the corpus generator to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'test_data'))
+
+from create_test_files import generate_corpus, generate_report
+from file_reader import ReaderOptions, process_file
+from table_extraction import ParseOptions, extract_tables
+
+
+class TestCorpusGenerator:
+    """Test suite for the synthetic benchmark corpus"""
+
+    def test_table_shape(self):
+        """Test generated tables have the requested shape"""
+        tables = extract_tables(generate_report(rows=25, cols=7, tables=3), ParseOptions())
+
+        assert len(tables) == 3
+        assert all(table.shape == (25, 7) for table in tables)
+
+    def test_spans(self):
+        """Test span tables resolve to full rows under a two-row header"""
+        html = generate_report(rows=25, cols=5, spans=True)
+        table = extract_tables(html, ParseOptions(header_rows=2))[0]
+
+        assert table.shape == (25, 5)
+        assert table.columns[0] == ('Group 0', 'Column 0')
+        assert table.iloc[1, 0] == table.iloc[0, 0]
+
+    def test_office_spans(self):
+        """Test Office-style cells and spans can be combined"""
+        html = generate_report(rows=25, cols=5, spans=True, office=True)
+        table = extract_tables(html, ParseOptions(header_rows=2))[0]
+
+        assert 'rowspan="2" class=xl65' in html
+        assert table.shape == (25, 5)
+        assert table.iloc[1, 0] == table.iloc[0, 0]
+
+    def test_corpus_files_and_encoding(self, tmp_path):
+        """Test files are written in the requested encoding"""
+        files = generate_corpus(str(tmp_path), rows=5, files=3, encoding='cp1252',
+                                declare_charset=False)
+
+        assert len(files) == 3
+        with open(files[0], 'rb') as f:
+            with pytest.raises(UnicodeDecodeError):
+                f.read().decode('utf-8')
+        df, _ = process_file(files[0], ReaderOptions())[0]
+        assert len(df) == 5
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -1,8 +1,19 @@
 #!/usr/bin/env python3
-"""Create test data files for unit tests"""
+"""Create test data files for unit tests and synthetic benchmark corpora.
+
+Without arguments the two small sample files used by the unit tests are
+(re)created. With ``--corpus`` a parametric corpus is generated instead, e.g.
+
+    python create_test_files.py --corpus /tmp/corpus --rows 100000 --cols 20
+    python create_test_files.py --corpus /tmp/corpus --profile small_files
+"""
 
 import os
+import random
+import argparse
+from datetime import date, timedelta
 from pathlib import Path
+from typing import Dict, List
 
 # Test data directory
 TEST_DATA_DIR = Path(__file__).parent
@@ -129,6 +140,170 @@ MULTI_TABLE = """<html>
 </body>
 </html>"""
 
+# Cell values of generated tables, cycled over the columns
+NAMES = ["Widget", "Gadget", "Gizmo", "Doohickey", "Café", "Müller", "Øresund", "Señor"]
+REGIONS = ["North", "South", "East", "West"]
+
+# Presets of generate_corpus parameters used by the benchmarks
+CORPUS_PROFILES: Dict[str, Dict] = {
+    "many_rows": dict(rows=200000, cols=8),
+    "wide": dict(rows=2000, cols=400),
+    "many_tables": dict(rows=20, cols=6, tables=1000),
+    "spans": dict(rows=50000, cols=10, spans=True),
+    "wide_spans": dict(rows=500, cols=1000, spans=True),
+    "cp1252": dict(rows=50000, cols=8, encoding="cp1252", declare_charset=False),
+    "small_files": dict(rows=10, cols=6, files=5000),
+    "office": dict(rows=100000, cols=8, office=True),
+    "office_spans": dict(rows=50000, cols=10, spans=True, office=True),
+}
+
+# Cell classes of Office exports, by kind of _cell, with their number formats
+OFFICE_FORMATS = ["General", "0", "\\0022$\\0022\\#\\,\\#\\#0\\.00", "0\\.0%",
+                  "yyyy\\-mm\\-dd", "\\@"]
+
+# Root element of Office exports, declaring the Office namespaces
+OFFICE_HTML_TAG = ("<html xmlns:o=\"urn:schemas-microsoft-com:office:office\" "
+                   "xmlns:x=\"urn:schemas-microsoft-com:office:excel\" "
+                   "xmlns=\"http://www.w3.org/TR/REC-html40\">")
+
+# Excel's conditional comment with the workbook's XML island
+OFFICE_XML_ISLAND = """<!--[if gte mso 9]><xml>
+ <x:ExcelWorkbook>
+  <x:ExcelWorksheets>
+   <x:ExcelWorksheet>
+    <x:Name>Report</x:Name>
+    <x:WorksheetOptions>
+     <x:Selected/><x:ProtectContents>False</x:ProtectContents>
+    </x:WorksheetOptions>
+   </x:ExcelWorksheet>
+  </x:ExcelWorksheets>
+  <x:WindowHeight>12000</x:WindowHeight>
+ </x:ExcelWorkbook>
+</xml><![endif]-->"""
+
+
+def _cell(rng: random.Random, row: int, col: int) -> str:
+    """Value of one generated cell, the column decides its kind"""
+    kind = col % 6
+    if rng.random() < 0.02:
+        return ""
+    if kind == 0:
+        return f"{rng.choice(NAMES)} {row}"
+    if kind == 1:
+        return str(rng.randint(0, 100000))
+    if kind == 2:
+        return f"${rng.uniform(0, 1e6):,.2f}"
+    if kind == 3:
+        return f"{rng.uniform(-50, 50):.1f}%"
+    if kind == 4:
+        return (date(2020, 1, 1) + timedelta(days=rng.randint(0, 2000))).isoformat()
+    return rng.choice(REGIONS)
+
+
+def _office_cell(value: str, col: int) -> str:
+    """A cell as Excel exports it: class, inline mso- style and x:num/x:str attributes"""
+    kind = col % 6
+    style = (f"class=xl{65 + kind} style='mso-number-format:\"{OFFICE_FORMATS[kind]}\";"
+             f"border:.5pt solid windowtext;mso-protection:locked visible'")
+    if not value:
+        return f"<td {style}>&nbsp;</td>"
+    if kind in (1, 2, 3):
+        number = float(value.strip("$%").replace(",", ""))
+        number = number / 100 if kind == 3 else number
+        return f"<td {style} align=right x:num=\"{number:.10g}\">{value}</td>"
+    if kind == 4:
+        serial = (date.fromisoformat(value) - date(1899, 12, 30)).days
+        return f"<td {style} align=right x:num=\"{serial}\">{value}</td>"
+    return f"<td {style} x:str>{value}</td>"
+
+
+def generate_table(rows: int, cols: int, seed: int = 0, spans: bool = False,
+                   office: bool = False) -> str:
+    """HTML of one table with a header row and ``rows`` data rows.
+
+    With ``spans`` a group header row with colspan="2" cells precedes the
+    column header (so use two header rows) and every tenth data row starts a
+    first-column cell with rowspan="2". With ``office`` the data cells carry
+    the classes, mso- styles and x:num/x:str attributes of an Excel export.
+    """
+    rng = random.Random(seed)
+    if office:
+        lines = ["<table border=0 cellpadding=0 cellspacing=0 width=640 "
+                 "style='border-collapse:collapse;table-layout:fixed;width:480pt'>"]
+        lines.extend("<col width=80 style='mso-width-source:userset;width:60pt'>"
+                     for _ in range(cols))
+    else:
+        lines = ["<table border=\"1\">"]
+    if spans:
+        groups = "".join(f"<th colspan=\"2\">Group {i}</th>" for i in range(cols // 2))
+        lines.append(f"<tr>{groups}{'<th>Rest</th>' if cols % 2 else ''}</tr>")
+    lines.append("<tr>" + "".join(f"<th>Column {c}</th>" for c in range(cols)) + "</tr>")
+
+    spanned = False
+    for r in range(rows):
+        cells = [_cell(rng, r, c) for c in range(cols)]
+        if office:
+            markup = [_office_cell(value, c) for c, value in enumerate(cells)]
+        else:
+            markup = [f"<td>{value}</td>" for value in cells]
+        if spanned:
+            # The first cell is covered by the rowspan of the previous row
+            markup = markup[1:]
+            spanned = False
+        elif spans and r % 10 == 0 and r + 1 < rows:
+            markup[0] = markup[0].replace("<td", "<td rowspan=\"2\"", 1)
+            spanned = True
+        row = "".join(markup)
+        lines.append(f"<tr height=20 style='height:15.0pt'>{row}</tr>" if office
+                     else f"<tr>{row}</tr>")
+    lines.append("</table>")
+    return "\n".join(lines)
+
+
+def _office_head() -> str:
+    """Style block and XML island of an Excel export"""
+    classes = "\n".join(f".xl{65 + kind}\n\t{{mso-style-parent:style0;\n\tmso-number-format:"
+                        f"\"{number_format}\";\n\tborder:.5pt solid windowtext;\n"
+                        "\twhite-space:normal;}"
+                        for kind, number_format in enumerate(OFFICE_FORMATS))
+    style = ("<style>\n<!--table\n\t{mso-displayed-decimal-separator:\"\\.\";\n"
+             "\tmso-displayed-thousand-separator:\"\\,\";}\n"
+             "@page\n\t{margin:.75in .7in .75in .7in;}\n"
+             f"{classes}\n-->\n</style>")
+    return f"{style}\n{OFFICE_XML_ISLAND}"
+
+
+def generate_report(rows: int = 100, cols: int = 6, tables: int = 1, seed: int = 0,
+                    spans: bool = False, encoding: str = "utf-8",
+                    declare_charset: bool = True, office: bool = False) -> str:
+    """HTML document in the style of an Excel "Save as Web Page" report"""
+    charset = f"<meta http-equiv=\"Content-Type\" content=\"text/html; charset={encoding}\">"
+    extra = _office_head() if office else ""
+    head = f"<head>{charset if declare_charset else ''}<title>Report {seed}</title>{extra}</head>"
+    body = []
+    for t in range(tables):
+        body.append(f"<h2>Section {t}</h2>")
+        body.append(generate_table(rows, cols, seed * 1000 + t, spans, office))
+    html = OFFICE_HTML_TAG if office else "<html>"
+    return f"{html}\n{head}\n<body>\n" + "\n".join(body) + "\n</body>\n</html>"
+
+
+def generate_corpus(output_dir: str, rows: int = 100, cols: int = 6, tables: int = 1,
+                    files: int = 1, spans: bool = False, encoding: str = "utf-8",
+                    declare_charset: bool = True, seed: int = 0, office: bool = False) -> List[str]:
+    """Write ``files`` generated reports to a folder and return their paths"""
+    os.makedirs(output_dir, exist_ok=True)
+    paths = []
+    for i in range(files):
+        html = generate_report(rows, cols, tables, seed + i, spans, encoding, declare_charset,
+                               office)
+        path = os.path.join(output_dir, f"report_{i:05d}.xls")
+        with open(path, "w", encoding=encoding, errors="replace") as f:
+            f.write(html)
+        paths.append(path)
+    return paths
+
+
 # Create test files
 def create_test_files():
     """Create test XLS files with HTML content"""
@@ -143,5 +318,36 @@ def create_test_files():
     
     print("Test files created successfully!")
 
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", help="generate a synthetic corpus into this folder")
+    parser.add_argument("--profile", choices=sorted(CORPUS_PROFILES),
+                        help="preset corpus parameters")
+    parser.add_argument("--rows", type=int, default=100, help="data rows per table")
+    parser.add_argument("--cols", type=int, default=6, help="columns per table")
+    parser.add_argument("--tables", type=int, default=1, help="tables per file")
+    parser.add_argument("--files", type=int, default=1, help="number of files")
+    parser.add_argument("--spans", action="store_true", help="add colspan/rowspan cells")
+    parser.add_argument("--encoding", default="utf-8", help="file encoding, e.g. cp1252 or utf-16")
+    parser.add_argument("--no-charset", action="store_true",
+                        help="omit the <meta> charset declaration")
+    parser.add_argument("--office", action="store_true",
+                        help="add the styles and attributes of Excel exports")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if not args.corpus:
+        create_test_files()
+        return
+
+    params = dict(rows=args.rows, cols=args.cols, tables=args.tables, files=args.files,
+                  spans=args.spans, encoding=args.encoding,
+                  declare_charset=not args.no_charset, seed=args.seed, office=args.office)
+    if args.profile:
+        params.update(CORPUS_PROFILES[args.profile])
+    paths = generate_corpus(args.corpus, **params)
+    print(f"Created {len(paths)} file(s) in {args.corpus}")
+
+
 if __name__ == "__main__":
-    create_test_files()
+    main()
@@ -0,0 +1,151 @@
+import pytest
+import os
+import sys
+import shutil
+import zipfile
+from datetime import datetime
+from unittest.mock import patch
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'test_data'))
+
+from arrow_output import StreamingConcat
+from create_test_files import generate_report
+from dataset_sink import DatasetSink, SinkOptions
+from file_reader import ReaderOptions, process_file
+
+
+class TestDatasetSink:
+    """Test suite for writing extracted tables to a partitioned dataset"""
+
+    @pytest.fixture
+    def reports(self, tmp_path):
+        """Reports in two folders, with two months as modification times"""
+        paths = []
+        for folder, month in [('north', 1), ('south/east', 2)]:
+            os.makedirs(tmp_path / 'in' / folder)
+            for i in range(3):
+                path = str(tmp_path / 'in' / folder / f'r{i}.xls')
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.write(generate_report(rows=50, cols=4, tables=2, seed=i))
+                timestamp = datetime(2024, month, 15).timestamp()
+                os.utime(path, (timestamp, timestamp))
+                paths.append(path)
+        return tmp_path, paths
+
+    def _write(self, paths, options, root=''):
+        sink = DatasetSink(options, root)
+        for path in paths:
+            sink.write(path, process_file(path, ReaderOptions(table_index=-1)))
+        sink.close()
+        return sink
+
+    def test_partitions_and_manifest(self, reports):
+        """Test rows land in hive partitions and the manifest lists every table"""
+        tmp_path, paths = reports
+        folder = str(tmp_path / 'out')
+        sink = self._write(paths, SinkOptions(folder, partition_by='folder'), str(tmp_path / 'in'))
+
+        manifest = sink.manifest_table().to_pylist()
+        assert len(manifest) == 12 and sink.num_tables == 12 and sink.num_rows == 600
+        assert {row['partition'] for row in manifest} == {'folder=north', 'folder=south%2Feast'}
+        assert all(os.path.exists(row['dataset_file']) for row in manifest)
+
+        dataset = ds.dataset(folder, format='parquet', partitioning='hive').to_table()
+        assert dataset.num_rows == 600
+        counts = dataset.group_by('folder').aggregate([('table_index', 'count')]).to_pylist()
+        assert sorted((row['folder'], row['table_index_count']) for row in counts) == [
+            ('north', 300), ('south/east', 300)]
+
+        # Tables of one file read back as the node would output them
+        concat = StreamingConcat()
+        for df, metadata in process_file(paths[0], ReaderOptions(table_index=-1)):
+            concat.add(df, metadata)
+        expected = concat.to_table()
+        written = pq.read_table(manifest[0]['dataset_file']).slice(0, expected.num_rows)
+        pd.testing.assert_frame_equal(written.to_pandas(), expected.to_pandas(),
+                                      check_categorical=False)
+
+    def test_date_partitions_arrow(self, reports):
+        """Test month partitions of Arrow IPC files"""
+        tmp_path, paths = reports
+        folder = str(tmp_path / 'out')
+        self._write(paths, SinkOptions(folder, format='arrow', partition_by='month',
+                                       compression='lz4'))
+
+        assert sorted(os.listdir(folder)) == ['month=2024-01', 'month=2024-02']
+        dataset = ds.dataset(folder, format='ipc', partitioning='hive').to_table()
+        assert dataset.num_rows == 600
+        assert dataset.schema.field('source_file').type == pa.string()
+
+    def test_row_groups(self, reports):
+        """Test buffered rows are written in full row groups and files are shared"""
+        tmp_path, paths = reports
+        folder = str(tmp_path / 'out')
+        self._write(paths, SinkOptions(folder, row_group_rows=128, compression='snappy'))
+
+        files = [name for name in os.listdir(folder) if not name.startswith('.')]
+        assert len(files) < len(paths)
+        sizes = []
+        for name in files:
+            metadata = pq.ParquetFile(os.path.join(folder, name)).metadata
+            sizes.append([metadata.row_group(i).num_rows for i in range(metadata.num_row_groups)])
+        assert sum(map(sum, sizes)) == 600
+        assert all(size == 128 for groups in sizes for size in groups[:-1])
+
+    def test_archive_members(self, tmp_path):
+        """Test members are partitioned by their path inside the archive"""
+        with zipfile.ZipFile(tmp_path / 'bundle.zip', 'w') as archive:
+            archive.writestr('reports/r0.xls', generate_report(rows=20, cols=4))
+        path = str(tmp_path / 'bundle.zip') + '!/reports/r0.xls'
+        sink = DatasetSink(SinkOptions(str(tmp_path / 'out'), partition_by='folder'), str(tmp_path))
+
+        assert sink.partition(path) == 'folder=bundle.zip%21%2Freports'
+        assert sink.partition(str(tmp_path / 'top.xls')) == 'folder=.'
+
+    def test_invalid_options_and_abort(self, reports):
+        """Test unsupported codecs fail early and aborted files leave nothing behind"""
+        tmp_path, paths = reports
+        folder = str(tmp_path / 'out')
+        with pytest.raises(ValueError, match='compression'):
+            DatasetSink(SinkOptions(folder, format='arrow', compression='snappy'))
+        with pytest.raises(ValueError, match='folder'):
+            DatasetSink(SinkOptions(''))
+
+        sink = DatasetSink(SinkOptions(folder))
+        sink.write(paths[0], process_file(paths[0], ReaderOptions()))
+        sink.abort()
+        assert os.listdir(folder) == []
+
+
+    def test_files_published_on_close(self, reports):
+        """Test files finished early stay hidden until close and are deleted on abort"""
+        tmp_path, paths = reports
+        folder = str(tmp_path / 'out')
+        for close in (True, False):
+            sink = DatasetSink(SinkOptions(folder, partition_by='folder'), str(tmp_path / 'in'))
+            with patch('dataset_sink.MAX_OPEN_FILES', 1):
+                # Alternating partitions finish the file of the other one
+                for path in (paths[0], paths[3], paths[1]):
+                    sink.write(path, process_file(path, ReaderOptions(table_index=-1)))
+            visible = [name for _, _, names in os.walk(folder) for name in names
+                       if not name.startswith('.')]
+            assert visible == []
+
+            if close:
+                sink.close()
+                assert ds.dataset(folder, format='parquet').count_rows() == 300
+                shutil.rmtree(folder)
+            else:
+                sink.abort()
+                assert [name for _, _, names in os.walk(folder) for name in names] == []
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -134,6 +134,45 @@ class TestHTMLXLSReader:
         assert 'table_index' in metadata
         assert 'num_rows' in metadata
         assert 'num_cols' in metadata
+    
+    def test_streaming_mode(self, node, temp_html_file):
+        """Test streaming mode matches the in-memory result"""
+        node.parsing_settings.table_index = -1
+        expected = node._process_single_file(temp_html_file)
+        
+        node.performance_settings.streaming = True
+        results = node._process_single_file(temp_html_file)
+        
+        assert len(results) == len(expected)
+        for (df, metadata), (expected_df, expected_metadata) in zip(results, expected):
+            assert df.equals(expected_df)
+            assert metadata == expected_metadata
+
+    
+    def test_incremental_empty_delta(self, node, sample_html_content, tmp_path):
+        """Test an execution without changed files keeps the columns of configure"""
+        (tmp_path / 'in').mkdir()
+        (tmp_path / 'in' / 'report.xls').write_text(sample_html_content)
+        node.file_settings.batch_mode = True
+        node.file_settings.folder_path = str(tmp_path / 'in')
+        node.file_settings.file_pattern = '*.xls'
+        node.file_settings.incremental = True
+        node.file_settings.state_folder = str(tmp_path / 'state')
+        node.output_settings.metadata_table = False
+        mock_context = Mock()
+        mock_context.flow_variables = {}
+        mock_context.is_canceled.return_value = False
+        
+        with patch('extension.knext') as knext:
+            node.execute(mock_context)
+            first = knext.Table.from_pyarrow.call_args_list[0][0][0]
+            knext.reset_mock()
+            node.execute(mock_context)
+            empty = knext.Table.from_pyarrow.call_args_list[0][0][0]
+        
+        assert mock_context.flow_variables['num_files_skipped'] == 1
+        assert empty.num_rows == 0
+        assert empty.schema.names == first.schema.names
 
 
 if __name__ == '__main__':
@@ -0,0 +1,107 @@
+import pytest
+import os
+import sys
+import time
+from unittest.mock import patch
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from file_discovery import discover_files, parse_modified_since, split_patterns
+
+
+class TestFileDiscovery:
+    """Test suite for streaming file discovery"""
+
+    @pytest.fixture
+    def folder(self, tmp_path):
+        """Create a small tree of reports of different sizes and ages"""
+        for path, size in [('a.xls', 10), ('b.htm', 2000), ('~$a.xls', 10),
+                           ('sub/c.xls', 500), ('sub/deep/d.xls', 10), ('notes.txt', 10)]:
+            file_path = tmp_path / path
+            file_path.parent.mkdir(parents=True, exist_ok=True)
+            file_path.write_bytes(b'x' * size)
+        os.utime(tmp_path / 'a.xls', (0, 0))
+        return tmp_path
+
+    def _names(self, folder, files):
+        return [os.path.relpath(f, folder).replace(os.sep, '/') for f in files]
+
+    def test_patterns(self, folder):
+        """Test several include patterns, excludes and deterministic order"""
+        files = discover_files(str(folder), ['*.xls', '*.htm'], exclude=['~$*'], recursive=True)
+
+        assert self._names(folder, files) == ['a.xls', 'b.htm', 'sub/c.xls', 'sub/deep/d.xls']
+
+    def test_non_recursive_and_path_patterns(self, folder):
+        """Test subfolders are skipped unless recursive and path patterns match relative paths"""
+        assert self._names(folder, discover_files(str(folder), ['*.xls'])) == ['a.xls', '~$a.xls']
+        files = discover_files(str(folder), ['*.xls'], exclude=['sub/deep/*'], recursive=True)
+        assert 'sub/deep/d.xls' not in self._names(folder, files)
+
+    def test_path_patterns_at_the_top(self, folder):
+        """Test path patterns are relative to the folder and "**/" matches top-level files"""
+        files = discover_files(str(folder), ['**/*.xls'], exclude=['**/~$*'], recursive=True)
+        assert self._names(folder, files) == ['a.xls', 'sub/c.xls', 'sub/deep/d.xls']
+        files = discover_files(str(folder), ['./*.htm', '/sub/deep/*'], recursive=True)
+        assert self._names(folder, files) == ['b.htm', 'sub/deep/d.xls']
+
+    def test_size_and_mtime_filters(self, folder):
+        """Test size limits and the modified-since cutoff"""
+        files = discover_files(str(folder), ['*'], recursive=True, min_size=100, max_size=1000)
+        assert self._names(folder, files) == ['sub/c.xls']
+
+        files = discover_files(str(folder), ['*.xls'], modified_since=time.time() - 3600)
+        assert self._names(folder, files) == ['~$a.xls']
+
+    def test_max_files_is_lazy(self, folder):
+        """Test discovery stops after max_files and yields lazily"""
+        files = discover_files(str(folder), ['*'], recursive=True, max_files=2)
+
+        assert next(files).endswith('a.xls')
+        assert len(list(files)) == 1
+
+    def test_listing_order_is_lazy(self, tmp_path):
+        """Test unordered discovery yields files while the folder is still being listed"""
+        for i in range(50):
+            (tmp_path / f'{i:02d}.xls').write_bytes(b'x')
+        listed = []
+        scandir = os.scandir
+
+        class CountingScan:
+            """os.scandir recording the entries listed so far"""
+
+            def __init__(self, path):
+                self._scan = scandir(path)
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc_info):
+                self._scan.close()
+
+            def __iter__(self):
+                for entry in self._scan:
+                    listed.append(entry.name)
+                    yield entry
+
+        with patch('file_discovery.os.scandir', CountingScan):
+            files = discover_files(str(tmp_path), ['*.xls'], ordered=False)
+            next(files)
+            assert len(listed) == 1
+            assert len(list(files)) == 49
+
+        ordered = discover_files(str(tmp_path), ['*.xls'])
+        assert self._names(tmp_path, ordered) == [f'{i:02d}.xls' for i in range(50)]
+
+    def test_settings_parsing(self):
+        """Test comma-separated patterns and ISO dates"""
+        assert split_patterns('*.xls, *.htm,') == ['*.xls', '*.htm']
+        assert parse_modified_since('') is None
+        assert parse_modified_since('2024-01-31') > 0
+        with pytest.raises(ValueError, match='Invalid date'):
+            parse_modified_since('31/01/2024')
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,77 @@
+import pytest
+import pandas as pd
+import os
+import sys
+from unittest.mock import patch
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import file_format
+from file_format import (FORMAT_HTML, FORMAT_OLE2, FORMAT_ZIP, mapped_file, read_excel_tables,
+                         sniff_file, sniff_format)
+from file_reader import ReaderOptions, process_file, read_html_xls
+from table_extraction import ParseOptions
+
+
+class TestFileFormat:
+    """Test suite for format sniffing and memory-mapped reading"""
+
+    def test_sniff_magic_bytes(self):
+        """Test OLE2, ZIP and HTML content are told apart"""
+        assert sniff_format(b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1" + b"\x00" * 100) == FORMAT_OLE2
+        assert sniff_format(b"PK\x03\x04" + b"\x00" * 100) == FORMAT_ZIP
+        assert sniff_format(b"<html><table></table></html>") == FORMAT_HTML
+        assert sniff_format("<table></table>".encode('utf-16')) == FORMAT_HTML
+        assert sniff_format(b"") == FORMAT_HTML
+
+    def test_mapped_reading(self, tmp_path):
+        """Test HTML is decoded from the mapping, including BOMs and empty files"""
+        path = tmp_path / 'report.xls'
+        path.write_bytes("\ufeff<table><tr><td>Café</td></tr></table>".encode('utf-8'))
+        empty = tmp_path / 'empty.xls'
+        empty.write_bytes(b"")
+
+        assert read_html_xls(str(path)) == "<table><tr><td>Café</td></tr></table>"
+        assert sniff_file(str(path)) == FORMAT_HTML
+        with mapped_file(str(empty)) as buffer:
+            assert buffer == b""
+
+    def test_binary_workbook_is_not_parsed_as_html(self, tmp_path):
+        """Test real workbooks are routed to a spreadsheet engine"""
+        path = tmp_path / 'real.xls'
+        path.write_bytes(b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1" + b"\x00" * 1000)
+
+        with patch.object(file_format, 'python_calamine', None), \
+                patch.object(file_format, 'xlrd', None):
+            with pytest.raises(ValueError, match="binary Excel .* not HTML"):
+                process_file(str(path), ReaderOptions())
+
+    def test_xlsx_workbook(self, tmp_path):
+        """Test sheets of an XLSX workbook are read like tables"""
+        pytest.importorskip('openpyxl')
+        path = tmp_path / 'real.xls'
+        with pd.ExcelWriter(path, engine='openpyxl') as writer:
+            pd.DataFrame({'Name': ['A', 'B'], 'Total': [1, 2]}).to_excel(writer, index=False)
+            pd.DataFrame({'Other': [3]}).to_excel(writer, sheet_name='Second', index=False)
+
+        results = process_file(str(path), ReaderOptions(table_index=-1))
+
+        assert len(results) == 2
+        assert results[0][0]['Total'].tolist() == [1, 2]
+        assert list(results[1][0].columns) == ['Other']
+
+    def test_mixed_sheet_column_as_arrow(self):
+        """Test a sheet column mixing numbers and text is read as text"""
+        sheet = pd.DataFrame({'Code': [1, 'A7', 2.5], 'Total': [1, 2, 3]})
+        with patch.object(file_format, 'openpyxl', object()), \
+                patch.object(file_format, 'python_calamine', None), \
+                patch.object(file_format.pd, 'read_excel', return_value={'Sheet1': sheet}):
+            table = read_excel_tables('real.xlsx', FORMAT_ZIP, ParseOptions(), arrow=True)[0]
+
+        assert table.column('Code').to_pylist() == ['1', 'A7', '2.5']
+        assert table.column('Total').to_pylist() == [1, 2, 3]
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,128 @@
+import pytest
+import pyarrow as pa
+import os
+import sys
+from unittest.mock import patch
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import file_reader
+from file_reader import (ReaderOptions, clean_arrow_table, clear_encoding_memo, detect_encoding,
+                         process_file, read_html_xls)
+
+
+class TestEncodingDetection:
+    """Test suite for the tiered encoding detector"""
+
+    @pytest.fixture(autouse=True)
+    def clear_memo(self):
+        """Start every test with an empty per-folder memo"""
+        clear_encoding_memo()
+
+    def test_bom(self, tmp_path):
+        """Test byte order marks take precedence"""
+        path = tmp_path / 'bom.xls'
+        path.write_bytes('<table><tr><td>ä</td></tr></table>'.encode('utf-16'))
+
+        assert detect_encoding(str(path)) == 'utf-16'
+        assert 'ä' in read_html_xls(str(path))
+
+    def test_meta_charset(self, tmp_path):
+        """Test the charset declared by Excel-generated HTML is honored"""
+        path = tmp_path / 'meta.xls'
+        path.write_bytes(b'<html><head><meta http-equiv=Content-Type '
+                         b'content="text/html; charset=windows-1252"></head>'
+                         b'<body><table><tr><td>\x80</td></tr></table></body></html>')
+
+        assert detect_encoding(str(path)) == 'cp1252'
+        assert '€' in read_html_xls(str(path))
+
+    def test_strict_utf8(self, tmp_path):
+        """Test valid UTF-8 is recognized without statistical detection"""
+        path = tmp_path / 'utf8.xls'
+        path.write_text('<table><tr><td>Zürich</td></tr></table>', encoding='utf-8')
+
+        with patch('file_reader._statistical_detect') as detect:
+            assert detect_encoding(str(path)) == 'utf-8'
+            detect.assert_not_called()
+
+    def test_statistical_fallback_memoized_per_folder(self, tmp_path):
+        """Test statistical detection runs once per folder"""
+        for i in range(3):
+            (tmp_path / f'{i}.xls').write_bytes(b'<table><tr><td>caf\xe9</td></tr></table>')
+
+        result = {'encoding': 'ISO-8859-1', 'confidence': 0.9}
+        with patch('file_reader._statistical_detect', return_value=result) as detect:
+            encodings = [detect_encoding(str(tmp_path / f'{i}.xls')) for i in range(3)]
+
+        assert encodings == ['ISO-8859-1'] * 3
+        assert detect.call_count == 1
+
+        # A new execution detects again
+        clear_encoding_memo()
+        with patch('file_reader._statistical_detect', return_value=result) as detect:
+            detect_encoding(str(tmp_path / '0.xls'))
+        assert detect.call_count == 1
+
+    def test_low_confidence_falls_back_to_cp1252(self, tmp_path):
+        """Test an unsure detection resolves to cp1252 once for the folder"""
+        for i in range(2):
+            (tmp_path / f'{i}.xls').write_bytes(b'<table><tr><td>\x80 caf\xe9</td></tr></table>')
+
+        result = {'encoding': 'Windows-1252', 'confidence': 0.0}
+        with patch('file_reader._statistical_detect', return_value=result) as detect:
+            encodings = [detect_encoding(str(tmp_path / f'{i}.xls')) for i in range(2)]
+            assert '€ café' in read_html_xls(str(tmp_path / '0.xls'))
+
+        assert encodings == ['cp1252', 'cp1252']
+        assert detect.call_count == 1
+
+
+class TestArrowCleaning:
+    """Test suite for cleaning Arrow tables"""
+
+    def test_clean_arrow_table(self):
+        """Test empty rows and columns are dropped and names cleaned"""
+        table = pa.table({
+            'Total Amount!': [1, None, 3],
+            'empty': pa.nulls(3),
+            'Name': ['a', None, 'c'],
+        })
+        cleaned = clean_arrow_table(table, ReaderOptions())
+
+        assert cleaned.column_names == ['Total_Amount', 'Name']
+        assert cleaned.num_rows == 2
+
+
+class TestStreaming:
+    """Test suite for streamed files giving the tables of whole-file parsing"""
+
+    def test_batches_form_one_table(self, tmp_path):
+        """Test batches share the columns and types decided for the whole table"""
+        rows = [f'<tr><td>{i}</td><td>{"" if i < 30 else "x"}</td>'
+                f'<td>2024-01-{i % 28 + 1:02d}</td></tr>' for i in range(50)]
+        rows[45] = '<tr><td>45</td><td>x</td><td>n/a yet</td></tr>'
+        html = '<table><tr><th>Id</th><th>Late</th><th>Day</th></tr>' + ''.join(rows) + '</table>'
+        path = tmp_path / 'report.xls'
+        path.write_text(html, encoding='utf-8')
+
+        read_chunks = file_reader.iter_html_chunks
+        for arrow in (False, True):
+            expected = process_file(str(path), ReaderOptions(arrow_output=arrow))
+            # Small chunks, so full batches are drained while parsing
+            with patch('file_reader.iter_html_chunks',
+                       lambda *args: read_chunks(*args, chunk_size=256)):
+                options = ReaderOptions(streaming=True, stream_batch_rows=10, arrow_output=arrow)
+                streamed = process_file(str(path), options)
+
+            assert len(streamed) == 1
+            (table, metadata), = streamed
+            assert metadata == expected[0][1]
+            assert table.equals(expected[0][0])
+            assert list(table.columns if not arrow else table.column_names) == ['Id', 'Late', 'Day']
+            assert 'n/a yet' in (table['Day'].tolist() if not arrow else table['Day'].to_pylist())
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
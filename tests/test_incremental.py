@@ -0,0 +1,82 @@
+import pytest
+import pandas as pd
+import os
+import sys
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from incremental import IngestManifest, default_state_dir
+
+
+class TestIncrementalIngestion:
+    """Test suite for the incremental ingestion manifest"""
+
+    @pytest.fixture
+    def drop_folder(self, tmp_path):
+        """Create a drop folder with two files"""
+        folder = tmp_path / 'drop'
+        folder.mkdir()
+        for name in ('a.xls', 'b.xls'):
+            (folder / name).write_text(f"<table><tr><td>{name}</td></tr></table>")
+        return folder
+
+    def test_split_new_and_modified(self, tmp_path, drop_folder):
+        """Test only new or modified files are selected after a run"""
+        files = sorted(str(p) for p in drop_folder.iterdir())
+        manifest = IngestManifest(str(tmp_path / 'state'), 'options')
+        manifest.load()
+        assert manifest.split(files) == (files, [])
+
+        for file_path in files:
+            manifest.record(file_path, 1, 1)
+        manifest.save()
+
+        (drop_folder / 'b.xls').write_text("<table><tr><td>changed</td></tr></table>")
+        (drop_folder / 'c.xls').write_text("<table><tr><td>new</td></tr></table>")
+        files = sorted(str(p) for p in drop_folder.iterdir())
+
+        manifest = IngestManifest(str(tmp_path / 'state'), 'options')
+        manifest.load()
+        changed, skipped = manifest.split(files)
+
+        assert skipped == [str(drop_folder / 'a.xls')]
+        assert changed == [str(drop_folder / 'b.xls'), str(drop_folder / 'c.xls')]
+
+    def test_options_change_resets_manifest(self, tmp_path, drop_folder):
+        """Test changed reader options re-ingest every file"""
+        files = sorted(str(p) for p in drop_folder.iterdir())
+        manifest = IngestManifest(str(tmp_path / 'state'), 'old options')
+        for file_path in files:
+            manifest.record(file_path, 1, 1)
+        manifest.save()
+
+        manifest = IngestManifest(str(tmp_path / 'state'), 'new options')
+        manifest.load()
+
+        assert manifest.split(files) == (files, [])
+
+    def test_merge_replaces_rows_of_modified_files(self, tmp_path):
+        """Test merged output keeps prior rows and replaces modified files"""
+        manifest = IngestManifest(str(tmp_path / 'state'), 'options')
+        first = manifest.merge([('a.xls', pd.DataFrame({'v': [1, 2]})),
+                                ('b.xls', pd.DataFrame({'v': [3]}))])
+        manifest.files = {'a.xls': {}}
+        manifest.save()
+
+        manifest = IngestManifest(str(tmp_path / 'state'), 'options')
+        manifest.load()
+        merged = manifest.merge([('b.xls', pd.DataFrame({'v': [30, 31]}))])
+
+        assert first['v'].tolist() == [1, 2, 3]
+        assert merged['v'].tolist() == [1, 2, 30, 31]
+        assert list(merged.columns) == ['v']
+
+    def test_default_state_dir_per_folder(self):
+        """Test each input folder and pattern gets its own state folder"""
+        assert default_state_dir('/data/a', '*.xls') != default_state_dir('/data/b', '*.xls')
+        assert default_state_dir('/data/a', '*.xls') == default_state_dir('/data/a', '*.xls')
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
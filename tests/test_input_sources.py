@@ -0,0 +1,141 @@
+import pytest
+import os
+import sys
+import bz2
+import gzip
+import lzma
+import tarfile
+import zipfile
+
+import pandas as pd
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'test_data'))
+
+from batch_processing import process_files
+from create_test_files import generate_report
+from file_discovery import discover_files
+from file_reader import ReaderOptions, process_file
+from incremental import IngestManifest
+from input_sources import is_plain, read_source, split_member, uncompressed_name
+from parse_cache import ParseCache
+
+
+class TestInputSources:
+    """Test suite for compressed files and archive members as input"""
+
+    def _reports(self, count=3):
+        return [generate_report(rows=20, cols=4, seed=i).encode('utf-8') for i in range(count)]
+
+    @pytest.fixture
+    def bundles(self, tmp_path):
+        """A zip and a tar.gz bundle of reports and a plain report"""
+        reports = self._reports()
+        with zipfile.ZipFile(tmp_path / 'bundle.zip', 'w', zipfile.ZIP_DEFLATED) as archive:
+            for i, content in enumerate(reports):
+                archive.writestr(f'reports/r{i}.xls', content)
+            archive.writestr('readme.txt', b'not a report')
+        with tarfile.open(tmp_path / 'bundle.tar.gz', 'w:gz') as archive:
+            for i, content in enumerate(reports[:2]):
+                path = tmp_path / f't{i}.xls'
+                path.write_bytes(content)
+                archive.add(path, arcname=f't{i}.xls')
+                path.unlink()
+        (tmp_path / 'plain.xls').write_bytes(reports[0])
+        return tmp_path, reports
+
+    def test_compressed_files(self, tmp_path):
+        """Test gzip, bz2 and xz files give the tables of the plain file, also when streamed"""
+        content = self._reports(1)[0]
+        (tmp_path / 'report.xls').write_bytes(content)
+        expected, = process_file(str(tmp_path / 'report.xls'), ReaderOptions())
+
+        for suffix, compress in [('.gz', gzip.compress), ('.bz2', bz2.compress),
+                                 ('.xz', lzma.compress)]:
+            file_path = str(tmp_path / f'report.xls{suffix}')
+            with open(file_path, 'wb') as f:
+                f.write(compress(content))
+            assert not is_plain(file_path) and read_source(file_path) == content
+
+            for options in (ReaderOptions(), ReaderOptions(streaming=True)):
+                (df, metadata), = process_file(file_path, options)
+                pd.testing.assert_frame_equal(df, expected[0])
+                assert metadata['source_file'] == f'report.xls{suffix}'
+                assert metadata['file_path'] == file_path
+
+    def test_separator_in_plain_paths(self, bundles):
+        """Test paths only address members of existing archives"""
+        folder, reports = bundles
+        (folder / 'Urgent!').mkdir()
+        (folder / 'Urgent!' / 'report.xls').write_bytes(reports[0])
+        path = str(folder / 'Urgent!' / 'report.xls')
+
+        assert split_member(path) == (path, None) and is_plain(path)
+        assert list(discover_files(str(folder), ['report.xls'], recursive=True)) == [path]
+        (df, _), = process_file(path, ReaderOptions())
+        assert len(df) == 20
+        member = str(folder / 'bundle.zip') + '!/reports/r0.xls'
+        assert split_member(member) == (str(folder / 'bundle.zip'), 'reports/r0.xls')
+        assert split_member(str(folder / 'plain.xls') + '!/r0.xls')[1] is None
+
+    def test_discover_members(self, bundles):
+        """Test archives are listed with their members, filtered by the patterns"""
+        folder, _ = bundles
+        files = list(discover_files(str(folder), ['*.xls'], archives=True))
+
+        members = [(os.path.basename(archive), name) for archive, name in map(split_member, files)]
+        assert members == [('bundle.tar.gz', 't0.xls'), ('bundle.tar.gz', 't1.xls'),
+                           ('bundle.zip', 'reports/r0.xls'), ('bundle.zip', 'reports/r1.xls'),
+                           ('bundle.zip', 'reports/r2.xls'), ('plain.xls', None)]
+        assert list(discover_files(str(folder), ['*.xls'])) == [str(folder / 'plain.xls')]
+        assert len(list(discover_files(str(folder), ['*.xls'], exclude=['*r1.xls'], archives=True,
+                                       max_files=4))) == 4
+        assert uncompressed_name('report.xls.gz') == 'report.xls'
+
+    def test_process_members(self, bundles):
+        """Test members are parsed from the archive, named by their member path"""
+        folder, _ = bundles
+        files = list(discover_files(str(folder), ['r*.xls'], archives=True))
+
+        results = list(process_files(files, ReaderOptions(table_index=-1), prefetch_depth=2))
+        pooled = list(process_files(files, ReaderOptions(table_index=-1), workers=2))
+
+        assert [error for _, _, error in results + pooled] == [None] * 6
+        (df, metadata), = results[1][1]
+        assert metadata['source_file'] == 'r1.xls'
+        assert metadata['file_path'] == str(folder / 'bundle.zip') + '!/reports/r1.xls'
+        (expected, _), = process_file(str(folder / 'plain.xls'), ReaderOptions(table_index=-1))
+        pd.testing.assert_frame_equal(results[0][1][0][0], expected)
+        pd.testing.assert_frame_equal(pooled[2][1][0][0], results[2][1][0][0])
+
+    def test_cache_and_manifest(self, bundles, tmp_path):
+        """Test members are fingerprinted by their archive"""
+        folder, _ = bundles
+        member = str(folder / 'bundle.tar.gz') + '!/t1.xls'
+        cache = ParseCache(str(tmp_path / 'cache'))
+        options = ReaderOptions()
+
+        first = cache.load_or_process(member, options)
+        assert cache.get(member, options) is not None
+        pd.testing.assert_frame_equal(cache.get(member, options)[0][0], first[0][0],
+                                      check_column_type=False)
+
+        manifest = IngestManifest(str(tmp_path / 'state'), repr(options))
+        manifest.record(member, 1, len(first[0][0]))
+        assert manifest.split([member]) == ([], [member])
+
+    def test_zstd(self, tmp_path):
+        """Test zstandard compressed files, if the package is installed"""
+        zstandard = pytest.importorskip('zstandard')
+        content = self._reports(1)[0]
+        file_path = str(tmp_path / 'report.xls.zst')
+        with open(file_path, 'wb') as f:
+            f.write(zstandard.ZstdCompressor().compress(content))
+
+        (df, _), = process_file(file_path, ReaderOptions(streaming=True))
+        assert len(df) == 20
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
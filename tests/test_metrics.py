@@ -0,0 +1,102 @@
+import pytest
+import os
+import sys
+import tracemalloc
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from batch_processing import process_files
+from file_reader import ReaderOptions, process_file
+from metrics import METRICS_COLUMNS, StageRecorder, stage
+from parse_cache import ParseCache
+
+
+class TestStageMetrics:
+    """Test suite for per-stage instrumentation"""
+
+    @pytest.fixture
+    def sample_files(self, tmp_path):
+        """Create two small HTML-XLS files"""
+        files = []
+        for i in range(2):
+            path = tmp_path / f'report_{i}.xls'
+            path.write_text("<table><tr><th>id</th></tr>"
+                            + f"<tr><td>{i}</td></tr>" * (i + 1) + "</table>")
+            files.append(str(path))
+        return files
+
+    def test_stages_of_one_file(self, sample_files):
+        """Test every stage of a file is recorded with its measurements"""
+        with StageRecorder() as recorder:
+            process_file(sample_files[1], ReaderOptions(), recorder)
+
+        stages = [record['stage'] for record in recorder.records]
+        assert stages == ['detect_encoding', 'read', 'extract', 'clean', 'table']
+        read = recorder.records[1]
+        assert read['bytes_read'] == os.path.getsize(sample_files[1])
+        assert read['seconds'] >= 0
+        assert recorder.records[-1]['rows'] == 2
+
+    def test_memory_tracing_is_opt_in(self, sample_files):
+        """Test Python allocations are only traced when requested"""
+        with StageRecorder() as recorder:
+            assert not tracemalloc.is_tracing()
+            process_file(sample_files[1], ReaderOptions(), recorder)
+        assert all(record['peak_python_bytes'] == 0 for record in recorder.records)
+
+        with StageRecorder(trace_memory=True) as recorder:
+            assert tracemalloc.is_tracing()
+            process_file(sample_files[1], ReaderOptions(), recorder)
+        assert not tracemalloc.is_tracing()
+        assert recorder.records[2]['stage'] == 'extract'
+        assert recorder.records[2]['peak_python_bytes'] > 0
+
+    @pytest.mark.parametrize('workers', [1, 2])
+    def test_records_from_workers(self, sample_files, workers):
+        """Test metrics measured in worker processes reach the recorder"""
+        recorder = StageRecorder()
+        list(process_files(sample_files, ReaderOptions(), workers, recorder=recorder))
+
+        tables = [r for r in recorder.records if r['stage'] == 'table']
+        assert [(r['file_path'], r['rows']) for r in tables] == [(sample_files[0], 1),
+                                                                   (sample_files[1], 2)]
+
+    def test_cache_stages(self, tmp_path, sample_files):
+        """Test cache hits are recorded instead of the parse stages"""
+        cache = ParseCache(str(tmp_path / 'cache'))
+        cache.load_or_process(sample_files[0], ReaderOptions())
+        recorder = StageRecorder()
+        cache.load_or_process(sample_files[0], ReaderOptions(), recorder)
+
+        assert [r['stage'] for r in recorder.records] == ['cache_load']
+        assert recorder.records[0]['rows'] == 1
+
+    def test_table_and_summary(self):
+        """Test the metrics table schema and the per-stage totals"""
+        recorder = StageRecorder()
+        for _ in range(2):
+            with stage(recorder, 'output') as record:
+                record['rows'] = 3
+        table = recorder.to_arrow()
+
+        assert table.column_names == list(METRICS_COLUMNS)
+        assert table.num_rows == 2
+        assert set(recorder.summary()) == {'output'}
+        assert StageRecorder().to_arrow().num_rows == 0
+
+    def test_disabled_is_a_no_op(self):
+        """Test stages without a recorder only run their body"""
+        with stage(None, 'read') as record:
+            record['rows'] = 1
+
+    def test_metrics_do_not_change_cache_keys(self, tmp_path, sample_files):
+        """Test toggling instrumentation keeps cached entries valid"""
+        cache = ParseCache(str(tmp_path / 'cache'))
+
+        assert cache.key(sample_files[0], ReaderOptions()) == \
+            cache.key(sample_files[0], ReaderOptions(collect_metrics=True))
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
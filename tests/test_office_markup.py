@@ -0,0 +1,124 @@
+import pytest
+import os
+import sys
+
+import pandas as pd
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'test_data'))
+
+import office_markup
+import table_extraction
+from office_markup import is_office_markup, iter_stripped, office_number, strip_office_markup
+from table_extraction import ParseOptions, extract_tables, iter_tables
+from create_test_files import generate_report
+
+
+class TestOfficeMarkup:
+    """Test suite for the pre-filter of Office export markup"""
+
+    SPANNED = ("<html xmlns:x=\"urn:schemas-microsoft-com:office:excel\"><body>"
+               "<table><tr height=20 style='height:15.0pt'>"
+               "<td colspan=2 class=xl65 style='mso-number-format:General'>Both</td></tr>"
+               "<![if supportMisc]><tr><td rowspan=2 x:str>A</td>"
+               "<td class=xl66 align=right x:num=\"0.179\">17.9%</td></tr><![endif]>"
+               "<!--[if gte mso 9]><xml><x:Name>Sheet</x:Name></xml><![endif]-->"
+               "<tr><td x:num=\"43956\">2020-05-05</td></tr></table></body></html>")
+
+    def test_strip_keeps_structure(self):
+        """Test styles, comments and formatting attributes are dropped, spans kept"""
+        stripped = strip_office_markup(self.SPANNED)
+
+        assert stripped == ("<html xmlns:x=\"urn:schemas-microsoft-com:office:excel\"><body>"
+                            "<table><tr><td colspan=2>Both</td></tr>"
+                            "<tr><td rowspan=2>A</td><td>17.9%</td></tr>"
+                            "<tr><td>2020-05-05</td></tr></table></body></html>")
+        assert 'x:num="0.179"' in strip_office_markup(self.SPANNED, keep_numbers=True)
+
+    def test_cell_text_is_kept(self):
+        """Test text reading like a formatting attribute is only dropped inside tags"""
+        html = ("<table><tr><td class=xl65 title='a > b' style='mso-x'>Set width=10 align=left</td>"
+                "<td x:str>Share class=A units</td><td>Ratio x:y</td></tr></table>")
+
+        assert strip_office_markup(html) == (
+            "<table><tr><td title='a > b'>Set width=10 align=left</td>"
+            "<td>Share class=A units</td><td>Ratio x:y</td></tr></table>")
+
+    def test_same_tables(self):
+        """Test an Office report gives the same tables with and without the filter"""
+        html = generate_report(rows=200, cols=8, tables=2, office=True)
+        assert is_office_markup(html)
+
+        stripped = extract_tables(html, ParseOptions())
+        unstripped = extract_tables(html, ParseOptions(strip_office=False))
+
+        assert len(stripped) == 2
+        for df, expected in zip(stripped, unstripped):
+            pd.testing.assert_frame_equal(df, expected)
+
+    def test_whole_document_stripped_in_pieces(self, monkeypatch):
+        """Test parsing a whole document strips it piece by piece, not as one copy"""
+        html = generate_report(rows=200, cols=8, office=True)
+        expected = extract_tables(html, ParseOptions())[0]
+        stripped = []
+
+        def strip(text, keep_numbers):
+            stripped.append(len(text))
+            return strip_office_markup(text, keep_numbers)
+
+        monkeypatch.setattr(office_markup, 'strip_office_markup', strip)
+        monkeypatch.setattr(table_extraction, 'FEED_SIZE', 4096)
+
+        pd.testing.assert_frame_equal(extract_tables(html, ParseOptions())[0], expected)
+        assert len(stripped) > 1 and max(stripped) < len(html) // 2
+
+    def test_stream_chunk_boundaries(self):
+        """Test chunks cutting tags, comments and the style block filter like one string"""
+        html = generate_report(rows=50, cols=8, office=True)
+        expected = strip_office_markup(html)
+
+        for size in (7, 100, 4096):
+            chunks = [html[i:i + size] for i in range(0, len(html), size)]
+            assert "".join(iter_stripped(chunks)) == expected
+
+        frames = [df for _, df in iter_tables([html[i:i + 997] for i in range(0, len(html), 997)],
+                                              ParseOptions())]
+        pd.testing.assert_frame_equal(frames[0], extract_tables(html, ParseOptions())[0])
+
+    def test_other_markup_unchanged(self):
+        """Test documents without Office markers are passed through"""
+        html = "<table><tr><td style='color: red' class=total>1</td></tr></table>"
+        assert not is_office_markup(html)
+        assert "".join(iter_stripped([html[:10], html[10:]])) == html
+
+    def test_office_numbers(self):
+        """Test numeric cells take their x:num value, dates and times keep their text"""
+        assert office_number("$970,691.91", "970691.91") == "970691.91"
+        assert office_number("17.9%", "0.179", decimal=",") == "0,179"
+        assert office_number("(1,234.00)", "-1234") == "-1234"
+        assert office_number("-", "0") == "0"
+        assert office_number("2020-05-05", "43956") == "2020-05-05"
+        assert office_number("12:30", "0.520833333") == "12:30"
+        assert office_number("n/a", "5") == "n/a"
+
+        html = ("<html xmlns:x=\"urn:schemas-microsoft-com:office:excel\"><table>"
+                "<tr><td>Share</td><td>Day</td></tr>"
+                "<tr><td class=xl66 x:num=\"0.179\">17.9%</td>"
+                "<td x:num=\"43956\">2020-05-05</td></tr>"
+                "<tr><td x:num=\"-0.021\">-2.1%</td><td x:num=\"43957\">2020-05-06</td></tr>"
+                "</table></html>")
+        df, = extract_tables(html, ParseOptions(office_numbers=True))
+        assert df['Share'].tolist() == [0.179, -0.021]
+        assert df['Day'].dt.day.tolist() == [5, 6]
+        unstripped = ParseOptions(office_numbers=True, strip_office=False)
+        assert df.equals(extract_tables(html, unstripped)[0])
+
+        html = generate_report(rows=20, cols=4, office=True)
+        df, = extract_tables(html, ParseOptions(office_numbers=True))
+        assert pd.api.types.is_float_dtype(df.iloc[:, 2])
+        assert pd.api.types.is_float_dtype(df.iloc[:, 3])
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,90 @@
+import pytest
+import os
+import sys
+from unittest.mock import patch
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from file_reader import ReaderOptions
+from parse_cache import ParseCache
+from table_extraction import ParseOptions
+
+
+class TestParseCache:
+    """Test suite for the on-disk parse cache"""
+
+    @pytest.fixture
+    def sample_file(self, tmp_path):
+        """Create a small HTML-XLS file"""
+        path = tmp_path / 'report.xls'
+        path.write_text("<table><tr><th>Name</th><th>Total</th></tr>"
+                        "<tr><td>A</td><td>1,050.5</td></tr></table>")
+        return str(path)
+
+    @pytest.fixture
+    def cache(self, tmp_path):
+        """Create a cache in a temporary folder"""
+        return ParseCache(str(tmp_path / 'cache'))
+
+    def test_hit_skips_parsing(self, cache, sample_file):
+        """Test unchanged files are loaded from the cache"""
+        options = ReaderOptions()
+        expected = cache.load_or_process(sample_file, options)
+
+        with patch('parse_cache.process_file') as process_file:
+            results = cache.load_or_process(sample_file, options)
+            process_file.assert_not_called()
+
+        assert len(results) == 1
+        assert results[0][0].equals(expected[0][0])
+        assert results[0][1] == expected[0][1]
+
+    def test_key_changes_with_file_and_options(self, cache, sample_file):
+        """Test modified files and other settings miss the cache"""
+        options = ReaderOptions()
+        key = cache.key(sample_file, options)
+
+        assert cache.key(sample_file, ReaderOptions(parse=ParseOptions(header_rows=0))) != key
+
+        with open(sample_file, 'a') as f:
+            f.write("<!-- changed -->")
+        assert cache.key(sample_file, options) != key
+
+    def test_non_string_column_labels(self, cache, sample_file):
+        """Test positional and multi-level column labels survive a round trip"""
+        for parse in (ParseOptions(header_rows=0), ParseOptions(header_rows=2)):
+            options = ReaderOptions(parse=parse, clean_column_names=False, drop_empty_rows=False)
+            expected = cache.load_or_process(sample_file, options)
+            results = cache.get(sample_file, options)
+
+            assert list(results[0][0].columns) == list(expected[0][0].columns)
+
+    def test_arrow_tables(self, cache, sample_file):
+        """Test Arrow results are cached and returned as Arrow tables"""
+        options = ReaderOptions(arrow_output=True)
+        expected = cache.load_or_process(sample_file, options)
+        results = cache.get(sample_file, options)
+
+        assert results[0][0].equals(expected[0][0])
+
+    def test_lru_eviction(self, tmp_path, sample_file):
+        """Test least recently used entries are evicted first"""
+        cache = ParseCache(str(tmp_path / 'cache'))
+        old = ReaderOptions(parse=ParseOptions(header_rows=0))
+        new = ReaderOptions()
+        cache.load_or_process(sample_file, old)
+        cache.load_or_process(sample_file, new)
+        os.utime(os.path.join(cache.cache_dir, cache.key(sample_file, old)), (0, 0))
+
+        entry_size = sum(e.stat().st_size for e in os.scandir(
+            os.path.join(cache.cache_dir, cache.key(sample_file, new))))
+        cache.max_bytes = entry_size
+        cache.evict()
+
+        assert cache.get(sample_file, old) is None
+        assert cache.get(sample_file, new) is not None
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,98 @@
+import pytest
+import pyarrow as pa
+import os
+import sys
+from unittest.mock import patch
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import schema_inference
+from arrow_output import frame_to_arrow
+from file_reader import ReaderOptions, process_file
+from schema_inference import infer_schema, sample_tables
+from table_extraction import ParseOptions
+
+
+class TestSchemaInference:
+    """Test suite for the configure-time schema sniff"""
+
+    @pytest.fixture
+    def sample_file(self, tmp_path):
+        """Create a file with a long first table and a short second table"""
+        rows = "".join(f"<tr><td>Item {i}</td><td>{i}</td></tr>" for i in range(1000))
+        path = tmp_path / 'report.xls'
+        path.write_text("<table><tr><th>Name</th><th>Count</th></tr>" + rows + "</table>"
+                        "<table><tr><th>Name</th><th>Share %</th></tr>"
+                        "<tr><td>A</td><td>0.5</td></tr></table>")
+        return str(path)
+
+    def test_selected_table_schema(self, sample_file):
+        """Test the sniffed schema matches the columns of a full parse"""
+        options = ReaderOptions(arrow_output=True)
+        schema = infer_schema(sample_file, options)
+        table, _ = process_file(sample_file, options)[0]
+
+        assert schema.names == ['Name', 'Count', 'source_file', 'file_path',
+                                'table_index', 'num_rows', 'num_cols']
+        assert schema.field('Count').type == table.schema.field('Count').type
+
+    @pytest.mark.parametrize('arrow_output', [False, True])
+    def test_gaps_typed_as_output(self, tmp_path, arrow_output):
+        """Test integer columns with gaps get the type the output of execute has"""
+        path = tmp_path / 'gaps.xls'
+        path.write_text("<table><tr><th>Name</th><th>Count</th></tr>"
+                        "<tr><td>A</td><td>1</td></tr><tr><td>B</td><td></td></tr></table>")
+        options = ReaderOptions(arrow_output=arrow_output)
+        schema = infer_schema(str(path), options, include_metadata=False)
+        table, _ = process_file(str(path), options)[0]
+
+        output = table if arrow_output else frame_to_arrow(table)
+        assert schema.field('Count').type == output.schema.field('Count').type
+
+    def test_all_tables_are_unified(self, sample_file):
+        """Test columns of all tables are unified in output order"""
+        schema = infer_schema(sample_file, ReaderOptions(table_index=-1), include_metadata=False)
+
+        assert schema.names == ['Name', 'Count', 'Share']
+        assert schema.field('Share').type == pa.float64()
+
+    def test_sample_is_limited(self, sample_file):
+        """Test only the sampled rows are returned"""
+        samples = sample_tables(sample_file, ReaderOptions(table_index=-1), sample_rows=5)
+
+        assert [index for index, _ in samples] == [0, 1]
+        assert samples[0][1].num_rows == 5
+        assert samples[1][1].num_rows == 1
+
+    def test_first_tables_are_streamed(self, sample_file):
+        """Test sampling the first tables stops reading instead of decoding the whole file"""
+        with patch('schema_inference.read_html_xls') as read:
+            samples = sample_tables(sample_file, ReaderOptions(table_index=-1), sample_rows=5,
+                                    max_tables=1)
+            read.assert_not_called()
+
+        assert [index for index, _ in samples] == [0]
+        assert samples[0][1].num_rows == 5
+
+    def test_schema_is_memoized(self, sample_file):
+        """Test repeated calls for an unchanged file do not parse again"""
+        options = ReaderOptions(parse=ParseOptions(header_rows=0))
+        expected = infer_schema(sample_file, options)
+
+        with patch('schema_inference.sample_tables') as sample:
+            assert infer_schema(sample_file, options).equals(expected)
+            sample.assert_not_called()
+
+    def test_memo_is_bounded(self, sample_file):
+        """Test only the most recently inferred schemas are kept"""
+        with patch('schema_inference.SCHEMA_CACHE_SIZE', 2):
+            for rows in range(1, 4):
+                infer_schema(sample_file, ReaderOptions(), sample_rows=rows)
+
+            assert len(schema_inference._schemas) == 2
+            assert [key[-2] for key in schema_inference._schemas] == [2, 3]
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,94 @@
+import pytest
+import os
+import sys
+import logging
+from dataclasses import replace
+
+import pandas as pd
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from file_format import mapped_file
+from file_reader import ReaderOptions, process_file
+from split_parsing import extract_split
+from table_extraction import ParseOptions, extract_tables
+
+
+class TestSplitParsing:
+    """Test suite for parsing row ranges of one table in parallel"""
+
+    def _report(self, tmp_path, body_rows, name='report.xls', encoding='utf-8'):
+        """Write a report with a title row, a two-row header and many data rows"""
+        rows = "".join(f"<tr><td>{i}</td><td>item {i}</td><td>{i * 1.5}</td></tr>"
+                       for i in range(body_rows))
+        html = ("<html><body><table><tr><td>Small</td></tr><tr><td>1</td></tr></table>"
+                "<table><tr><td colspan=3>Monthly report</td></tr>"
+                "<tr><th rowspan=2>Id</th><th colspan=2>Item</th></tr>"
+                "<tr><th>Name</th><th>Price</th></tr>"
+                f"{rows}</table></body></html>")
+        file_path = tmp_path / name
+        file_path.write_bytes(html.encode(encoding))
+        return str(file_path), html
+
+    def _split(self, file_path, options, encoding='utf-8', table_index=-1, workers=3):
+        with mapped_file(file_path) as buffer:
+            return extract_split(buffer, file_path, encoding, options, table_index, workers,
+                                 min_bytes=1000)
+
+    def test_split_matches_single_parse(self, tmp_path, caplog):
+        """Test row ranges stitch into the table of a single parse, header applied once"""
+        file_path, html = self._report(tmp_path, 500)
+        options = ParseOptions(skip_rows=1, header_rows=2)
+
+        with caplog.at_level(logging.INFO, logger='split_parsing'):
+            frames = self._split(file_path, options)
+        expected = extract_tables(html, options)
+
+        assert 'Parsed table 1 of' in caplog.text and 'in 3 row ranges' in caplog.text
+        assert len(frames) == 2
+        pd.testing.assert_frame_equal(frames[1], expected[1])
+        pd.testing.assert_frame_equal(frames[0], expected[0])
+        assert frames[1]['Id', 'Id'].tolist() == list(range(500))
+
+    def test_unsafe_table_parsed_whole(self, tmp_path, caplog):
+        """Test a table with rowspans in its data rows is not split"""
+        file_path, html = self._report(tmp_path, 500)
+        html = html.replace("<td>250</td>", "<td rowspan=2>250</td>")
+        with open(file_path, 'w', encoding='utf-8') as f:
+            f.write(html)
+        options = ParseOptions(skip_rows=1, header_rows=2)
+
+        with caplog.at_level(logging.INFO, logger='split_parsing'):
+            frames = self._split(file_path, options, table_index=1)
+
+        assert 'cannot be split safely' in caplog.text
+        pd.testing.assert_frame_equal(frames[0], extract_tables(html, options)[1])
+
+    def test_not_split(self, tmp_path):
+        """Test small tables, UTF-16 content and row limits are left to the single parse"""
+        file_path, _ = self._report(tmp_path, 5)
+        assert self._split(file_path, ParseOptions()) is None
+
+        file_path, _ = self._report(tmp_path, 500, 'utf16.xls', 'utf-16')
+        assert self._split(file_path, ParseOptions(), 'utf-16') is None
+
+        file_path, _ = self._report(tmp_path, 500)
+        assert self._split(file_path, ParseOptions(max_rows=10)) is None
+
+    def test_process_file(self, tmp_path, monkeypatch, caplog):
+        """Test process_file output is the same with split workers"""
+        monkeypatch.setattr('split_parsing.SPLIT_MIN_BYTES', 1000)
+        file_path, _ = self._report(tmp_path, 500)
+        options = ReaderOptions(table_index=1, parse=ParseOptions(skip_rows=1, header_rows=2))
+
+        with caplog.at_level(logging.INFO, logger='split_parsing'):
+            (split, _), = process_file(file_path, replace(options, split_workers=2))
+        (single, _), = process_file(file_path, options)
+
+        assert 'in 2 row ranges' in caplog.text
+        pd.testing.assert_frame_equal(split, single)
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
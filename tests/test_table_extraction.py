@@ -0,0 +1,330 @@
+import pytest
+import pandas as pd
+import pyarrow as pa
+import os
+import sys
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import table_extraction
+from table_extraction import ParseOptions, extract_table, extract_tables, iter_tables, scan_tables
+
+
+class TestTableExtraction:
+    """Test suite for the single-pass table extraction engine"""
+
+    @pytest.fixture
+    def sample_html_content(self):
+        """Sample HTML content with tables"""
+        return """
+        <html>
+        <body>
+            <table>
+                <tr><th>Name</th><th>Age</th><th>City</th></tr>
+                <tr><td>John</td><td>30</td><td>New York</td></tr>
+                <tr><td>Jane</td><td>NA</td><td>London</td></tr>
+            </table>
+            <table>
+                <tr><th>Product</th><th>Price</th></tr>
+                <tr><td>Apple</td><td>1,001.99</td></tr>
+                <tr><td>Banana</td><td>0.99</td></tr>
+            </table>
+        </body>
+        </html>
+        """
+
+    def test_extract_all_tables(self, sample_html_content):
+        """Test extracting every table in document order"""
+        tables = extract_tables(sample_html_content, ParseOptions())
+
+        assert len(tables) == 2
+        assert list(tables[0].columns) == ['Name', 'Age', 'City']
+        assert list(tables[1].columns) == ['Product', 'Price']
+        assert tables[1]['Price'].tolist() == [1001.99, 0.99]
+        assert pd.isna(tables[0]['Age'][1])
+
+    def test_no_tables(self):
+        """Test that documents without tables are rejected"""
+        with pytest.raises(ValueError, match="No tables found"):
+            extract_tables("<html><body><p>nothing</p></body></html>", ParseOptions())
+
+    def test_header_and_skip_rows(self, sample_html_content):
+        """Test header_rows=0 and skip_rows"""
+        tables = extract_tables(sample_html_content.replace('th>', 'td>'),
+                                ParseOptions(header_rows=0, skip_rows=1))
+
+        assert list(tables[0].columns) == [0, 1, 2]
+        assert tables[0][0].tolist() == ['John', 'Jane']
+
+    @pytest.mark.parametrize("html", [
+        # <th> rows and <thead> rows are the header even with header_rows=0
+        "<table><tr><th>Name</th><th>Age</th></tr><tr><td>John</td><td>30</td></tr></table>",
+        "<table><thead><tr><th>A</th><th>B</th></tr><tr><th></th><th></th></tr>"
+        "<tr><td>x</td><td>y</td></tr></thead><tr><td>1</td><td>2</td></tr></table>",
+        # Booleans, integers beyond int64 and malformed thousands groups
+        "<table><tr><td>true</td><td>18446744073709551615</td><td>1,2</td><td>1,,000</td>"
+        "<td>-</td></tr><tr><td>False</td><td>1</td><td>3</td><td>5</td><td>4</td></tr></table>",
+        "<table><tr><td>1.000,5</td><td>2,5.1</td></tr><tr><td>12</td><td>3</td></tr></table>",
+    ])
+    @pytest.mark.parametrize("skip_rows", [0, 1])
+    def test_matches_read_html(self, html, skip_rows):
+        """Test header inference and value conversion give what pd.read_html gives"""
+        from io import StringIO
+        thousands, decimal = ('.', ',') if '1.000,5' in html else (',', '.')
+        expected = pd.read_html(StringIO(html), header=None, skiprows=skip_rows,
+                                thousands=thousands, decimal=decimal)[0]
+        df, = extract_tables(html, ParseOptions(header_rows=0, skip_rows=skip_rows,
+                                                thousands=thousands, decimal=decimal))
+
+        pd.testing.assert_frame_equal(df, expected, check_column_type=False)
+
+    def test_decimal_separator_and_na_values(self):
+        """Test European number formats and custom NA values"""
+        html = ("<table><tr><th>A</th><th>B</th></tr>"
+                "<tr><td>1.234,5</td><td>-</td></tr>"
+                "<tr><td>2,25</td><td>7</td></tr></table>")
+        options = ParseOptions(thousands=".", decimal=",", na_values=("-",))
+        df = extract_tables(html, options)[0]
+
+        assert df['A'].tolist() == [1234.5, 2.25]
+        assert pd.isna(df['B'][0])
+
+    def test_parse_dates(self):
+        """Test date columns are parsed only when enabled"""
+        html = ("<table><tr><th>Date</th></tr>"
+                "<tr><td>2024-01-05</td></tr><tr><td>2024-02-10</td></tr></table>")
+
+        df = extract_tables(html, ParseOptions(parse_dates=True))[0]
+        assert pd.api.types.is_datetime64_any_dtype(df['Date'])
+
+        df = extract_tables(html, ParseOptions(parse_dates=False))[0]
+        assert not pd.api.types.is_datetime64_any_dtype(df['Date'])
+
+    def test_spans_and_multi_row_header(self):
+        """Test colspan/rowspan expansion with a two-row header"""
+        html = ("<table>"
+                "<tr><th rowspan=2>Region</th><th colspan=2>Sales</th></tr>"
+                "<tr><th>Q1</th><th>Q2</th></tr>"
+                "<tr><td>North</td><td>10</td><td>20</td></tr>"
+                "</table>")
+        df = extract_tables(html, ParseOptions(header_rows=2))[0]
+
+        assert list(df.columns) == [('Region', 'Region'), ('Sales', 'Q1'), ('Sales', 'Q2')]
+        assert df.iloc[0].tolist() == ['North', 10, 20]
+
+    def test_rowspan_from_skipped_row(self):
+        """Test rowspans started in skipped rows keep columns aligned"""
+        html = ("<table>"
+                "<tr><td rowspan=3>Group</td><td>Title</td></tr>"
+                "<tr><td>Value</td></tr>"
+                "<tr><td>1</td></tr>"
+                "</table>")
+        df = extract_tables(html, ParseOptions(skip_rows=1))[0]
+
+        assert list(df.columns) == ['Group', 'Value']
+        assert df.iloc[0].tolist() == ['Group', 1]
+
+    def test_merged_cells_first_only(self):
+        """Test merged data cells only fill their first cell, headers stay filled"""
+        html = ("<table>"
+                "<tr><th colspan=2>Name</th><th>Q</th></tr>"
+                "<tr><td rowspan=2>North</td><td colspan=2>x</td></tr>"
+                "<tr><td>y</td><td>z</td></tr>"
+                "</table>")
+        df = extract_tables(html, ParseOptions(fill_merged=False))[0]
+
+        assert list(df.columns) == ['Name', 'Name.1', 'Q']
+        assert df['Name'].tolist()[0] == 'North' and pd.isna(df['Name'][1])
+        assert df['Name.1'].tolist() == ['x', 'y']
+        assert pd.isna(df['Q'][0]) and df['Q'][1] == 'z'
+
+        filled = extract_tables(html, ParseOptions())[0]
+        assert filled.iloc[0].tolist() == ['North', 'x', 'x']
+        assert filled.iloc[1].tolist() == ['North', 'y', 'z']
+
+    @pytest.mark.parametrize('engine', ['lxml', 'html5lib', 'html.parser'])
+    def test_parser_backends(self, sample_html_content, engine):
+        """Test every parser backend extracts the same tables"""
+        tables = extract_tables(sample_html_content, ParseOptions(engine=engine))
+
+        assert [list(df.columns) for df in tables] == [['Name', 'Age', 'City'],
+                                                       ['Product', 'Price']]
+        assert tables[1]['Price'].tolist() == [1001.99, 0.99]
+
+    def test_parser_fallback(self):
+        """Test lost cells make the parse fall back, and the backend is remembered per group"""
+        # lxml and html5lib read the stray <title> as raw text up to </title>
+        html = ("<table><tr><th>A</th><th>B</th></tr>"
+                "<tr><td><title>x</td><td>2</td></tr><tr><td>3</td><td>4</td></tr></table>")
+        group = 'test_parser_fallback'
+
+        df = extract_tables(html, ParseOptions(), group=group)[0]
+
+        assert df['A'].tolist() == ['x', '3'] and df['B'].tolist() == [2, 4]
+        assert table_extraction._group_engines[group] == 'html.parser'
+        assert len(extract_tables(html, ParseOptions(engine='lxml'))[0]) == 1
+
+    @pytest.fixture
+    def engines(self, monkeypatch):
+        """Backends of the parsers created during a test, in order"""
+        engines = []
+        make_parser = table_extraction.make_parser
+
+        def record(engine, target):
+            engines.append(engine)
+            return make_parser(engine, target)
+
+        monkeypatch.setattr(table_extraction, 'make_parser', record)
+        return engines
+
+    def test_remembered_backend_is_a_hint(self, monkeypatch, engines):
+        """Test clean documents of a group keep lxml and stray rows do not count as lost"""
+        clean = "<tr><td>stray</td></tr><table><tr><th>A</th></tr><tr><td>1</td></tr></table>"
+        broken = ("<table><tr><th>A</th><th>B</th></tr>"
+                  "<tr><td><title>x</td><td>2</td></tr><tr><td>3</td><td>4</td></tr></table>")
+        monkeypatch.setitem(table_extraction._group_engines, 'hint', 'html.parser')
+
+        assert extract_tables(clean, ParseOptions(), group='hint')[0]['A'].tolist() == [1]
+        assert engines == ['lxml']
+        extract_tables(broken, ParseOptions(), group='hint')
+        assert engines == ['lxml', 'lxml', 'html.parser']
+
+    def test_row_limit_keeps_backend(self, engines):
+        """Test tables ended by the row limit are not parsed again with another backend"""
+        rows = ''.join(f'<tr><td>{i}</td></tr>' for i in range(20))
+        html = f'<table><tr><th>A</th></tr>{rows}</table>'
+
+        assert len(extract_table(html, ParseOptions(max_rows=5), 0)) == 5
+        assert engines == ['lxml']
+
+    def test_malformed_html(self):
+        """Test unclosed cells and rows are still parsed"""
+        html = "<table><tr><th>A<th>B<tr><td>x<td>y</table>"
+        df = extract_tables(html, ParseOptions())[0]
+
+        assert df.iloc[0].tolist() == ['x', 'y']
+
+    def test_iter_tables_emits_on_close(self, sample_html_content):
+        """Test tables are emitted as soon as their closing tag is fed"""
+        split = sample_html_content.index('<table>', 50)
+        frames = iter_tables([sample_html_content[:split], sample_html_content[split:]],
+                             ParseOptions())
+
+        index, df = next(frames)
+        assert index == 0
+        assert list(df.columns) == ['Name', 'Age', 'City']
+        assert [index for index, _ in frames] == [1]
+
+    def test_iter_tables_row_batches(self):
+        """Test very large tables are emitted in row batches"""
+        rows = "".join(f"<tr><td>{i}</td><td>row {i}</td></tr>" for i in range(25))
+        html = f"<table><tr><th>id</th><th>name</th></tr>{rows}</table>"
+        chunks = [html[i:i + 64] for i in range(0, len(html), 64)]
+
+        frames = [df for _, df in iter_tables(chunks, ParseOptions(), batch_rows=10)]
+
+        assert len(frames) > 1
+        assert all(len(df) <= 11 for df in frames)
+        assert all(list(df.columns) == ['id', 'name'] for df in frames)
+        assert pd.concat(frames)['id'].tolist() == list(range(25))
+
+    def test_arrow_output(self, sample_html_content):
+        """Test tables can be returned as typed Arrow tables"""
+        tables = extract_tables(sample_html_content, ParseOptions(), arrow=True)
+
+        assert all(isinstance(table, pa.Table) for table in tables)
+        assert tables[0].column_names == ['Name', 'Age', 'City']
+        assert tables[0].schema.field('Age').type == pa.int64()
+        assert tables[0].column('Age').to_pylist() == [30, None]
+        assert tables[1].column('Price').to_pylist() == [1001.99, 0.99]
+
+    def test_scan_tables(self, sample_html_content):
+        """Test the table index records offsets and shapes without parsing"""
+        html = "<!-- <table> --><style>table {}</style>" + sample_html_content
+        locations = scan_tables(html, shapes=True)
+
+        assert [(loc.rows, loc.cols) for loc in locations] == [(3, 3), (3, 2)]
+        assert scan_tables(html) == [loc._replace(rows=0, cols=0) for loc in locations]
+        assert html[locations[1].start:locations[1].end].startswith("<table>")
+        assert html[locations[1].start:locations[1].end].endswith("</table>")
+        assert scan_tables("<table><tr><td>1</td></tr>") is None
+
+    def test_extract_single_table(self, sample_html_content):
+        """Test only the selected table is parsed and out of range is reported"""
+        table = extract_table(sample_html_content, ParseOptions(), 1)
+
+        assert list(table.columns) == ['Product', 'Price']
+        assert table['Price'].tolist() == [1001.99, 0.99]
+        with pytest.raises(ValueError, match="out of range. File contains 2 tables"):
+            extract_table(sample_html_content, ParseOptions(), 2)
+
+        # Unbalanced markup falls back to parsing the whole document
+        table = extract_table("<table><tr><td>a</td></tr><table><tr><td>b</td></tr>",
+                              ParseOptions(header_rows=0), 1)
+        assert table[0].tolist() == ['b']
+
+    def test_iter_tables_stops_after_selected_table(self, sample_html_content):
+        """Test chunks after the selected table are never parsed"""
+        fed = []
+
+        def chunks():
+            for line in sample_html_content.splitlines(keepends=True):
+                fed.append(line)
+                yield line
+
+        tables = list(iter_tables(chunks(), ParseOptions(), table_index=0))
+
+        assert [index for index, _ in tables] == [0]
+        assert list(tables[0][1].columns) == ['Name', 'Age', 'City']
+        assert len(fed) < len(sample_html_content.splitlines())
+
+    def _rows_html(self, rows):
+        body = "".join(f"<tr><td>{i}</td><td>v{i}</td></tr>" for i in range(rows))
+        return f"<table><tr><th>id</th><th>value</th></tr>{body}</table>"
+
+    def test_max_rows_stops_parsing(self):
+        """Test the row limit keeps the first rows and stops the parser"""
+        html = self._rows_html(100)
+        fed = []
+
+        def chunks():
+            for start in range(0, len(html), 50):
+                fed.append(start)
+                yield html[start:start + 50]
+
+        options = ParseOptions(max_rows=5)
+        tables = list(iter_tables(chunks(), options, table_index=0))
+
+        assert tables[0][1]['id'].tolist() == [0, 1, 2, 3, 4]
+        assert len(fed) < len(html) // 50 // 4
+        assert extract_tables(html + html, options)[1]['id'].tolist() == [0, 1, 2, 3, 4]
+
+    def test_sample_fraction(self):
+        """Test sampling is reproducible, keeps order and respects rowspans of dropped rows"""
+        html = ("<table><tr><th>group</th><th>id</th></tr>"
+                + "".join(f"<tr><td rowspan=10>g{i}</td><td>{i}</td></tr>"
+                          + "".join(f"<tr><td>{i + j}</td></tr>" for j in range(1, 10))
+                          for i in range(0, 1000, 10))
+                + "</table>")
+        options = ParseOptions(sample_fraction=0.1, sample_seed=3)
+        df = extract_tables(html, options)[0]
+
+        assert 50 < len(df) < 150
+        assert df['id'].is_monotonic_increasing
+        assert (df['group'] == 'g' + (df['id'] // 10 * 10).astype(str)).all()
+        assert df.equals(extract_tables(html, options)[0])
+
+    def test_reservoir_sample(self):
+        """Test reservoir sampling keeps max_rows rows from the whole table in document order"""
+        html = self._rows_html(1000)
+        df = extract_tables(html, ParseOptions(max_rows=20, reservoir=True))[0]
+
+        assert len(df) == 20
+        assert df['id'].is_monotonic_increasing
+        assert df['id'].max() > 100
+        assert (df['value'] == 'v' + df['id'].astype(str)).all()
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
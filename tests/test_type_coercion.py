@@ -0,0 +1,72 @@
+import pytest
+import pandas as pd
+import pyarrow as pa
+import os
+import sys
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from file_reader import ReaderOptions, process_file
+from table_extraction import ParseOptions
+from type_coercion import coerce_array, coerce_table, compact_array
+
+
+class TestTypeCoercion:
+    """Test suite for the vectorized type coercion stage"""
+
+    def test_currency_and_accounting_negatives(self):
+        """Test currency symbols and parentheses are handled column-wide"""
+        array = coerce_array(pa.array(['$1,050.00', '(5.25)', '-$3', None]), ParseOptions())
+
+        assert array.type == pa.float64()
+        assert array.to_pylist() == [1050.0, -5.25, -3.0, None]
+
+    def test_percent_and_locale_separators(self):
+        """Test percent signs and swapped separators are converted"""
+        percent = coerce_array(pa.array(['12.5%', '3%']), ParseOptions())
+        swapped = coerce_array(pa.array(['1.050,00', '2,5']), ParseOptions())
+
+        assert percent.to_pylist() == [0.125, 0.03]
+        assert swapped.to_pylist() == [1050.0, 2.5]
+
+    def test_dates_and_text(self):
+        """Test date formats are detected and text columns are left alone"""
+        dates = coerce_array(pa.array(['31.01.2024', '01.02.2024']), ParseOptions())
+        text = coerce_array(pa.array(['$1', 'many']), ParseOptions())
+        disabled = coerce_array(pa.array(['31.01.2024']), ParseOptions(parse_dates=False))
+
+        assert pa.types.is_timestamp(dates.type)
+        assert dates[0].as_py().day == 31
+        assert text.to_pylist() == ['$1', 'many']
+        assert disabled.type == pa.string()
+
+    def test_compact_types(self):
+        """Test compact types are only used where no value changes"""
+        assert compact_array(pa.array([1, 2])).type == pa.int32()
+        assert compact_array(pa.array([1, 1 << 40])).type == pa.int64()
+        assert compact_array(pa.array([0.5, None])).type == pa.float32()
+        assert compact_array(pa.array([0.1])).type == pa.float64()
+        assert pa.types.is_dictionary(compact_array(pa.array(['a', 'a', 'b', 'a'])).type)
+
+    def test_dataframe_columns(self):
+        """Test DataFrames keep their labels and get compact dtypes"""
+        df = pd.DataFrame({'Price': ['$10.50', '$5.25'], 'Qty': [1, 2]})
+        result = coerce_table(df, ParseOptions(), compact=True)
+
+        assert list(result.columns) == ['Price', 'Qty']
+        assert result['Price'].dtype == 'float32'
+        assert result['Qty'].dtype == 'int32'
+        assert df['Price'].tolist() == ['$10.50', '$5.25']
+
+    def test_sample_file(self):
+        """Test currency columns of the sample file become numbers"""
+        file_path = os.path.join(os.path.dirname(__file__), 'test_data', 'sample_table.xls')
+        df, _ = process_file(file_path, ReaderOptions(coerce_types=True))[0]
+
+        assert df['Price'].tolist() == [10.5, 5.25, 15.0]
+        assert df['Total'].tolist() == [1050.0, 1312.5, 1125.0]
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])